@@ -52,6 +52,11 @@ OUTPUT_DATA_PATH = Path("outputs/EPC/preprocessed_data/")
 
 PREPROC_EPC_DATA_PATH = Path("outputs/EPC/preprocessed_data/{}/EPC_GB_preprocessed.csv")
 
+# Cache of standardised EPC addresses and numeric tokens for joining with MCS data
+PREPARED_EPC_ADDRESSES_PATH = Path(
+    "outputs/EPC/preprocessed_data/{}/EPC_GB_prepared_addresses.parquet"
+)
+
 PROCESSED_EPC_DATA_PATH = Path("./outputs/EPC/preprocessed_data/{}/")
 
 
@@ -599,6 +604,12 @@ PREPROC_MCS_INSTALLER_COMPANY_PATH = (
     "/outputs/mcs/cleaned_geocoded_mcs_installer_companies.csv"
 )
 
+# Local cache of Companies House search results by query
+COMPANIES_HOUSE_CACHE_PATH = "outputs/MCS/companies_house_cache.json"
+COMPANIES_HOUSE_SEARCH_URL = (
+    "https://api.company-information.service.gov.uk/search/companies"
+)
+
 LOCAL_NEW_MCS_DATA_DUMP_DIR = "/inputs/data/mcs/"
 S3_NEW_MCS_DATA_DUMP_DIR = "inputs/MCS/latest_raw_data/"
 INSTALLATIONS_RAW_S3_PATH = "inputs/MCS/mcs_installations.csv"
@@ -838,6 +849,10 @@ MCS_HISTORICAL_DATA_OUTPUTS_PATH = "outputs/MCS/installers/"
 PREPROCESSED_MCS_HISTORICAL_INSTALLERS_FILE_PATH = (
     "/outputs/MCS/installers/mcs_historical_installers_{}.csv"
 )
+# Integer keys of installers, for joining with installations
+PREPROCESSED_MCS_HISTORICAL_INSTALLER_KEYS_FILE_PATH = (
+    "/outputs/MCS/installers/mcs_historical_installer_keys_{}.csv"
+)
 
 processed_historical_installers_columns_order = [
     "company_unique_id",
@@ -10,6 +10,9 @@ import shutil
 
 import geopandas as gpd
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 
 from asf_core_data import Path
 from asf_core_data.config import base_config
@@ -127,8 +130,12 @@ def load_data(
     skiprows=None,
     encoding=None,
     low_memory=False,
+    filters=None,
+    chunksize=None,
 ):
     """Load files from S3 bucket or local directory.
+    For Parquet files, only the columns in usecols are read and dtype, skiprows,
+    encoding, low_memory and chunksize are ignored as the column types are stored in the file.
 
     Args:
         file_path (str, optional): Relative path to file to load.
@@ -143,12 +150,26 @@ def load_data(
             If True, internally process the file in chunks, resulting in lower memory use while parsing,
             but possibly mixed type inference.
             To ensure no mixed types either set False, or specify the type with the dtype parameter.
+        filters (list, optional): Row filters for Parquet files, e.g. [("COUNTRY", "=", "Wales")].
+            Filters on partition features skip the other partitions entirely. Defaults to None.
+        chunksize (int, optional): Number of rows per chunk for csv files.
+            If given, an iterator over dataframe chunks is returned. Defaults to None.
 
     Returns:
         loaded_data (pd.DataFrame): Data loaded as pandas dataframe.
     """
 
-    if str(data_path) == "S3":
+    if fnmatch(str(file_path), "*.parquet"):
+        full_path = (
+            "s3://" + bucket_name + "/" + str(file_path)
+            if str(data_path) == "S3"
+            else Path(data_path) / file_path
+        )
+        loaded_data = load_parquet_data(
+            full_path, usecols=usecols, n_samples=n_samples, filters=filters
+        )
+
+    elif str(data_path) == "S3":
         loaded_data = load_s3_data(
             bucket_name,
             file_path,
@@ -157,6 +178,7 @@ def load_data(
             low_memory=low_memory,
             skiprows=skiprows,
             n_samples=n_samples,
+            chunksize=chunksize,
         )
     else:
         full_path = Path(data_path) / file_path
@@ -169,11 +191,51 @@ def load_data(
             skiprows=skiprows,
             encoding=encoding,
             nrows=n_samples,
+            chunksize=chunksize,
         )
 
     return loaded_data
 
 
+def load_parquet_data(file_path, usecols=None, n_samples=None, filters=None):
+    """Load Parquet file or directory of Parquet files from S3 or local directory.
+    Only the requested columns are read from disk, and only the partitions
+    (subdirectories such as COUNTRY=Wales/) that can match the filters.
+
+    Args:
+        file_path (str/Path): Full path to Parquet file or directory, starting with "s3://" for files on S3.
+        usecols (list, optional): Features/columns to load. Columns that do not exist in the file are ignored.
+            Defaults to None, loading all features.
+        n_samples (int, optional): Number of samples/rows to load. Defaults to None, loading all samples.
+        filters (list, optional): Row filters as list of (feature, operator, value) tuples,
+            e.g. [("COUNTRY", "=", "Wales")]. Defaults to None, loading all rows.
+
+    Returns:
+        pd.DataFrame: Data loaded as pandas dataframe, with categorical and datetime columns restored.
+    """
+
+    dataset = ds.dataset(str(file_path), format="parquet", partitioning="hive")
+    filter_expression = None if filters is None else pq.filters_to_expression(filters)
+
+    # Keep the column order of the file, as done when loading csv files with usecols
+    if usecols is not None:
+        usecols = [col for col in dataset.schema.names if col in usecols]
+
+    if n_samples is not None:
+        table = dataset.head(n_samples, columns=usecols, filter=filter_expression)
+    else:
+        table = dataset.to_table(columns=usecols, filter=filter_expression)
+
+    # Text partition features (e.g. COUNTRY) are not stored in the files, so restore them as categoricals
+    partition_features = [
+        field.name
+        for field in dataset.partitioning.schema
+        if pa.types.is_string(field.type) and field.name in table.column_names
+    ]
+
+    return table.to_pandas(categories=partition_features)
+
+
 def get_s3_dir_files(
     bucket_name="asf-core-data",
     path_to_dir=".",
@@ -209,6 +271,7 @@ def load_s3_data(
     columns_to_parse_as_dates=None,
     encoding="latin-1",
     low_memory=False,
+    chunksize=None,
 ):
     """Load data from S3 location.
 
@@ -225,6 +288,8 @@ def load_s3_data(
             If True, internally process the file in chunks, resulting in lower memory use while parsing,
             but possibly mixed type inference.
             To ensure no mixed types either set False, or specify the type with the dtype parameter.
+        chunksize (int, optional): Number of rows per chunk when reading csv files.
+            If given, an iterator over dataframe chunks is returned. Defaults to None.
     """
 
     if fnmatch(file_name, "*.xlsx"):
@@ -255,6 +320,7 @@ def load_s3_data(
             skiprows=skiprows,
             nrows=n_samples,
             parse_dates=columns_to_parse_as_dates,
+            chunksize=chunksize,
         )
 
     elif fnmatch(file_name, "*.geojson"):
@@ -287,12 +353,14 @@ def save_to_s3(bucket_name, output_var, output_file_path):
         obj.put(Body=byte_obj)
     elif fnmatch(output_file_path, "*.csv"):
         output_var.to_csv("s3://" + bucket_name + output_file_path, index=False)
+    elif fnmatch(output_file_path, "*.parquet"):
+        output_var.to_parquet("s3://" + bucket_name + output_file_path, index=False)
     elif fnmatch(output_file_path, "*.json"):
         byte_obj = json.dumps(output_var)
         obj.put(Body=byte_obj)
     else:
         print(
-            'Function not supported for file type other than "*.pkl", "*.json" and "*.csv"'
+            'Function not supported for file type other than "*.pkl", "*.json", "*.parquet" and "*.csv"'
         )
 
 
@@ -128,7 +128,11 @@ def get_latest_hist_installers():
 
     path = "outputs/MCS/installers"
 
-    batches = [key for key in data_getters.get_s3_dir_files(path_to_dir=path)]
+    batches = [
+        key
+        for key in data_getters.get_s3_dir_files(path_to_dir=path)
+        if "mcs_historical_installers_" in key
+    ]
 
     if not batches:
         raise IOError("No suitable baches found.")
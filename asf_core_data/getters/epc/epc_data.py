@@ -5,6 +5,8 @@
 
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 import pandas as pd
 import numpy as np
@@ -61,6 +63,35 @@ def get_cert_rec_files(data_path, dir_name, scotland_data=False):
     return directories
 
 
+def load_files(file_paths, n_workers=None, executor=None, **load_kwargs):
+    """Load several EPC files with data_getters.load_data, optionally in parallel.
+
+    The loaded dataframes are returned in the same order as the given file paths,
+    no matter in which order the workers finish.
+
+    Args:
+        file_paths (list): Relative paths to files to load.
+        n_workers (int, optional): Number of processes to load files with. Defaults to None, loading files one after another.
+        executor (concurrent.futures.Executor, optional): Executor to use for loading instead of creating a new process pool.
+            It will not be shut down after loading. Defaults to None.
+        **load_kwargs: Keyword arguments passed to data_getters.load_data, e.g. data_path, dtype or usecols.
+
+    Returns:
+        list: Loaded data as list of pandas dataframes.
+    """
+
+    load_file = partial(data_getters.load_data, **load_kwargs)
+
+    if executor is not None:
+        return list(executor.map(load_file, file_paths))
+
+    if n_workers is not None and n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            return list(pool.map(load_file, file_paths))
+
+    return [load_file(file_path) for file_path in file_paths]
+
+
 def load_scotland_data(
     data_path=base_config.ROOT_DATA_PATH,
     rel_data_path=base_config.RAW_SCOTLAND_DATA_PATH,
@@ -70,6 +101,8 @@ def load_scotland_data(
     load_recs=False,
     dtype=base_config.dtypes,
     low_memory=True,
+    n_workers=None,
+    executor=None,
 ):
     """Load the Scotland EPC data.
 
@@ -85,6 +118,10 @@ def load_scotland_data(
             If True, internally process the file in chunks, resulting in lower memory use while parsing,
             but possibly mixed type inference.
             To ensure no mixed types either set False, or specify the type with the dtype parameter.
+        n_workers (int, optional): Number of processes for loading the quarterly files in parallel.
+            Defaults to None, loading one file after another.
+        executor (concurrent.futures.Executor, optional): Executor for loading the files in parallel instead of
+            creating a process pool with n_workers. Defaults to None.
 
     Returns:
         pd.DataFrame: Scotland EPC certificate data for given features."""
@@ -178,18 +215,17 @@ def load_scotland_data(
     files = get_cert_rec_files(data_path, RAW_SCOTLAND_DATA_PATH, scotland_data=True)
     files = [file for file in files if file.endswith(".csv") and file != "Header.csv"]
 
-    epc_certs = [
-        data_getters.load_data(
-            RAW_SCOTLAND_DATA_PATH / file,
-            data_path=data_path,
-            dtype=dtype,
-            low_memory=low_memory,
-            usecols=scot_usecols,
-            skiprows=1,  # don't load first row (more ellaborate feature names),
-            # encoding="latin-1",
-        )
-        for file in files
-    ]
+    epc_certs = load_files(
+        [RAW_SCOTLAND_DATA_PATH / file for file in files],
+        n_workers=n_workers,
+        executor=executor,
+        data_path=data_path,
+        dtype=dtype,
+        low_memory=low_memory,
+        usecols=scot_usecols,
+        skiprows=1,  # don't load first row (more ellaborate feature names),
+        # encoding="latin-1",
+    )
 
     # Concatenate single dataframes into dataframe
     epc_certs = pd.concat(epc_certs, axis=0)
@@ -232,6 +268,8 @@ def load_england_wales_data(
     load_recs=False,
     dtype=base_config.dtypes,
     low_memory=True,
+    n_workers=None,
+    executor=None,
 ):
     """Load the England and/or Wales EPC data.
 
@@ -249,6 +287,10 @@ def load_england_wales_data(
             If True, internally process the file in chunks, resulting in lower memory use while parsing,
             but possibly mixed type inference.
             To ensure no mixed types either set False, or specify the type with the dtype parameter.
+        n_workers (int, optional): Number of processes for loading the local authority files in parallel.
+            Defaults to None, loading one file after another.
+        executor (concurrent.futures.Executor, optional): Executor for loading the files in parallel instead of
+            creating a process pool with n_workers. Defaults to None.
 
     Returns:
         pd.DataFrame:  England/Wales EPC certificate data for given features."""
@@ -282,6 +324,8 @@ def load_england_wales_data(
             n_samples=n_samples,
             load_recs=load_recs,
             # data_check=True,
+            n_workers=n_workers,
+            executor=executor,
         )
 
         england_epc = load_england_wales_data(
@@ -295,6 +339,8 @@ def load_england_wales_data(
             low_memory=low_memory,
             load_recs=load_recs,
             # data_check=False,
+            n_workers=n_workers,
+            executor=executor,
         )
 
         epc_certs = pd.concat([wales_epc, england_epc], axis=0, ignore_index=True)
@@ -341,16 +387,18 @@ def load_england_wales_data(
             usecols.remove("UPRN")
             usecols.append("BUILDING_REFERENCE_NUMBER")
 
-    epc_certs = [
-        data_getters.load_data(
-            RAW_ENG_WALES_DATA_PATH / directory / "{}.csv".format(data_to_load),
-            data_path=data_path,
-            dtype=dtype,
-            low_memory=low_memory,
-            usecols=usecols,
-        )
-        for directory in directories
-    ]
+    epc_certs = load_files(
+        [
+            RAW_ENG_WALES_DATA_PATH / directory / "{}.csv".format(data_to_load)
+            for directory in directories
+        ],
+        n_workers=n_workers,
+        executor=executor,
+        data_path=data_path,
+        dtype=dtype,
+        low_memory=low_memory,
+        usecols=usecols,
+    )
 
     # # Concatenate single dataframes into dataframe
     epc_certs = pd.concat(epc_certs, axis=0)
@@ -378,6 +426,8 @@ def load_raw_epc_data(
     load_recs=False,
     dtype=base_config.dtypes,
     low_memory=True,
+    n_workers=None,
+    executor=None,
 ):
     """Load and return EPC dataset, or specific subset, as pandas dataframe.
 
@@ -394,6 +444,10 @@ def load_raw_epc_data(
             If True, internally process the file in chunks, resulting in lower memory use while parsing,
             but possibly mixed type inference.
             To ensure no mixed types either set False, or specify the type with the dtype parameter.
+        n_workers (int, optional): Number of processes for loading the raw EPC files in parallel.
+            Defaults to None, loading one file after another.
+        executor (concurrent.futures.Executor, optional): Executor for loading the files in parallel instead of
+            creating a process pool with n_workers. Defaults to None.
     Returns:
         pd.DataFrame: EPC certificate data for given area and features.
     """
@@ -426,6 +480,8 @@ def load_raw_epc_data(
             usecols=usecols,
             n_samples=None if n_samples is None else n_samples + additional_samples,
             batch=batch,
+            n_workers=n_workers,
+            executor=executor,
         )
 
         all_epc_df.append(epc_scotland_df)
@@ -445,6 +501,8 @@ def load_raw_epc_data(
             dtype=dtype,
             low_memory=low_memory,
             batch=batch,
+            n_workers=n_workers,
+            executor=executor,
         )
         return epc_df
 
@@ -460,6 +518,8 @@ def load_raw_epc_data(
                 load_recs=load_recs,
                 dtype=dtype,
                 low_memory=low_memory,
+                n_workers=n_workers,
+                executor=executor,
             )
             all_epc_df.append(epc_df)
 
@@ -517,6 +577,200 @@ def load_cleansed_epc(
     return cleansed_epc
 
 
+def get_csv_dtypes(file_path, data_path, version):
+    """Get the dtypes for loading a csv EPC dataset of the given version.
+    Preprocessed data saved with compact UPRNs (see preprocess_data()) has a UPRN_HASHED flag,
+    in which case the UPRN is loaded as int64 instead of str.
+
+    Args:
+        file_path (str/Path): Relative path to csv file.
+        data_path (str/Path): Path to ASF core data directory or 'S3'.
+        version (str): Data version: "raw", "preprocessed" or "preprocessed_dedupl".
+
+    Returns:
+        dict: Dtypes by feature.
+    """
+
+    if version == "raw":
+        return base_config.dtypes
+
+    features = data_getters.load_data(file_path, data_path=data_path, n_samples=0)
+
+    if "UPRN_HASHED" not in features.columns:
+        return base_config.dtypes_prepr
+
+    return {**base_config.dtypes_prepr, "UPRN": np.int64, "UPRN_HASHED": bool}
+
+
+def load_csv_country_subset(
+    file_path, subset, usecols=None, n_samples=None, chunksize=1000000, **load_kwargs
+):
+    """Load only the EPC records of one nation from a csv file with EPC data for several nations.
+    The file is read once in chunks, so only the records of the given nation are kept in memory.
+
+    Args:
+        file_path (str/Path): Relative path to csv file.
+        subset (str): Nation subset: 'Wales', 'England' or 'Scotland'.
+        usecols (list, optional): Features/columns to load. Defaults to None, loading all features.
+        n_samples (int, optional): Number of samples/rows to load. Defaults to None, loading all samples.
+        chunksize (int, optional): Number of rows to read at once. Defaults to 1000000.
+        **load_kwargs: Keyword arguments passed to data_getters.load_data, e.g. data_path or dtype.
+
+    Returns:
+        pd.DataFrame: EPC data for given nation.
+    """
+
+    drop_country = usecols is not None and "COUNTRY" not in usecols
+    if drop_country:
+        usecols = usecols + ["COUNTRY"]
+
+    country_chunks = []
+    n_loaded = 0
+
+    with data_getters.load_data(
+        file_path, usecols=usecols, chunksize=chunksize, **load_kwargs
+    ) as chunks:
+        for chunk in chunks:
+            chunk = chunk.loc[chunk["COUNTRY"] == subset]
+            country_chunks.append(chunk)
+            n_loaded += chunk.shape[0]
+
+            if n_samples is not None and n_loaded >= n_samples:
+                break
+
+    epc_df = pd.concat(country_chunks, axis=0, ignore_index=True)
+
+    if n_samples is not None:
+        epc_df = epc_df[:n_samples]
+
+    if drop_country:
+        epc_df = epc_df.drop(columns="COUNTRY")
+
+    return epc_df
+
+
+def load_preprocessed_epc_data_in_chunks(
+    data_path=base_config.ROOT_DATA_PATH,
+    rel_data_path=base_config.RAW_EPC_DATA_PATH.parent,
+    subset="GB",
+    batch=None,
+    version="raw",
+    usecols=base_config.EPC_FEAT_SELECTION,
+    chunksize=1000000,
+    low_memory=True,
+):
+    """Load the csv EPC dataset in chunks, e.g. for processing data that does not fit into memory.
+    See load_preprocessed_epc_data() for the available versions.
+
+    Args:
+        data_path (str/Path, optional): Path to ASF core data directory or 'S3'. Defaults to base_config.ROOT_DATA_PATH.
+        rel_data_path (str/Path, optional): Relative path to specific EPC data. Defaults to base_config.RAW_EPC_DATA_PATH.parent.
+        subset (str, optional): Nation subset: 'GB', 'Wales', 'England', 'Scotland'. Defaults to "GB", loading all nation's data.
+        batch (str, optional): Data batch to load. Defaults to None.
+        version (str, optional): Data version to use. Defaults to "raw".
+        usecols (list, optional): Features/columns to load from EPC dataset. Defaults to base_config.EPC_FEAT_SELECTION.
+        chunksize (int, optional): Number of rows per chunk. Defaults to 1000000.
+        low_memory (bool, optional): Whether to load data with low memory. Defaults to True.
+
+    Yields:
+        pd.DataFrame: Next chunk of EPC data in the given version.
+    """
+
+    version_path_dict = {
+        "raw": base_config.RAW_EPC_DATA_PATH.name,
+        "preprocessed_dedupl": base_config.PREPROC_EPC_DATA_DEDUPL_PATH.name,
+        "preprocessed": base_config.PREPROC_EPC_DATA_PATH.name,
+    }
+
+    if usecols is not None:
+        usecols = list(set(usecols + ["COUNTRY"]))
+
+    EPC_DATA_PATH = data_batches.get_batch_path(
+        rel_data_path / version_path_dict[version],
+        data_path,
+        batch,
+        check_folder="output",
+    )
+
+    # If file does not exist (likely just not unzipped), unzip the data
+    if (str(data_path) != "S3") and not (data_path / EPC_DATA_PATH).is_file():
+        data_download.extract_data(
+            data_path / EPC_DATA_PATH.parent / (EPC_DATA_PATH.name + ".zip")
+        )
+
+    with data_getters.load_data(
+        EPC_DATA_PATH,
+        data_path=data_path,
+        dtype=get_csv_dtypes(EPC_DATA_PATH, data_path, version),
+        low_memory=low_memory,
+        usecols=usecols,
+        chunksize=chunksize,
+    ) as chunks:
+        for chunk in chunks:
+            if subset in ["England", "Wales", "Scotland"]:
+                chunk = chunk.loc[chunk["COUNTRY"] == subset].reset_index(drop=True)
+
+            for col in base_config.parse_dates:
+                if col in chunk.columns:
+                    chunk[col] = pd.to_datetime(chunk[col], errors="coerce")
+
+            yield chunk
+
+
+def load_preprocessed_epc_data_rows(
+    rows,
+    data_path=base_config.ROOT_DATA_PATH,
+    rel_data_path=base_config.RAW_EPC_DATA_PATH.parent,
+    batch=None,
+    version="preprocessed_dedupl",
+    usecols=base_config.EPC_PREPROC_FEAT_SELECTION,
+    chunksize=1000000,
+):
+    """Load only the given rows of the csv EPC dataset, e.g. the EPC records matched to other data.
+    The data is read in chunks and only the requested rows are kept, so the entire
+    dataset is never held in memory. See load_preprocessed_epc_data() for the available versions.
+
+    Args:
+        rows (list): Positions of the rows to load, as in the index of load_preprocessed_epc_data().
+        data_path (str/Path, optional): Path to ASF core data directory or 'S3'. Defaults to base_config.ROOT_DATA_PATH.
+        rel_data_path (str/Path, optional): Relative path to specific EPC data. Defaults to base_config.RAW_EPC_DATA_PATH.parent.
+        batch (str, optional): Data batch to load. Defaults to None.
+        version (str, optional): Data version to use. Defaults to "preprocessed_dedupl".
+        usecols (list, optional): Features/columns to load from EPC dataset.
+            Defaults to base_config.EPC_PREPROC_FEAT_SELECTION.
+        chunksize (int, optional): Number of rows per chunk. Defaults to 1000000.
+
+    Returns:
+        pd.DataFrame: Requested rows of the EPC data, indexed by row position.
+    """
+
+    rows = pd.Index(rows).unique()
+
+    offset = 0
+    selected_chunks = []
+
+    for chunk in load_preprocessed_epc_data_in_chunks(
+        data_path=data_path,
+        rel_data_path=rel_data_path,
+        batch=batch,
+        version=version,
+        usecols=usecols,
+        chunksize=chunksize,
+    ):
+        chunk.index = pd.RangeIndex(offset, offset + chunk.shape[0])
+        offset += chunk.shape[0]
+
+        selected_chunks.append(chunk.loc[chunk.index.intersection(rows)])
+
+    epc_df = pd.concat(selected_chunks)
+
+    # COUNTRY is always loaded for selecting nation subsets
+    if usecols is not None and "COUNTRY" not in usecols:
+        epc_df = epc_df.drop(columns="COUNTRY")
+
+    return epc_df
+
+
 def load_preprocessed_epc_data(
     data_path=base_config.ROOT_DATA_PATH,
     rel_data_path=base_config.RAW_EPC_DATA_PATH.parent,
@@ -529,6 +783,8 @@ def load_preprocessed_epc_data(
     low_memory=True,
     get_country_indices=False,
     verbose=False,
+    format="csv",
+    filters=None,
 ):
     """Load the EPC dataset including England, Wales and Scotland.
     Select one of the following versions:
@@ -546,7 +802,9 @@ def load_preprocessed_epc_data(
     Args:
         data_path (str/Path, optional): Path to ASF core data directory or 'S3'. Defaults to base_config.ROOT_DATA_PATH.
         rel_data_path (str/Path, optional): Relative path to specific EPC data. Defaults to base_config.RAW_EPC_DATA_PATH.parent.
-        subset (str, optional): Nation subset: 'GB', 'Wales', 'England', 'Scotland'. Defaults to "GB", loading all nation's data. Loading isn't that much faster than loading the entire dataset.
+        subset (str, optional): Nation subset: 'GB', 'Wales', 'England', 'Scotland'. Defaults to "GB", loading all nation's data.
+            For Parquet datasets, only the partition of the given nation is read.
+            For csv files, the file is read once in chunks and only the rows of the given nation are kept.
         batch (str, optional): Data batch to load. Defaults to None.
         version (str, optional): Data version to use. Defaults to "preprocessed_dedupl".
         usecols (list, optional): Features/columns to load from EPC dataset. Defaults to None, loading all features.
@@ -556,34 +814,27 @@ def load_preprocessed_epc_data(
             but possibly mixed type inference.
             To ensure no mixed types either set False, or specify the type with the dtype parameter.
 
-        get_country_indices (bool, optional): Whether to load only country field to compute which rows to keep and discard when loading subset. Defaults to False.
+        get_country_indices (bool, optional): Legacy, no longer used. Defaults to False.
         verbose (bool, optional): Print path to what EPC file is loaded. Defaults to False.
+        format (str, optional): File format of the stored EPC data: "csv" or "parquet". Defaults to "csv".
+            Parquet files store categorical and datetime features natively
+            and only the columns in usecols are read from disk.
+        filters (list, optional): Additional row filters for Parquet datasets as (feature, operator, value) tuples,
+            e.g. [("INSPECTION_YEAR", ">=", 2020)] for datasets partitioned by year. Defaults to None.
     Returns:
         pd.DataFrame: EPC data in the given version
     """
 
+    if format not in ["csv", "parquet"]:
+        raise IOError("'{}' is not a valid EPC data format.".format(format))
+
     version_path_dict = {
         "raw": base_config.RAW_EPC_DATA_PATH.name,
         "preprocessed_dedupl": base_config.PREPROC_EPC_DATA_DEDUPL_PATH.name,
         "preprocessed": base_config.PREPROC_EPC_DATA_PATH.name,
     }
 
-    if subset in ["England", "Wales", "Scotland"] and not get_country_indices:
-        country_df = load_preprocessed_epc_data(
-            data_path=data_path,
-            rel_data_path=rel_data_path,
-            subset=subset,
-            batch=batch,
-            version=version,
-            usecols=["COUNTRY"],
-            get_country_indices=True,
-        ).reset_index()
-
-        skiprows = [
-            r + 1 for r in country_df.index[country_df["COUNTRY"] != subset].tolist()
-        ]
-
-    dtype = base_config.dtypes if version == "raw" else base_config.dtypes_prepr
+    select_subset = subset in ["England", "Wales", "Scotland"]
 
     if usecols == base_config.EPC_PREPROC_FEAT_SELECTION and version == "raw":
         usecols = base_config.EPC_FEAT_SELECTION
@@ -598,8 +849,15 @@ def load_preprocessed_epc_data(
         check_folder="output",
     )
 
+    if format == "parquet":
+        EPC_DATA_PATH = EPC_DATA_PATH.with_suffix(".parquet")
+
     # If file does not exist (likely just not unzipped), unzip the data
-    if (str(data_path) != "S3") and not (data_path / EPC_DATA_PATH).is_file():
+    if (
+        (str(data_path) != "S3")
+        and format == "csv"
+        and not (data_path / EPC_DATA_PATH).is_file()
+    ):
         data_download.extract_data(
             data_path / EPC_DATA_PATH.parent / (EPC_DATA_PATH.name + ".zip")
         )
@@ -607,18 +865,48 @@ def load_preprocessed_epc_data(
     if verbose:
         print("Loading EPC data from {}".format(EPC_DATA_PATH))
 
-    epc_df = data_getters.load_data(
-        EPC_DATA_PATH,
-        data_path=data_path,
-        dtype=dtype,
-        low_memory=low_memory,
-        usecols=usecols,
-        n_samples=n_samples,
-        skiprows=skiprows,
-    )
+    if format == "csv":
+        dtype = get_csv_dtypes(EPC_DATA_PATH, data_path, version)
+
+    if format == "parquet":
+        filters = [] if filters is None else list(filters)
+        if select_subset:
+            filters.append(("COUNTRY", "=", subset))
+
+        epc_df = data_getters.load_data(
+            EPC_DATA_PATH,
+            data_path=data_path,
+            usecols=usecols,
+            n_samples=n_samples,
+            filters=filters or None,
+        )
+
+    elif select_subset:
+        epc_df = load_csv_country_subset(
+            EPC_DATA_PATH,
+            subset,
+            data_path=data_path,
+            dtype=dtype,
+            low_memory=low_memory,
+            usecols=usecols,
+            n_samples=n_samples,
+        )
+
+    else:
+        epc_df = data_getters.load_data(
+            EPC_DATA_PATH,
+            data_path=data_path,
+            dtype=dtype,
+            low_memory=low_memory,
+            usecols=usecols,
+            n_samples=n_samples,
+            skiprows=skiprows,
+        )
 
     for col in base_config.parse_dates:
-        if col in epc_df.columns:
+        if col in epc_df.columns and not pd.api.types.is_datetime64_any_dtype(
+            epc_df[col]
+        ):
             epc_df[col] = pd.to_datetime(epc_df[col], errors="coerce")
 
     return epc_df
@@ -641,6 +929,47 @@ def get_epc_sample(full_df, sample_size):
     return sample_df
 
 
+def select_building_entries(epc_df, building_identifier="UPRN", keep="last"):
+    """Select the first or latest entry for each building in a single pass, without sorting the data.
+    Entries with missing building identifier are grouped by ADDRESS1, ADDRESS2 and POSTCODE instead.
+    Missing inspection dates count as latest, entries with the same inspection date are ordered by position.
+
+    Args:
+        epc_df (pandas.DataFrame): EPC dataframe with INSPECTION_DATE.
+        building_identifier (str): Building identifier, e.g. UPRN or BUILDING_REFERENCE_NUMBER. Defaults to "UPRN".
+        keep (str, optional): Which entry to select: "first" or "last". Defaults to "last".
+
+    Returns:
+        numpy.ndarray: Positions of the selected entries, ordered by inspection date.
+    """
+
+    # Integer codes for the building keys, using the address for missing building identifiers
+    building_codes, building_ids = pd.factorize(epc_df[building_identifier])
+    address_codes = (
+        epc_df.groupby(["ADDRESS1", "ADDRESS2", "POSTCODE"], dropna=False, sort=False)
+        .ngroup()
+        .values
+    )
+    keys = np.where(
+        building_codes == -1, len(building_ids) + address_codes, building_codes
+    )
+
+    # Integer codes for the inspection dates in chronological order, with missing dates last
+    date_codes, dates = pd.factorize(epc_df["INSPECTION_DATE"], sort=True)
+    date_codes = np.where(date_codes == -1, len(dates), date_codes)
+
+    best_date_codes = (
+        pd.Series(date_codes)
+        .groupby(keys)
+        .transform("max" if keep == "last" else "min")
+        .values
+    )
+    candidates = np.flatnonzero(date_codes == best_date_codes)
+    positions = candidates[~pd.Series(keys[candidates]).duplicated(keep=keep).values]
+
+    return positions[np.lexsort((positions, date_codes[positions]))]
+
+
 def filter_by_year(
     epc_df, year, building_identifier="UPRN", up_to=True, selection=None
 ):
@@ -671,25 +1000,10 @@ def filter_by_year(
     selection_dict = {"first entry": "first", "latest entry": "last"}
 
     if selection in ["first entry", "latest entry"]:
-        epc_df = epc_df.sort_values("INSPECTION_DATE", ascending=True)
-
-        # Dealing with EPC entries with missing UPRN
-        uprn_missing = epc_df[pd.isnull(epc_df[building_identifier])]
-        uprn_missing = uprn_missing.drop_duplicates(
-            subset=["ADDRESS1", "ADDRESS2", "POSTCODE"], keep=selection_dict[selection]
+        positions = select_building_entries(
+            epc_df, building_identifier, keep=selection_dict[selection]
         )
-
-        # Dealing with EPC entries with known UPRN
-        epc_df = epc_df[~pd.isnull(epc_df[building_identifier])]
-        epc_df = epc_df.drop_duplicates(
-            subset=[building_identifier], keep=selection_dict[selection]
-        )
-
-        # Concatenating datasets together and sorting by inspection_date again
-        epc_df = pd.concat([epc_df, uprn_missing])
-        epc_df = epc_df.sort_values("INSPECTION_DATE", ascending=True)
-
-        epc_df.reset_index(drop=True, inplace=True)
+        epc_df = epc_df.iloc[positions].reset_index(drop=True)
 
     elif selection is None:
         epc_df = epc_df.sort_values("INSPECTION_DATE", ascending=True)
@@ -0,0 +1,77 @@
+"""
+Script to test the EPC data getters.
+"""
+
+import numpy as np
+import pandas as pd
+
+from asf_core_data.getters.epc.epc_data import filter_by_year
+
+
+def filter_by_year_sorted(epc_df, building_identifier="UPRN", selection=None):
+    """
+    Previous deduplication by sorting by INSPECTION_DATE and dropping duplicates.
+    A stable sort is used, so that entries with the same inspection date keep their order.
+    """
+
+    keep = {"first entry": "first", "latest entry": "last"}[selection]
+    epc_df = epc_df.sort_values("INSPECTION_DATE", kind="stable")
+
+    uprn_missing = epc_df[pd.isnull(epc_df[building_identifier])]
+    uprn_missing = uprn_missing.drop_duplicates(
+        subset=["ADDRESS1", "ADDRESS2", "POSTCODE"], keep=keep
+    )
+
+    epc_df = epc_df[~pd.isnull(epc_df[building_identifier])]
+    epc_df = epc_df.drop_duplicates(subset=[building_identifier], keep=keep)
+
+    return pd.concat([epc_df, uprn_missing])
+
+
+def get_sampled_epc_data(n_samples=500, seed=42):
+    """
+    Sample EPC entries with repeated and missing UPRNs, addresses and inspection dates.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    uprns = np.array([100, 101, 102, 103, np.nan], dtype=object)
+    dates = pd.to_datetime(
+        ["2012-01-01", "2015-06-01", "2015-06-01", "2020-03-01", None]
+    )
+
+    return pd.DataFrame(
+        {
+            "UPRN": rng.choice(uprns, n_samples, p=[0.1, 0.1, 0.1, 0.1, 0.6]),
+            "ADDRESS1": rng.choice(np.array(["Flat 1", "Flat 2", np.nan]), n_samples),
+            "ADDRESS2": rng.choice(
+                np.array(["Mill Lane", np.nan], dtype=object), n_samples
+            ),
+            "POSTCODE": rng.choice(["AB12CD", "EH39QQ"], n_samples),
+            "INSPECTION_DATE": dates[rng.integers(0, len(dates), n_samples)],
+            "POSITION": np.arange(n_samples),
+        }
+    )
+
+
+def test_filter_by_year_selection():
+    """
+    Test if selecting the first or latest entry per building selects the same entries
+    as sorting and dropping duplicates, for buildings with and without UPRN,
+    missing inspection dates and entries with the same inspection date.
+    """
+
+    for seed in range(5):
+        epc_df = get_sampled_epc_data(seed=seed)
+
+        for selection in ["first entry", "latest entry"]:
+            selected = filter_by_year(
+                epc_df.copy(), None, building_identifier="UPRN", selection=selection
+            )
+            expected = (
+                filter_by_year_sorted(epc_df, selection=selection)
+                .sort_values(["INSPECTION_DATE", "POSITION"])
+                .reset_index(drop=True)
+            )
+
+            pd.testing.assert_frame_equal(selected, expected)
@@ -62,7 +62,9 @@ def get_most_recent_processed_historical_installers_data() -> pd.DataFrame:
     bucket = base_config.BUCKET_NAME
     path = base_config.MCS_HISTORICAL_DATA_OUTPUTS_PATH
     most_recent_file_name = get_most_recent_batch_name(
-        bucket=bucket, s3_folder_path=path
+        bucket=bucket,
+        s3_folder_path=path,
+        filter_keep_keywords=["mcs_historical_installers_"],
     )
 
     return load_s3_data(
@@ -91,3 +93,28 @@ def get_processed_historical_installers_data(path_to_file: str) -> pd.DataFrame:
         columns_to_parse_as_dates=base_config.preprocessed_historical_installers_date_cols,
         encoding="utf-8",
     )
+
+
+def get_installer_keys_data(path_to_file: str) -> pd.DataFrame:
+    """
+    Get the installer keys saved alongside a version of the processed historical installers data,
+    see build_installer_keys() in process_mcs_utils.
+
+    Args:
+        path_to_file: string of format 'outputs/MCS/installers/mcs_historical_installers_YYYYMMDD.csv',
+        where YYYY/MM/DD is the date MCS shared the file in the Data Dumps Google Drive folder.
+    Returns:
+        Installer keys for the processed historical installers data.
+    """
+    return load_s3_data(
+        base_config.BUCKET_NAME,
+        path_to_file.replace(
+            "mcs_historical_installers_", "mcs_historical_installer_keys_"
+        ),
+        dtype={
+            "company_name": str,
+            "company_unique_id": str,
+            "mcs_certificate_number": str,
+            "installer_key": int,
+        },
+    )
@@ -27,6 +27,13 @@ import numpy as np
 from asf_core_data.pipeline.preprocessing.feature_engineering import (
     get_postcode_coordinates,
 )
+from asf_core_data.getters.mcs_getters.get_mcs_installers import (
+    get_installer_keys_data,
+)
+from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
+    build_installer_keys,
+    get_installer_key,
+)
 
 
 # ---------------------------------------------------------------------------------
@@ -157,15 +164,19 @@ def add_mcs_installations_data(
         dtype={"UPRN": "str", "commission_date": "str"},
     )
 
+    # Compact UPRNs are int64, see preprocess_data()
+    if pd.api.types.is_integer_dtype(epc_df["UPRN"]):
+        mcs_df["UPRN"] = pd.to_numeric(mcs_df["UPRN"]).astype("Int64")
+
     # List of UPRNs that appear to be mapped to multiple installations,
     # so likely multiple homes instead of one
     uprns_likely_multiple_houses = list(
         mcs_df["UPRN"].value_counts()[mcs_df["UPRN"].value_counts() > 1].index
     )
 
-    # We replace those UPRNs by None
-    mcs_df["UPRN"] = np.where(
-        mcs_df["UPRN"].isin(uprns_likely_multiple_houses), None, mcs_df["UPRN"]
+    # We replace those UPRNs by None, keeping the dtype
+    mcs_df["UPRN"] = mcs_df["UPRN"].mask(
+        mcs_df["UPRN"].isin(uprns_likely_multiple_houses), None
     )
 
     mcs_df = install_date_computation.reformat_mcs_date(mcs_df, "commission_date")
@@ -324,19 +335,52 @@ def add_mcs_installer_data(
 
     mcs_instllr_data = deduplicate_installer_date(mcs_instllr_data)
 
-    df["installation_company_mcs_number"] = df["installation_company_mcs_number"].apply(
-        lambda x: x.split(" ")[1] if not pd.isnull(x) else x
+    # Integer keys for pairs of company unique ID and certificate number
+    installer_keys = get_installer_keys_data(newest_hist_inst_batch)
+    mcs_instllr_data["installer_key"] = get_installer_key(
+        installer_keys,
+        mcs_instllr_data["company_unique_id"],
+        mcs_instllr_data["mcs_certificate_number"],
+    )
+    if (mcs_instllr_data["installer_key"] == -1).any():
+        print("Installer keys do not match the installer data, rebuilding keys...")
+        installer_keys = build_installer_keys(mcs_instllr_data)
+        mcs_instllr_data["installer_key"] = get_installer_key(
+            installer_keys,
+            mcs_instllr_data["company_unique_id"],
+            mcs_instllr_data["mcs_certificate_number"],
+        )
+
+    df["installation_company_mcs_number"] = (
+        df["installation_company_mcs_number"].str.split(" ").str[1]
+    )
+    df["installer_key"] = get_installer_key(
+        installer_keys,
+        df["company_unique_id"],
+        df["installation_company_mcs_number"],
     )
 
     merged_df = df.merge(
-        right=mcs_instllr_data,
+        right=mcs_instllr_data.drop(
+            columns=["company_unique_id", "mcs_certificate_number"]
+        ),
         how="outer",
-        left_on=["company_unique_id", "installation_company_mcs_number"],
-        right_on=["company_unique_id", "mcs_certificate_number"],
+        on="installer_key",
+    )
+
+    # Installers without installations only have a company unique ID from their key
+    company_unique_ids = installer_keys.drop_duplicates("installer_key").set_index(
+        "installer_key"
+    )["company_unique_id"]
+    merged_df["company_unique_id"] = merged_df["company_unique_id"].fillna(
+        pd.Series(
+            company_unique_ids.reindex(merged_df["installer_key"]).values,
+            index=merged_df.index,
+        )
     )
 
     merged_df.drop(
-        columns=["installation_company_mcs_number", "mcs_certificate_number"],
+        columns=["installation_company_mcs_number", "installer_key"],
         inplace=True,
     )
 
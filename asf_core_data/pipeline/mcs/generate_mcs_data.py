@@ -29,6 +29,7 @@ from asf_core_data.pipeline.mcs.process.mcs_epc_joining import (
 
 from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
     colnames_dict,
+    build_installer_keys,
 )
 
 from asf_core_data.pipeline.mcs.process.process_historical_mcs_installers import (
@@ -39,7 +40,9 @@ from asf_core_data.getters.mcs_getters.get_mcs_installers import (
 )
 from asf_core_data.getters.mcs_getters.get_mcs_installations import (
     get_most_recent_raw_historical_installations_data,
+    get_processed_installations_data_by_batch,
 )
+from asf_core_data.getters.epc.epc_data import load_preprocessed_epc_data
 
 bucket_name = base_config.BUCKET_NAME
 mcs_installations_path = base_config.MCS_INSTALLATIONS_PATH
@@ -66,6 +69,9 @@ def generate_and_save_mcs(
     epc_data_path: str = base_config.ROOT_DATA_PATH,
     companies_house_api_key: str = os.environ.get("COMPANIES_HOUSE_API_KEY"),
     verbose=False,
+    previous_batch_date: str = None,
+    previous_epc_batch: str = None,
+    n_jobs: int = None,
 ):
     """Concatenates, generates and saves the different versions of the MCS-EPC data to S3.
     Different versions are a) just installation data, b) installation data with
@@ -73,8 +79,20 @@ def generate_and_save_mcs(
     to the most recent inspection and d) with the most recent EPC from before
     the HP installation if one exists or the earliest EPC from after the HP
     installation otherwise.
+
+    If previous_batch_date is given, the MCS-EPC data is joined incrementally: only new
+    installations and EPC records that are not in previous_epc_batch are matched,
+    reusing the matches of the previous "full" MCS-EPC data.
+    previous_epc_batch is the EPC batch that was used for the previous "full" data.
+
+    n_jobs sets the number of processes for matching MCS and EPC records by postcode area.
     """
 
+    if previous_batch_date is not None and previous_epc_batch is None:
+        raise ValueError(
+            "previous_epc_batch is required for joining the MCS-EPC data incrementally."
+        )
+
     today = date.today().strftime("%y%m%d")
 
     no_epc_path, full_epc_path, _, most_relevant_epc_path = [
@@ -132,15 +150,43 @@ def generate_and_save_mcs(
     )
     print("Saved in S3: " + installers_path)
 
+    installer_keys_path = (
+        base_config.PREPROCESSED_MCS_HISTORICAL_INSTALLER_KEYS_FILE_PATH.format(
+            date_historical_installers_received
+        )
+    )
+    save_to_s3(
+        bucket_name,
+        build_installer_keys(processed_historical_installers),
+        installer_keys_path,
+    )
+    print("Saved in S3: " + installer_keys_path)
+
     processed_mcs = get_processed_installations_data()
     save_to_s3(bucket_name, processed_mcs, no_epc_path)
     print("Saved in S3: " + no_epc_path)
 
+    previous_joined = None
+    previous_epcs = None
+    if previous_batch_date is not None:
+        previous_joined = get_processed_installations_data_by_batch(
+            batch_date=previous_batch_date, epc_version="full"
+        )
+        previous_epcs = load_preprocessed_epc_data(
+            data_path="S3",
+            version="preprocessed",
+            batch=previous_epc_batch,
+            usecols=["ADDRESS1", "POSTCODE"],
+        )
+
     fully_joined_mcs_epc = join_mcs_epc_data(
         epc_data_path=epc_data_path,
         hps=processed_mcs,
         all_records=True,
         verbose=verbose,
+        previous_joined=previous_joined,
+        previous_epcs=previous_epcs,
+        n_jobs=n_jobs,
     )
     save_to_s3(bucket_name, fully_joined_mcs_epc, full_epc_path)
     print("Saved in S3: " + full_epc_path)
@@ -12,28 +12,83 @@ Overall process is as follows:
 """
 
 
-import recordlinkage as rl
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from jellyfish import jaro_winkler_similarity
 
 from asf_core_data.pipeline.mcs.process.process_mcs_installations import (
     get_processed_installations_data,
 )
 from asf_core_data.getters.epc.epc_data import (
     load_preprocessed_epc_data,
+    load_preprocessed_epc_data_rows,
 )
+from asf_core_data.getters.epc import data_batches
 from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
     remove_punctuation,
-    extract_token_set,
+    remove_punctuation_series,
+    extract_token_set_hashes,
 )
 
 from asf_core_data.config import base_config
+from asf_core_data import Path
+
+epc_address_features = ["ADDRESS1", "ADDRESS2", "POSTCODE"]
+
+epc_features = [
+    "UPRN",
+    "LMK_KEY",
+    "ADDRESS1",
+    "ADDRESS2",
+    "POSTCODE",
+    "INSPECTION_DATE",
+    "TRANSACTION_TYPE",
+    "TENURE",
+    "CURRENT_ENERGY_RATING",
+    "POTENTIAL_ENERGY_RATING",
+    "PROPERTY_TYPE",
+    "BUILT_FORM",
+    "NUMBER_HABITABLE_ROOMS",
+    "CONSTRUCTION_AGE_BAND",
+    "TOTAL_FLOOR_AREA",
+    "LIGHTING_ENERGY_EFF",
+    "FLOOR_ENERGY_EFF",
+    "WINDOWS_ENERGY_EFF",
+    "WALLS_ENERGY_EFF",
+    "ROOF_ENERGY_EFF",
+    "MAINHEAT_DESCRIPTION",
+]
 
 
 #### PREPROCESSING
 
 
+def standardise_hp_addresses(hps):
+    """Standardise the addresses of HP installations for matching.
+    Args:
+        hps (Dataframe): Dataframe with address_1 and address_2 fields.
+    Returns:
+        list: Standardised addresses.
+    """
+
+    return [
+        # Make address 1 and 2 lowercase, strip whitespace,
+        # and combine into a single string separated by a space
+        remove_punctuation(add1).lower().strip()
+        + " "
+        + remove_punctuation(add2).lower().strip()
+        for add1, add2 in zip(hps["address_1"], hps["address_2"])
+    ]
+
+
 def prepare_hps(hps):
     """Prepare Dataframe of HP installations by adding
     standardised_postcode, standardised_address and numeric_tokens fields.
+    numeric_tokens holds the hashes of the numeric token sets, see extract_token_set_hashes().
     Args:
         hps (Dataframe): Dataframe with postcode, address_1 and address_2 fields.
     Returns:
@@ -44,50 +99,158 @@ def prepare_hps(hps):
         hps["postcode"].fillna("unknown").str.upper().str.replace(" ", "")
     )
 
-    hps["standardised_address"] = [
-        # Make address 1 and 2 lowercase, strip whitespace,
-        # and combine into a single string separated by a space
-        remove_punctuation(add1).lower().strip()
-        + " "
-        + remove_punctuation(add2).lower().strip()
-        for add1, add2 in zip(hps["address_1"], hps["address_2"])
-    ]
+    hps["standardised_address"] = standardise_hp_addresses(hps)
 
-    hps["numeric_tokens"] = [
-        extract_token_set(address, postcode, base_config.MCS_EPC_MAX_TOKEN_LENGTH)
-        for address, postcode in zip(hps["standardised_address"], hps["postcode"])
-    ]
+    hps["numeric_tokens"] = extract_token_set_hashes(
+        hps["standardised_address"],
+        hps["postcode"],
+        base_config.MCS_EPC_MAX_TOKEN_LENGTH,
+    )
 
     return hps
 
 
-def prepare_epcs(epcs):
-    """Prepare Dataframe of EPC records by adding
-    standardised_postcode, standardised_address and numeric_tokens fields.
+def prepare_epc_addresses(epcs):
+    """Compute standardised_postcode, standardised_address and
+    numeric_tokens fields for EPC records, with numeric_tokens
+    holding the hashes of the numeric token sets, see extract_token_set_hashes().
     Args:
-        epcs (Dataframe): EPC records with POSTCODE, ADDRESS1 and ADDRESS2 fields.
+        epcs (Dataframe): EPC records with POSTCODE and ADDRESS1 fields.
     Returns:
-        Dataframe: EPC records with added fields.
+        Dataframe: standardised_postcode, standardised_address and
+        numeric_tokens fields, with the index of epcs.
     """
 
+    prepared = pd.DataFrame(index=epcs.index)
+
     # Remove spaces, uppercase and strip whitespace from
     # postcodes in order to exact match on this field
-    epcs["standardised_postcode"] = (
+    prepared["standardised_postcode"] = (
         epcs["POSTCODE"].fillna("UNKNOWN").str.upper().str.replace(" ", "")
     )
 
     # Remove punctuation, lowercase and concatenate address fields
     # for approximate matching
-    epcs["standardised_address"] = [
-        remove_punctuation(address).lower().strip() for address in epcs["ADDRESS1"]
-    ]
+    prepared["standardised_address"] = (
+        remove_punctuation_series(epcs["ADDRESS1"]).str.lower().str.strip()
+    )
 
-    epcs["numeric_tokens"] = [
-        extract_token_set(address, postcode, base_config.MCS_EPC_MAX_TOKEN_LENGTH)
-        for address, postcode in zip(
-            epcs["standardised_address"].fillna(""), epcs["POSTCODE"].fillna("")
-        )
-    ]
+    prepared["numeric_tokens"] = extract_token_set_hashes(
+        prepared["standardised_address"].fillna(""),
+        epcs["POSTCODE"].fillna(""),
+        base_config.MCS_EPC_MAX_TOKEN_LENGTH,
+    )
+
+    return prepared
+
+
+def get_epc_address_keys(epcs):
+    """Compute a key for the address of each EPC record by hashing the ADDRESS1
+    and POSTCODE fields, which are the only fields used for matching.
+    EPC records with the same key are prepared and matched in the same way.
+    Unlike LMK_KEY, which is missing for the Scottish records, every record has a key.
+    Args:
+        epcs (Dataframe): EPC records with POSTCODE and ADDRESS1 fields.
+    Returns:
+        Series: Address keys (uint64), with the index of epcs.
+    """
+
+    return pd.util.hash_pandas_object(epcs[["ADDRESS1", "POSTCODE"]], index=False)
+
+
+def load_prepared_epc_addresses(cache_path, batch):
+    """Load cached prepared EPC addresses, see prepare_epc_addresses().
+    The cache is only valid for the same EPC batch and MCS_EPC_MAX_TOKEN_LENGTH.
+    Args:
+        cache_path (str): Path to Parquet cache file, starting with "s3://" for files on S3.
+        batch (str): EPC batch name.
+    Returns:
+        Dataframe: Prepared addresses indexed by address_key, see get_epc_address_keys().
+        None if there is no valid cache.
+    """
+
+    try:
+        table = pq.read_table(str(cache_path))
+    except OSError:
+        return None
+
+    metadata = table.schema.metadata or {}
+    if (
+        "address_key" not in table.column_names
+        or table.schema.field("numeric_tokens").type != pa.uint64()
+        or metadata.get(b"batch") != batch.encode()
+        or metadata.get(b"max_token_length")
+        != str(base_config.MCS_EPC_MAX_TOKEN_LENGTH).encode()
+    ):
+        return None
+
+    return table.to_pandas().set_index("address_key")
+
+
+def save_prepared_epc_addresses(prepared, cache_path, batch):
+    """Save prepared EPC addresses indexed by address_key to a Parquet cache,
+    together with the EPC batch and MCS_EPC_MAX_TOKEN_LENGTH.
+    Args:
+        prepared (Dataframe): Prepared addresses indexed by address_key.
+        cache_path (str): Path to Parquet cache file, starting with "s3://" for files on S3.
+        batch (str): EPC batch name.
+    """
+
+    prepared = prepared.rename_axis("address_key").reset_index()
+
+    table = pa.Table.from_pandas(prepared, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {
+            **(table.schema.metadata or {}),
+            b"batch": batch.encode(),
+            b"max_token_length": str(base_config.MCS_EPC_MAX_TOKEN_LENGTH).encode(),
+        }
+    )
+
+    if not str(cache_path).startswith("s3://"):
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, str(cache_path))
+
+
+def prepare_epcs(epcs, cache_path=None, batch=None):
+    """Prepare Dataframe of EPC records by adding
+    standardised_postcode, standardised_address and numeric_tokens fields.
+    Args:
+        epcs (Dataframe): EPC records with POSTCODE and ADDRESS1 fields.
+        cache_path (str, optional): Path to a Parquet cache of prepared addresses by address key,
+        see get_epc_address_keys(). Only addresses that are not in the cache are prepared
+        and then added to the cache. Defaults to None, not using a cache.
+        batch (str, optional): EPC batch name of the records. The cache is invalidated
+        when the batch changes. Required if cache_path is given. Defaults to None.
+    Returns:
+        Dataframe: EPC records with added fields.
+    """
+
+    if cache_path is None:
+        prepared = prepare_epc_addresses(epcs)
+
+    else:
+        cached = load_prepared_epc_addresses(cache_path, batch)
+        if cached is None:
+            cached = prepare_epc_addresses(epcs.iloc[:0]).set_axis(
+                pd.Index([], name="address_key", dtype=np.uint64)
+            )
+
+        address_keys = get_epc_address_keys(epcs)
+
+        # Prepare each new address once
+        missing = ~address_keys.isin(cached.index) & ~address_keys.duplicated()
+
+        if missing.any():
+            new = prepare_epc_addresses(epcs.loc[missing])
+            new.index = address_keys[missing].values
+            cached = pd.concat([cached, new])
+            save_prepared_epc_addresses(cached, cache_path, batch)
+
+        prepared = cached.loc[address_keys.values].set_axis(epcs.index)
+
+    for feat in ["standardised_postcode", "standardised_address", "numeric_tokens"]:
+        epcs[feat] = prepared[feat]
 
     return epcs
 
@@ -97,7 +260,116 @@ def prepare_epcs(epcs):
 #### JOINING
 
 
-def form_matching(df1, df2):
+def build_postcode_index(df):
+    """Build an index from standardised_postcode to the positions of the
+    records with that postcode. The index only needs to be built once
+    and can then be used for blocking any number of records against df.
+    Args:
+        df (Dataframe): Dataframe with standardised_postcode field.
+    Returns:
+        dict: Distinct postcodes ("postcodes"), record positions grouped
+        by postcode ("positions") and the offsets of each postcode's
+        positions ("offsets").
+    """
+
+    codes, postcodes = pd.factorize(df["standardised_postcode"])
+
+    # Records without postcode are not indexed
+    positions = np.argsort(codes, kind="stable")
+    positions = positions[codes[positions] != -1]
+    offsets = np.concatenate(
+        [[0], np.cumsum(np.bincount(codes[codes != -1], minlength=len(postcodes)))]
+    )
+
+    return {
+        "postcodes": pd.Index(postcodes),
+        "positions": positions,
+        "offsets": offsets,
+    }
+
+
+def get_candidate_pairs(df1, postcode_index):
+    """Get all pairs of records in df1 and the indexed records with the same
+    standardised_postcode, in the same order as a blocked recordlinkage index.
+    Args:
+        df1 (Dataframe): Dataframe with standardised_postcode field.
+        postcode_index (dict): Postcode index, e.g. from build_postcode_index().
+    Returns:
+        tuple: Positions of the paired records in df1 and in the indexed Dataframe.
+    """
+
+    codes = postcode_index["postcodes"].get_indexer(df1["standardised_postcode"])
+    left = np.flatnonzero(codes != -1)
+    codes = codes[left]
+
+    starts = postcode_index["offsets"][codes]
+    counts = postcode_index["offsets"][codes + 1] - starts
+    left = np.repeat(left, counts)
+
+    # Position of each pair within its block
+    within_block = np.arange(counts.sum()) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    right = postcode_index["positions"][np.repeat(starts, counts) + within_block]
+
+    return left, right
+
+
+def compare_token_sets(tokens1, tokens2, left, right):
+    """Compare numeric token sets of paired records exactly,
+    with a single integer comparison of their hashes for each pair.
+    Args:
+        tokens1 (Series): Numeric token set hashes of the first records,
+        e.g. from extract_token_set_hashes().
+        tokens2 (Series): Numeric token set hashes of the second records.
+        left (array): Positions of the paired records in tokens1.
+        right (array): Positions of the paired records in tokens2.
+    Returns:
+        array: 1 for identical token sets, otherwise 0.
+    """
+
+    return (np.asarray(tokens1)[left] == np.asarray(tokens2)[right]).astype(np.float64)
+
+
+def compare_addresses(addresses1, addresses2, left, right):
+    """Compute the Jaro-Winkler similarity of the addresses of paired records.
+    Records at the same postcode often share the same address
+    (e.g. several EPC records for a property), so the similarity is only
+    computed once for each distinct pair of addresses.
+    Args:
+        addresses1 (Series): Addresses of the first records.
+        addresses2 (Series): Addresses of the second records.
+        left (array): Positions of the paired records in addresses1.
+        right (array): Positions of the paired records in addresses2.
+    Returns:
+        array: Jaro-Winkler similarity in [0, 1], 0 for missing addresses.
+    """
+
+    codes1, uniques1 = pd.factorize(addresses1)
+    codes2, uniques2 = pd.factorize(addresses2)
+    codes1, codes2 = codes1[left], codes2[right]
+
+    scores = np.zeros(len(left), dtype=np.float64)
+    not_missing = (codes1 != -1) & (codes2 != -1)
+
+    pair_codes, unique_pairs = pd.factorize(
+        codes1[not_missing].astype(np.int64) * len(uniques2) + codes2[not_missing]
+    )
+    unique_scores = np.array(
+        [
+            jaro_winkler_similarity(
+                uniques1[pair // len(uniques2)], uniques2[pair % len(uniques2)]
+            )
+            for pair in unique_pairs
+        ],
+        dtype=np.float64,
+    )
+    scores[not_missing] = unique_scores[pair_codes]
+
+    return scores
+
+
+def form_matching(df1, df2, postcode_index=None):
     """Form a matching between two Dataframes.
     Initially an index is formed between records with shared
     standardised_postcode, then the records are compared for
@@ -115,6 +387,9 @@ def form_matching(df1, df2):
         numeric_tokens and standardised_address fields.
         df2 (Dataframe): Dataframe with standardised_postcode,
         numeric_tokens and standardised_address fields.
+        postcode_index (dict, optional): Postcode index of df2,
+        e.g. from build_postcode_index(). If None, the index is built.
+        Defaults to None.
     Returns:
         Dataframe: Indices of df1 and matched indices in df2
         along with similarity scores for numeric tokens (value in {0, 1})
@@ -123,34 +398,138 @@ def form_matching(df1, df2):
 
     # Index
     print("- Forming an index...")
-    indexer = rl.Index()
-    indexer.block(on="standardised_postcode")
-    candidate_pairs = indexer.index(df1, df2)
+    if postcode_index is None:
+        postcode_index = build_postcode_index(df2)
+    left, right = get_candidate_pairs(df1, postcode_index)
 
     # Compare
     print("- Forming a comparison...")
-    comp = rl.Compare()
-    comp.exact("numeric_tokens", "numeric_tokens", label="numerics")
-    comp.string(
-        "standardised_address",
-        "standardised_address",
-        method="jarowinkler",
-        label="address_score",
+    numerics = compare_token_sets(
+        df1["numeric_tokens"], df2["numeric_tokens"], left, right
+    )
+    address_score = compare_addresses(
+        df1["standardised_address"], df2["standardised_address"], left, right
     )
 
     # Classify
     print("- Computing a matching...")
-    matching = comp.compute(candidate_pairs, df1, df2)
+    matching = pd.DataFrame(
+        {"numerics": numerics, "address_score": address_score},
+        index=pd.MultiIndex.from_arrays(
+            [df1.index.values[left], df2.index.values[right]]
+        ),
+    )
 
     return matching
 
 
+def form_matching_in_shards(df1, df2, n_jobs):
+    """Form a matching between two Dataframes like form_matching(),
+    with the records split into shards by postcode area (the leading letters
+    of standardised_postcode). As records are only compared within the same
+    postcode, the shards can be matched independently in parallel processes.
+    Args:
+        df1 (Dataframe): Dataframe with standardised_postcode,
+        numeric_tokens and standardised_address fields.
+        df2 (Dataframe): Dataframe with standardised_postcode,
+        numeric_tokens and standardised_address fields.
+        n_jobs (int): Number of processes to match the shards with.
+    Returns:
+        Dataframe: Same matching as form_matching().
+    """
+
+    features = ["standardised_postcode", "numeric_tokens", "standardised_address"]
+    areas1 = df1["standardised_postcode"].str.extract(r"^([A-Z]*)", expand=False)
+    areas2 = df2["standardised_postcode"].str.extract(r"^([A-Z]*)", expand=False)
+
+    shards1 = dict(iter(df1[features].groupby(areas1, sort=False)))
+    shards2 = dict(iter(df2[features].groupby(areas2, sort=False)))
+    areas = [area for area in shards1 if area in shards2]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        matchings = list(
+            pool.map(
+                form_matching,
+                [shards1[area] for area in areas],
+                [shards2[area] for area in areas],
+            )
+        )
+
+    if not matchings:
+        return form_matching(df1.iloc[:0], df2.iloc[:0])
+
+    # Order the pairs by the position of the df1 records, as in form_matching()
+    matching = pd.concat(matchings)
+    positions = df1.index.get_indexer(matching.index.get_level_values(0))
+
+    return matching.iloc[np.argsort(positions, kind="stable")]
+
+
+def get_matching(df1, df2, n_jobs=None):
+    """Form a matching between two Dataframes, in parallel if n_jobs > 1.
+    Args:
+        df1 (Dataframe): Dataframe with standardised_postcode,
+        numeric_tokens and standardised_address fields.
+        df2 (Dataframe): Dataframe with standardised_postcode,
+        numeric_tokens and standardised_address fields.
+        n_jobs (int, optional): Number of processes, see form_matching_in_shards().
+        Defaults to None, matching in a single process with form_matching().
+    Returns:
+        Dataframe: Matching as from form_matching().
+    """
+
+    if n_jobs is not None and n_jobs > 1:
+        return form_matching_in_shards(df1, df2, n_jobs)
+
+    return form_matching(df1, df2)
+
+
+def select_top_matches(matches, all_records=True):
+    """Select the matches with maximal address_score for each MCS record.
+    Args:
+        matches (Dataframe): Matches with level_0 (MCS index),
+        level_1 (EPC index) and address_score fields.
+        all_records (bool, optional): Whether all top matches should be kept
+        or just the first one for each MCS record. Defaults to True.
+    Returns:
+        Dataframe: level_0 and level_1 of the top matches, ordered by level_0.
+    """
+
+    # Rows in which address_score is maximal for the MCS record
+    max_score = matches.groupby("level_0")["address_score"].transform("max")
+    top_matches = matches.loc[
+        matches["address_score"] == max_score, ["level_0", "level_1"]
+    ]
+
+    if not all_records:
+        # Keep the first occurrence at which address_score is maximal
+        top_matches = top_matches.loc[~top_matches["level_0"].duplicated()]
+
+    return top_matches.sort_values("level_0", kind="stable").reset_index(drop=True)
+
+
+def get_good_matches(matching):
+    """Filter a matching to the matches with identical numeric tokens
+    and an address score above the matching parameter.
+    Args:
+        matching (Dataframe): Matching, e.g. from form_matching().
+    Returns:
+        Dataframe: Good matches with level_0 (MCS index) and level_1 (EPC index).
+    """
+
+    return matching[
+        (matching["numerics"] == 1)
+        & (matching["address_score"] >= base_config.MCS_EPC_MATCHING_PARAMETER)
+    ].reset_index()
+
+
 def join_prepared_mcs_epc_data(
     hps,
     epcs,
     all_records=True,
     drop_epc_address=True,
     verbose=True,
+    n_jobs=None,
 ):
     """Join prepared MCS and EPC data.
     Args:
@@ -166,41 +545,172 @@ def join_prepared_mcs_epc_data(
         matches are sensible. Defaults to True.
         verbose (bool, optional): Whether or not to print diagnostic information
         about the matching, e.g. number of matched records. Defaults to True.
+        n_jobs (int, optional): Number of processes for matching records
+        by postcode area. Defaults to None, matching in a single process.
     Returns:
         Dataframe: Merged MCS and EPC records.
     """
 
     print("Forming a matching...")
-    matching = form_matching(df1=hps, df2=epcs)
+    matching = get_matching(hps, epcs, n_jobs=n_jobs)
 
-    # First ensure that all matches are above the matching parameter
-    good_matches = matching[
-        (matching["numerics"] == 1)
-        & (matching["address_score"] >= base_config.MCS_EPC_MATCHING_PARAMETER)
-    ].reset_index()
+    good_matches = get_good_matches(matching)
+    top_matches = select_top_matches(good_matches, all_records=all_records)
 
-    if all_records:
-        top_matches = (
-            good_matches.groupby("level_0")
-            # Get all level_1 indices of rows in which address_score is maximal
-            .apply(
-                lambda df: df.loc[
-                    df["address_score"] == df["address_score"].max(), "level_1"
-                ]
-            )
-            .droplevel(1)
-            .reset_index()
-            .rename(columns={"index": "level_0"})
-        )
+    return merge_top_matches(
+        hps,
+        epcs,
+        top_matches,
+        drop_epc_address=drop_epc_address,
+        verbose=verbose,
+    )
 
-    else:
-        # Get the level_1 index of the first occurrence at which address_score is maximal
-        top_match_indices = good_matches.groupby("level_0")["address_score"].idxmax()
 
-        # Filter the matches df to just the top matches
-        top_matches = good_matches.loc[top_match_indices].drop(
-            columns=["numerics", "address_score"]
+def join_prepared_mcs_epc_data_incrementally(
+    hps,
+    epcs,
+    previous_joined,
+    previous_epcs,
+    drop_epc_address=True,
+    verbose=True,
+    n_jobs=None,
+):
+    """Join prepared MCS and EPC data, reusing the matches of a previous join
+    with all_records=True. Only the following MCS records are matched against all EPC records:
+    - MCS records with an address that was not matched previously
+    - MCS records that previously matched an EPC address that no longer exists
+    - MCS records with a good match among the EPC records with new addresses
+    EPC records are identified by their address key, see get_epc_address_keys(),
+    as EPC records with the same address are matched in the same way.
+    For all other MCS records, the previous top matches are still the top matches,
+    so the result is the same as joining with join_prepared_mcs_epc_data().
+    Args:
+        hps (Dataframe): Dataframe with standardised_postcode,
+        numeric_tokens and standardised_address fields.
+        epcs (Dataframe): Dataframe with ADDRESS1, POSTCODE, standardised_postcode,
+        numeric_tokens and standardised_address fields.
+        previous_joined (Dataframe): Previously joined MCS-EPC records
+        with postcode, address_1, address_2 and original_epc_index fields,
+        e.g. "mcs_installations_epc_full" data.
+        previous_epcs (Dataframe): EPC records used for the previous join
+        with ADDRESS1 and POSTCODE fields, indexed by original_epc_index.
+        drop_epc_address (bool, optional): Whether or not to drop addresses
+        from the EPC records. Defaults to True.
+        verbose (bool, optional): Whether or not to print diagnostic information
+        about the matching, e.g. number of matched records. Defaults to True.
+        n_jobs (int, optional): Number of processes for matching records
+        by postcode area. Defaults to None, matching in a single process.
+    Returns:
+        Dataframe: Merged MCS and EPC records.
+    """
+
+    key = ["postcode", "standardised_address"]
+
+    epc_address_keys = get_epc_address_keys(epcs)
+    previous_epc_address_keys = get_epc_address_keys(previous_epcs)
+    new_epcs = ~epc_address_keys.isin(previous_epc_address_keys.values).values
+
+    previous_addresses = pd.DataFrame(
+        {
+            "postcode": previous_joined["postcode"].values,
+            "standardised_address": standardise_hp_addresses(previous_joined),
+        }
+    )
+    epc_positions = previous_epc_address_keys.index.get_indexer(
+        previous_joined["original_epc_index"]
+    )
+    # Previous matches that are not in previous_epcs cannot be found again
+    previous_addresses["lost"] = previous_joined[
+        "original_epc_index"
+    ].notna().values & (epc_positions == -1)
+
+    # Previous top matches by MCS address, on the current EPC index
+    previous_matches = (
+        previous_addresses.loc[epc_positions != -1, key]
+        .assign(
+            address_key=previous_epc_address_keys.values[
+                epc_positions[epc_positions != -1]
+            ]
+        )
+        .drop_duplicates()
+        .merge(
+            pd.DataFrame(
+                {"address_key": epc_address_keys.values, "level_1": epcs.index}
+            ),
+            how="left",
+            on="address_key",
         )
+    )
+    previous_matches["lost"] = previous_matches["level_1"].isna()
+
+    # MCS records with a new address or a lost match need to be matched again
+    previous_status = (
+        pd.concat([previous_addresses, previous_matches[key + ["lost"]]])
+        .groupby(key, dropna=False)["lost"]
+        .any()
+        .reset_index()
+    )
+    rematch = (
+        hps[key]
+        .merge(previous_status, how="left", on=key)["lost"]
+        .fillna(True)
+        .astype(bool)
+        .values
+    )
+
+    # As well as MCS records with a good match among the EPC records with new addresses
+    print("Forming a matching with new EPC records...")
+    new_good_matches = get_good_matches(
+        get_matching(hps.loc[~rematch], epcs.loc[new_epcs], n_jobs=n_jobs)
+    )
+    rematch |= hps.index.isin(new_good_matches["level_0"])
+
+    print("Forming a matching for {} MCS records...".format(rematch.sum()))
+    good_matches = get_good_matches(get_matching(hps.loc[rematch], epcs, n_jobs=n_jobs))
+    top_matches = select_top_matches(good_matches, all_records=True)
+
+    previous_top_matches = (
+        hps.loc[~rematch, key]
+        .rename_axis("level_0")
+        .reset_index()
+        .merge(previous_matches.dropna(subset=["level_1"]), how="inner", on=key)[
+            ["level_0", "level_1"]
+        ]
+        .astype({"level_1": epcs.index.dtype})
+    )
+
+    # Order the top matches as in a full join: by MCS index and EPC position
+    top_matches = pd.concat([previous_top_matches, top_matches], ignore_index=True)
+    top_matches["epc_position"] = epcs.index.get_indexer(top_matches["level_1"])
+    top_matches = (
+        top_matches.sort_values(["level_0", "epc_position"], kind="stable")
+        .drop(columns="epc_position")
+        .reset_index(drop=True)
+    )
+
+    return merge_top_matches(
+        hps,
+        epcs,
+        top_matches,
+        drop_epc_address=drop_epc_address,
+        verbose=verbose,
+    )
+
+
+def merge_top_matches(hps, epcs, top_matches, drop_epc_address=True, verbose=True):
+    """Merge prepared MCS and EPC data using the top matches.
+    Args:
+        hps (Dataframe): Prepared MCS records.
+        epcs (Dataframe): Prepared EPC records.
+        top_matches (Dataframe): level_0 (MCS index) and level_1 (EPC index)
+        of the top matches, e.g. from select_top_matches().
+        drop_epc_address (bool, optional): Whether or not to drop addresses
+        from the EPC records. Defaults to True.
+        verbose (bool, optional): Whether or not to print diagnostic information
+        about the matching, e.g. number of matched records. Defaults to True.
+    Returns:
+        Dataframe: Merged MCS and EPC records.
+    """
 
     print("Joining the data...")
     merged = (
@@ -261,6 +771,32 @@ def join_prepared_mcs_epc_data(
     return merged
 
 
+def add_epc_features(joined, epcs):
+    """Add the EPC features to MCS-EPC records that were joined
+    using the EPC addresses only, as if the EPC records had
+    included all features when joining.
+    Args:
+        joined (Dataframe): Joined MCS-EPC records with original_epc_index field.
+        epcs (Dataframe): EPC records indexed by original_epc_index,
+        e.g. from load_preprocessed_epc_data_rows().
+    Returns:
+        Dataframe: Joined MCS-EPC records with EPC features.
+    """
+
+    epcs = epcs.drop(
+        columns=["ADDRESS1", "ADDRESS2", "POSTTOWN", "POSTCODE"], errors="ignore"
+    )
+    epcs = epcs.reindex(joined["original_epc_index"]).set_axis(joined.index)
+
+    # EPC features follow original_epc_index, as in merge_top_matches()
+    columns = joined.columns.drop(epcs.columns, errors="ignore")
+    position = columns.get_loc("original_epc_index") + 1
+
+    return pd.concat(
+        [joined[columns[:position]], epcs, joined[columns[position:]]], axis=1
+    )
+
+
 def join_mcs_epc_data(
     epc_data_path=base_config.ROOT_DATA_PATH,
     hps=None,
@@ -268,6 +804,11 @@ def join_mcs_epc_data(
     all_records=True,
     drop_epc_address=True,
     verbose=True,
+    previous_joined=None,
+    previous_epcs=None,
+    epc_batch="newest",
+    cache_prepared_epcs=False,
+    n_jobs=None,
 ):
     """Produce joined MCS-EPC dataframe from "unprepared" data.
     Args:
@@ -275,64 +816,101 @@ def join_mcs_epc_data(
         hps (Dataframe, optional): MCS installation records.
         If None, records are fetched automatically. Defaults to None.
         epcs (Dataframe, optional): EPC records. If None, records
-        are fetched automatically. Defaults to None.
+        are fetched automatically: the addresses for matching and the remaining
+        features for the matched records only. Defaults to None.
         all_records (bool, optional): Whether or not to use all matching EPC
         records or just take one. Defaults to True.
         drop_epc_address (bool, optional): Whether or not to drop the address
         from the EPC records used for matching. Defaults to True.
         verbose (bool, optional): Whether or not to print diagnostic information.
         Defaults to True.
+        previous_joined (Dataframe, optional): Previously joined MCS-EPC records
+        with all_records=True. If given, only new MCS records and new EPC records are matched,
+        see join_prepared_mcs_epc_data_incrementally(). Defaults to None.
+        previous_epcs (Dataframe, optional): EPC records used for the previous join
+        with ADDRESS1 and POSTCODE fields, indexed by original_epc_index.
+        Required if previous_joined is given. Defaults to None.
+        epc_batch (str, optional): EPC data batch to load. Defaults to "newest".
+        cache_prepared_epcs (bool, optional): Whether to cache the prepared EPC addresses on S3,
+        next to the preprocessed EPC data of epc_batch, see prepare_epcs().
+        If epcs are given, they need to be from epc_batch. Defaults to False.
+        n_jobs (int, optional): Number of processes for matching records
+        by postcode area. Defaults to None, matching in a single process.
     Returns:
         Dataframe: Matched MCS-EPC records.
     """
 
+    if previous_joined is not None and (not all_records or previous_epcs is None):
+        raise ValueError(
+            "Joining incrementally requires all_records=True and previous_epcs."
+        )
+
     if hps is None:
         print("Getting HP data...")
         hps = get_processed_installations_data()
 
-    if epcs is None:
+    load_epc_features = epcs is None
+
+    if load_epc_features:
         epc_version = "preprocessed" if all_records else "preprocessed_dedupl"
-        print("Getting EPC data...")
+        print("Getting EPC addresses...")
 
+        # Only the addresses are needed for matching, the remaining
+        # EPC features are loaded for the matched records afterwards
         epcs = load_preprocessed_epc_data(
             data_path="S3",
             version=epc_version,
-            batch="newest",
-            usecols=[
-                "UPRN",
-                "LMK_KEY",
-                "ADDRESS1",
-                "ADDRESS2",
-                "POSTCODE",
-                "INSPECTION_DATE",
-                "TRANSACTION_TYPE",
-                "TENURE",
-                "CURRENT_ENERGY_RATING",
-                "POTENTIAL_ENERGY_RATING",
-                "PROPERTY_TYPE",
-                "BUILT_FORM",
-                "NUMBER_HABITABLE_ROOMS",
-                "CONSTRUCTION_AGE_BAND",
-                "TOTAL_FLOOR_AREA",
-                "LIGHTING_ENERGY_EFF",
-                "FLOOR_ENERGY_EFF",
-                "WINDOWS_ENERGY_EFF",
-                "WALLS_ENERGY_EFF",
-                "ROOF_ENERGY_EFF",
-                "MAINHEAT_DESCRIPTION",
-            ],
+            batch=epc_batch,
+            usecols=epc_address_features,
         )
 
     prepared_hps = prepare_hps(hps)
-    prepared_epcs = prepare_epcs(epcs)
 
-    joined = join_prepared_mcs_epc_data(
-        prepared_hps,
-        prepared_epcs,
-        all_records=all_records,
-        drop_epc_address=drop_epc_address,
-        verbose=verbose,
-    )
+    if cache_prepared_epcs:
+        cache_path = data_batches.get_batch_path(
+            base_config.PREPARED_EPC_ADDRESSES_PATH,
+            data_path="S3",
+            batch=epc_batch,
+            check_folder="output",
+        )
+        prepared_epcs = prepare_epcs(
+            epcs,
+            cache_path="s3://{}/{}".format(base_config.BUCKET_NAME, cache_path),
+            batch=cache_path.parent.name,
+        )
+    else:
+        prepared_epcs = prepare_epcs(epcs)
+
+    if previous_joined is not None:
+        joined = join_prepared_mcs_epc_data_incrementally(
+            prepared_hps,
+            prepared_epcs,
+            previous_joined,
+            previous_epcs,
+            drop_epc_address=drop_epc_address,
+            verbose=verbose,
+            n_jobs=n_jobs,
+        )
+    else:
+        joined = join_prepared_mcs_epc_data(
+            prepared_hps,
+            prepared_epcs,
+            all_records=all_records,
+            drop_epc_address=drop_epc_address,
+            verbose=verbose,
+            n_jobs=n_jobs,
+        )
+
+    if load_epc_features:
+        print("Getting EPC features for the matched records...")
+        matched_epcs = load_preprocessed_epc_data_rows(
+            joined["original_epc_index"].dropna().astype(int),
+            data_path="S3",
+            batch=epc_batch,
+            version=epc_version,
+            usecols=epc_features,
+        )
+        joined = add_epc_features(joined, matched_epcs)
 
     return joined
 
@@ -343,43 +921,46 @@ def select_most_relevant_epc(joined_df):
     to best reflect the status of the property at the time of HP installation).
     The EPC chosen is the latest one before the installation if it exists;
     otherwise it is the earliest one after the installation.
+    The records of each installation are ordered by INSPECTION_DATE, so the number
+    of EPCs on or before the commission date is where a searchsorted would insert it,
+    and gives the chosen record directly. Of EPCs with the same INSPECTION_DATE,
+    the last one in joined_df is chosen before the installation, the first one after.
     Args:
         joined_df (Dataframe): Joined MCS-EPC data. Assumed to
         contain INSPECTION_DATE, commission_date and original_mcs_index columns.
     Returns:
-        Dataframe: Most relevant MCS-EPC records.
+        Dataframe: Most relevant MCS-EPC records, sorted by INSPECTION_DATE.
     """
 
-    # Sort joined_df by INSPECTION_DATE
-    joined_df = joined_df.sort_values("INSPECTION_DATE").reset_index(drop=True)
+    joined_df = joined_df.reset_index(drop=True)
+    codes, mcs_indices = pd.factorize(joined_df["original_mcs_index"])
+    dates = joined_df["INSPECTION_DATE"]
 
     # Identify rows where the EPC data is before the MCS one
-    joined_df["epc_before_mcs"] = (
-        joined_df["INSPECTION_DATE"] <= joined_df["commission_date"]
-    )
+    epc_before_mcs = (dates <= joined_df["commission_date"]).values
 
-    # Identify indices of last EPC record before MCS
-    last_epc_before_mcs_indices = (
-        joined_df.reset_index()
-        .loc[joined_df["epc_before_mcs"]]
-        .groupby("original_mcs_index")
-        .tail(1)["index"]
-        .values
+    # Order the records of each installation by date, missing dates last,
+    # keeping the order of joined_df for equal dates
+    date_keys = np.where(
+        dates.isna().values, np.iinfo(np.int64).max, dates.values.view(np.int64)
+    )
+    order = np.lexsort((date_keys, codes))
+    order = order[codes[order] != -1]
+    sorted_codes = codes[order]
+
+    # As each installation has one commission date, its EPCs before MCS come first
+    starts = np.searchsorted(sorted_codes, np.arange(len(mcs_indices)))
+    n_before = np.bincount(
+        sorted_codes[epc_before_mcs[order]], minlength=len(mcs_indices)
     )
 
-    joined_df["last_epc_before_mcs"] = False
-    joined_df["last_epc_before_mcs"].iloc[last_epc_before_mcs_indices] = True
+    # Last EPC record before MCS if it exists, otherwise first EPC record after MCS
+    selected = order[np.where(n_before > 0, starts + n_before - 1, starts)]
 
-    # Filter to either "last EPC before MCS" or "EPC after MCS",
-    # then group by installation and take first record -
-    # this will be the last EPC before MCS
-    # if it exists, otherwise the first EPC after MCS
     filtered_data = (
-        joined_df.loc[joined_df["last_epc_before_mcs"] | ~joined_df["epc_before_mcs"]]
-        .groupby("original_mcs_index")
-        .head(1)
+        joined_df.iloc[np.sort(selected)]
+        .sort_values("INSPECTION_DATE", kind="stable")
         .reset_index(drop=True)
-        .drop(columns=["epc_before_mcs", "last_epc_before_mcs"])
     )
 
     return filtered_data
@@ -51,13 +51,15 @@ from asf_core_data.getters.mcs_getters.get_mcs_installations import (
 )
 from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
     rename_columns,
-    match_companies_house,
+    match_companies_house_bulk,
     clean_company_name,
     geocode_postcode,
     deal_with_versions_of_trading_as,
-    from_list_to_dictionary,
     map_position_of_subset_items,
     position_to_value,
+    get_trading_as_aliases,
+    find_connected_components,
+    build_installer_keys,
     drop_instances_test_accounts,
 )
 
@@ -102,22 +104,21 @@ def join_installation_and_design_vars(data: pd.DataFrame):
     """
 
     installation_cols = [col for col in data.columns if "installation" in col]
-    for col in installation_cols:
+    design_cols = [col.replace("installation", "design") for col in installation_cols]
+    for col, correspondent_design_var_name in zip(installation_cols, design_cols):
         new_date_var = col.replace("installation_", "")
-        correspondent_design_var_name = col.replace("installation", "design")
-        data[new_date_var] = data.apply(
-            lambda x: x[col]
-            if not pd.isnull(x[col])
-            else x[correspondent_design_var_name],
-            axis=1,
+        data[new_date_var] = data[col].combine_first(
+            data[correspondent_design_var_name]
         )
 
-        data.drop([col, correspondent_design_var_name], axis=1, inplace=True)
+    data.drop(installation_cols + design_cols, axis=1, inplace=True)
 
 
 def recompute_full_adress(
-    date_creation: datetime, first_commisioning_date: datetime, full_address: str
-) -> str:
+    date_creation: pd.Series,
+    first_commisioning_date: pd.Series,
+    full_address: pd.Series,
+) -> pd.Series:
     """
     If company date of creation happens before the first HP comissioning date
     then we keep the full address (good match), otherwise address to None (meaning a bad
@@ -130,13 +131,20 @@ def recompute_full_adress(
     Returns:
         recomputed full address
     """
-    if pd.isnull(date_creation) or pd.isnull(first_commisioning_date):
-        return full_address
-    return full_address if date_creation <= first_commisioning_date else None
+    good_match = (
+        date_creation.isna()
+        | first_commisioning_date.isna()
+        | (date_creation <= first_commisioning_date)
+    )
+
+    return full_address.where(good_match, None)
 
 
 def get_missing_installers_info(
-    installations: pd.DataFrame, installers: pd.DataFrame, companies_house_api_key: str
+    installations: pd.DataFrame,
+    installers: pd.DataFrame,
+    companies_house_api_key: str,
+    companies_house_cache_path: str = base_config.COMPANIES_HOUSE_CACHE_PATH,
 ) -> pd.DataFrame:
     """
     Gets information about installers missing from historical installers table, i.e.
@@ -157,6 +165,8 @@ def get_missing_installers_info(
         installations: historical installations table
         installers: historical installations table
         companies_house_api_key: Companies house personal API key
+        companies_house_cache_path: Path to local cache of Companies House results.
+            Defaults to base_config.COMPANIES_HOUSE_CACHE_PATH.
 
     Returns:
         missing installers information dataframe.
@@ -220,17 +230,18 @@ def get_missing_installers_info(
     ]
 
     # fuzzy match installer companies NOT in installer company data using companies house API to get address info
-    missing_installers[["full_address", "date_of_creation"]] = missing_installers.apply(
-        lambda x: match_companies_house(
-            x["installation_company_name"], companies_house_api_key
-        ),
-        axis=1,
+    missing_installers[["full_address", "date_of_creation"]] = (
+        match_companies_house_bulk(
+            missing_installers["installation_company_name"],
+            companies_house_api_key,
+            cache_path=companies_house_cache_path,
+        ).values
     )
 
     # date_of_creation type change: str -> datetime
-    missing_installers["date_of_creation"] = missing_installers[
-        "date_of_creation"
-    ].apply(lambda x: datetime.strptime(x, "%Y-%m-%d") if not pd.isnull(x) else x)
+    missing_installers["date_of_creation"] = pd.to_datetime(
+        missing_installers["date_of_creation"], format="%Y-%m-%d"
+    )
 
     # We only keep address info if the company creation date is before the first comissioning date (serves as a check)
     start_date_cols = [col for col in missing_installers if "start_date" in col]
@@ -238,20 +249,16 @@ def get_missing_installers_info(
         start_date_cols
     ].min(axis=1)
 
-    missing_installers["full_address"] = missing_installers.apply(
-        lambda x: recompute_full_adress(
-            x["date_of_creation"], x["first_commissioning_date"], x["full_address"]
-        ),
-        axis=1,
+    missing_installers["full_address"] = recompute_full_adress(
+        missing_installers["date_of_creation"],
+        missing_installers["first_commissioning_date"],
+        missing_installers["full_address"],
     )
 
     # extract address_1 and postcode from full_address variable
-    missing_installers["address_1"] = missing_installers["full_address"].apply(
-        lambda x: x.split(",")[0] if x is not None else None
-    )
-    missing_installers["postcode"] = missing_installers["full_address"].apply(
-        lambda x: x.split(",")[-1].strip() if x is not None else None
-    )
+    full_address_parts = missing_installers["full_address"].str.split(",")
+    missing_installers["address_1"] = full_address_parts.str[0]
+    missing_installers["postcode"] = full_address_parts.str[-1].str.strip()
 
     # rename columns to match installers table
     missing_installers.rename(
@@ -272,14 +279,14 @@ def get_missing_installers_info(
 
 
 def update_full_address(
-    address_1: str,
-    address_2: str,
-    town: str,
-    county: str,
-    postcode: str,
-    original_record: str,
-    full_address: str,
-) -> str:
+    address_1: pd.Series,
+    address_2: pd.Series,
+    town: pd.Series,
+    county: pd.Series,
+    postcode: pd.Series,
+    original_record: pd.Series,
+    full_address: pd.Series,
+) -> pd.Series:
     """
     Computes full_address by putting together the different lines in address
     (address_1, address_2, town, county and postcode) for original records.
@@ -294,15 +301,15 @@ def update_full_address(
     Returns:
         full adress
     """
-    if original_record:
-        full_address = []
-        for address_part in [address_1, address_2, town, county, postcode]:
-            if not pd.isnull(address_part):
-                full_address.append(address_part)
-        return ", ".join(full_address)
+    joined_address = pd.Series("", index=full_address.index)
+    for address_part in [address_1, address_2, town, county, postcode]:
+        separator = np.where(joined_address == "", "", ", ")
+        joined_address = joined_address.where(
+            address_part.isna(), joined_address + separator + address_part.astype(str)
+        )
 
     # if not original record, we have the full address from Companies House
-    return full_address
+    return joined_address.where(original_record.astype(bool), full_address)
 
 
 def create_certified_flags(data: pd.DataFrame):
@@ -325,52 +332,6 @@ def create_certified_flags(data: pd.DataFrame):
         data[flag_var] = ~pd.isnull(data[col])
 
 
-def dictionary_mapping_trading_as_company_names(
-    trading_as_companies: pd.DataFrame,
-) -> dict:
-    """
-    Creates a dictionary mapping company names containing the "trading as" in the name.
-
-    As an example, if we have 3 original installer names:
-    - "Company A"
-    - "Company B"
-    - "Company A trading as Company B"
-    They should all be identified as the same company, e.g. identified as "Company A".
-
-    Args:
-        trading_as_companies: dataframe containing a processed_company_name variable where
-        company names contain the "trading as" expression.
-    Returns:
-        A dictionary mapping company names.
-    """
-
-    # For each instance in data, it creates a list with all possible versions of each company names
-    # splitting string by "trading as". E.g. "A trading as B" -> ["A", "B"]
-    trading_as_companies["list_of_companies"] = trading_as_companies[
-        "processed_company_name"
-    ].str.split(" trading as ")
-
-    # Adding full name to the list as well : ["A", "B", "A trading as B"]
-    trading_as_companies["list_of_companies"] = trading_as_companies.apply(
-        lambda x: x["list_of_companies"] + [x["processed_company_name"]], axis=1
-    )
-
-    # Transforms the list into a dictionary where each key is matched to the first value in the list:
-    # ["A", "B", "A trading as B"] -> {"B":"A", "A trading as B":"A"}
-    trading_as_companies["dictionary_of_companies"] = trading_as_companies[
-        "list_of_companies"
-    ].apply(from_list_to_dictionary)
-
-    # Transforms the pd.Series trading_as_companies["dictionary_of_companies"] into one dictionary
-    trading_as_dictionary = {
-        k: v
-        for d in trading_as_companies["dictionary_of_companies"]
-        for k, v in d.items()
-    }
-
-    return trading_as_dictionary
-
-
 def map_installers_same_location_different_id(
     postcodes: list, installer_data: pd.DataFrame
 ) -> dict:
@@ -431,7 +392,58 @@ def map_installers_same_location_different_id(
     return new_matches
 
 
-def create_installer_unique_id(installer_data: pd.DataFrame):
+def resolve_installer_aliases(
+    company_names: pd.Series, alias_edges: list, links: list
+) -> pd.Series:
+    """
+    Resolves company names to one company unique ID per group of linked names.
+    Links are followed transitively, e.g. "a trading as b" and "b trading as c"
+    are all identified as "a".
+
+    The ID of a group is the first name (in order of appearance) that is not an alias
+    of another company, or the first name if all names are aliases.
+
+    Args:
+        company_names: processed company names
+        alias_edges: (alias, company) pairs, e.g. from get_trading_as_aliases()
+        links: other pairs of names that refer to the same company
+    Returns:
+        Company unique ID for each company name.
+    """
+
+    names = list(
+        dict.fromkeys(
+            list(company_names)
+            + [name for edge in alias_edges + links for name in edge]
+        )
+    )
+    positions = {name: position for position, name in enumerate(names)}
+    components = find_connected_components(
+        len(names),
+        [
+            (positions[name_1], positions[name_2])
+            for name_1, name_2 in alias_edges + links
+        ],
+    )
+
+    aliases = {alias for alias, _ in alias_edges}
+    component_ids = {}
+    for name, component in zip(names, components):
+        if component not in component_ids or (
+            component_ids[component] in aliases and name not in aliases
+        ):
+            component_ids[component] = name
+
+    return company_names.map(
+        {name: component_ids[component] for name, component in zip(names, components)}
+    )
+
+
+def create_installer_unique_id(
+    installer_data: pd.DataFrame,
+    link_certificate_numbers: bool = False,
+    link_same_location: bool = False,
+):
     """
     Creates a string unique identifier for each installer company, since multiple company names might
     refer to the same installer.
@@ -441,11 +453,17 @@ def create_installer_unique_id(installer_data: pd.DataFrame):
     Identifiers are created by transforming the original company names:
     - Cleaning the company name (strings to lowe case, removing stopwords and punctuation);
     - Merge all different "trading as" expressions together;
-    - Creating a dictionary to map companies trading as other companies to be identified as the same;
-    - Creating a dictionary to map companies with slightly different names with address in the same location;
+    - Linking companies trading as other companies, including chains of "trading as" names;
+    - Optionally, linking companies with the same MCS certificate number;
+    - Optionally, linking companies with slightly different names with address in the same location;
+    - Identifying all linked companies by the same ID.
 
     Args:
         installer_data: historical installers data
+        link_certificate_numbers: whether companies with the same MCS certificate number
+            are the same company. Defaults to False, keeping the IDs given by the company names.
+        link_same_location: whether companies with the same postcode and similar address_1
+            are the same company. Defaults to False, as this leads to false positives.
     """
     # Cleaning company name
     installer_data["processed_company_name"] = installer_data["company_name"].apply(
@@ -457,47 +475,47 @@ def create_installer_unique_id(installer_data: pd.DataFrame):
         "processed_company_name"
     ].apply(deal_with_versions_of_trading_as)
 
-    # Unique companies containing "trading as" in the name
-    trading_as_companies = installer_data[
-        installer_data["processed_company_name"].str.contains("trading as")
-    ][["processed_company_name"]]
-    trading_as_companies.drop_duplicates("processed_company_name", inplace=True)
+    # Companies containing "trading as" in the name are aliases of the first company
+    trading_as_aliases = get_trading_as_aliases(
+        installer_data["processed_company_name"].unique()
+    )
+
+    links = []
+
+    # Companies with the same certificate number
+    if link_certificate_numbers:
+        certified_companies = installer_data[
+            ["mcs_certificate_number", "processed_company_name"]
+        ].dropna()
+        certified_companies["first_company_name"] = certified_companies.groupby(
+            "mcs_certificate_number"
+        )["processed_company_name"].transform("first")
+        links += list(
+            certified_companies[
+                ["processed_company_name", "first_company_name"]
+            ].itertuples(index=False, name=None)
+        )
 
-    # Creating dicitionary to map "trading as" companies to the same company name
-    trading_as_dictionary = dictionary_mapping_trading_as_company_names(
-        trading_as_companies
-    )
+    # Companies with the same location
+    if link_same_location:
+        same_postcode = installer_data.groupby("postcode")[
+            "processed_company_name"
+        ].nunique()
+        location_matches = map_installers_same_location_different_id(
+            same_postcode[same_postcode > 1].index,
+            installer_data.assign(
+                company_unique_id=installer_data["processed_company_name"]
+            ),
+        )
+        links += list(location_matches.items())
 
-    # Applying the mapping created above to create the company unique ID
-    installer_data["company_unique_id"] = installer_data[
-        "processed_company_name"
-    ].apply(
-        lambda x: trading_as_dictionary[x] if x in trading_as_dictionary.keys() else x
+    installer_data["company_unique_id"] = resolve_installer_aliases(
+        installer_data["processed_company_name"], trading_as_aliases, links
     )
 
     # Dropping processed_company_name as no longer needed
     installer_data.drop("processed_company_name", axis=1, inplace=True)
 
-    ## -------------------------------------------------------------------------------
-    ## We commented the code below since it was leading to false positives in unique id
-    ## but we'll keep it here in case ever needed again
-    ## -------------------------------------------------------------------------------
-    # Companies have the same location but not currently identified as being the same
-    # same_postcode_no_match = installer_data.groupby("postcode", as_index=False)[
-    #    ["company_unique_id"]
-    # ].nunique()
-    # same_postcode_no_match = same_postcode_no_match[
-    #    same_postcode_no_match["company_unique_id"] > 1
-    # ]["postcode"].unique()
-
-    # New unique ID matches based on companies with same location
-    # new_matches = map_installers_same_location_different_id(
-    #    same_postcode_no_match, installer_data
-    # )
-    # installer_data["company_unique_id"] = installer_data["company_unique_id"].apply(
-    #    lambda x: new_matches[x] if x in new_matches.keys() else x
-    # )
-
 
 def add_certification_body_info(
     installer_data: pd.DataFrame, installations_data: pd.DataFrame
@@ -548,23 +566,6 @@ def add_certification_body_info(
     return installer_data
 
 
-def get_max_date(date_1: datetime, date_2: datetime) -> datetime:
-    """
-    Gets max date between two dates.
-    Args:
-        date1: date
-        date2: date
-    Returns:
-        Max date
-    """
-    if pd.isnull(date_2):
-        return date_1
-    elif pd.isnull(date_1):
-        return date_2
-    else:
-        return max(date_1, date_2)
-
-
 def update_effective_to_date(
     date_data_shared: str,
     installer_data: pd.DataFrame,
@@ -585,11 +586,8 @@ def update_effective_to_date(
     """
     date = datetime.strptime(date_data_shared, "%Y%m%d").date()
 
-    installer_data["effective_to"] = installer_data.apply(
-        lambda x: date
-        if pd.isnull(x["effective_to"]) and ~pd.isnull(["effective_from"])
-        else x["effective_to"],
-        axis=1,
+    installer_data["effective_to"] = installer_data["effective_to"].fillna(
+        pd.Timestamp(date)
     )
 
     installations_match_vars = [
@@ -609,9 +607,9 @@ def update_effective_to_date(
         right_on=installations_match_vars,
     )
 
-    installer_data["effective_to"] = installer_data.apply(
-        lambda x: get_max_date(x["effective_to"], x["commissioning_date"]), axis=1
-    )
+    installer_data["effective_to"] = installer_data[
+        ["effective_to", "commissioning_date"]
+    ].max(axis=1)
 
     installer_data.drop(columns="commissioning_date", inplace=True)
 
@@ -690,17 +688,14 @@ def preprocess_historical_installers(
     raw_historical_installers.reset_index(drop=True, inplace=True)
 
     # Updating full_address variable
-    raw_historical_installers["full_address"] = raw_historical_installers.apply(
-        lambda x: update_full_address(
-            x["address_1"],
-            x["address_2"],
-            x["town"],
-            x["county"],
-            x["postcode"],
-            x["original_record"],
-            x["full_address"],
-        ),
-        axis=1,
+    raw_historical_installers["full_address"] = update_full_address(
+        raw_historical_installers["address_1"],
+        raw_historical_installers["address_2"],
+        raw_historical_installers["town"],
+        raw_historical_installers["county"],
+        raw_historical_installers["postcode"],
+        raw_historical_installers["original_record"],
+        raw_historical_installers["full_address"],
     )
 
     # Creating flag for whether certified for a certain technology
@@ -795,3 +790,10 @@ if __name__ == "__main__":
         processed_historical_installers,
         processed_data_path.format(date),
     )
+
+    # Saving installer keys alongside the processed data
+    save_to_s3(
+        s3_bucket_name,
+        build_installer_keys(processed_historical_installers),
+        base_config.PREPROCESSED_MCS_HISTORICAL_INSTALLER_KEYS_FILE_PATH.format(date),
+    )
@@ -3,6 +3,7 @@
 
 
 import pandas as pd
+import numpy as np
 import re
 import datetime as dt
 from asf_core_data.getters.mcs_getters.get_mcs_installations import (
@@ -14,6 +15,7 @@ from asf_core_data.getters.mcs_getters.get_mcs_installers import (
 from asf_core_data.config import base_config
 from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
     drop_instances_test_accounts,
+    build_installer_keys,
 )
 
 # --- Legacy imports
@@ -21,6 +23,23 @@ from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
 # from asf_core_data.pipeline.mcs.process.process_mcs_utils import colnames_dict
 
 
+# Product features in the products column, in any order.
+# Each feature is optional, so missing features are NA.
+product_regex = re.compile(
+    "".join(
+        "(?:(?=.*?{}(?P<{}>{})))?".format(prefix, product_feat, value)
+        for product_feat, prefix, value in [
+            ("product_id", "MCS Product Number: ", "[^|]+"),
+            ("product_name", "Product Name: ", "[^|]+"),
+            ("manufacturer", "License Holder: ", "[^|]+"),
+            ("flow_temp", "Flow Temp: ", "[^|]+"),
+            ("scop", "SCOP: ", "[^)]+"),
+        ]
+    ),
+    re.DOTALL,
+)
+
+
 def add_hp_features(hps):
     """Adds product_id, product_name, manufacturer, flow_temp, scop,
     rhi and year columns to HP installation records.
@@ -30,18 +49,17 @@ def add_hp_features(hps):
         DataFrame: DataFrame with additional columns.
     """
 
-    # Extract information from product column
-    product_regex_dict = {
-        "product_id": "MCS Product Number: ([^|]+)",
-        "product_name": "Product Name: ([^|]+)",
-        "manufacturer": "License Holder: ([^|]+)",
-        "flow_temp": "Flow Temp: ([^|]+)",
-        "scop": "SCOP: ([^)]+)",
-    }
-    for product_feat, regex in product_regex_dict.items():
-        hps[product_feat] = [
-            re.search(regex, product).group(1).strip() for product in hps["products"]
-        ]
+    # Extract information from product column, once for each distinct product
+    codes, products = pd.factorize(hps["products"])
+    product_features = (
+        pd.Series(products, dtype=object)
+        .str.extract(product_regex)
+        .apply(lambda feature: feature.str.strip())
+        # Missing products have code -1, which gives missing features
+        .reindex(codes)
+    )
+    for product_feat in product_features.columns:
+        hps[product_feat] = product_features[product_feat].values
 
     # Add RHI field - any "Unspecified" values in rhi_status field signify
     # that the installation is not for DRHI, missing values are unknown
@@ -100,59 +118,77 @@ def identify_clusters(hps, time_interval=base_config.MCS_CLUSTER_TIME_INTERVAL):
     """Label HP records with whether they form part of a 'cluster'
     of installations in the same postcode and around the same time.
     This suggests that these installations were done en masse.
+    A cluster is a sequence of installations in the same postcode where
+    each installation is within time_interval days of the previous one.
     Args:
         dhps (DataFrame): DataFrame of HP installations with 'postcode' and 'commission_date' columns.
         time_interval (int, optional): Maximum gap between two installations in the same postcode.
         Defaults to base_config.MCS_CLUSTER_TIME_INTERVAL.
     Returns:
-        DataFrame: DataFrame with added 'cluster' column.
+        DataFrame: DataFrame with added 'cluster', 'cluster_id' and 'cluster_size' columns.
+        'cluster_id' is missing and 'cluster_size' is 1 for installations outside of clusters.
     """
 
-    # Compute difference between consecutive installations within each postcode
-    # (both backwards and forwards - otherwise we'd miss the first/last in each cluster)
-    hps["diff_bwd"] = (
-        hps.sort_values(["postcode", "commission_date"])
-        .groupby("postcode")["commission_date"]
-        .diff()
-    )
-    hps["diff_fwd"] = (
-        hps.sort_values(["postcode", "commission_date"])
-        .groupby("postcode")["commission_date"]
-        .diff(periods=-1)
+    # Sort installations by postcode and commission date once
+    postcode_codes, _ = pd.factorize(hps["postcode"])
+    commission_dates = hps["commission_date"].values
+    order = np.lexsort((commission_dates, postcode_codes))
+    postcode_codes, commission_dates = postcode_codes[order], commission_dates[order]
+
+    # Link consecutive installations within time_interval days in the same postcode
+    # (missing postcodes and dates are never linked)
+    linked = (
+        (postcode_codes[1:] == postcode_codes[:-1])
+        & (postcode_codes[1:] != -1)
+        & (np.diff(commission_dates) <= np.timedelta64(time_interval, "D"))
     )
 
-    # Flag as cluster if within time_interval days of another installation
-    hps["cluster"] = False
-    hps["cluster"].loc[
-        (hps["diff_bwd"] <= dt.timedelta(days=time_interval))
-        | (hps["diff_fwd"] >= dt.timedelta(days=-time_interval))
-    ] = True
+    # Label sequences of linked installations
+    sequence = np.cumsum(np.concatenate([[True], ~linked])) - 1
+    sequence_size = np.bincount(sequence)
+    cluster_number = np.cumsum(sequence_size > 1) - 1
+
+    cluster_size = np.empty(len(hps), dtype=np.int64)
+    cluster_size[order] = sequence_size[sequence]
+    cluster_id = np.empty(len(hps), dtype=np.int64)
+    cluster_id[order] = cluster_number[sequence]
 
-    hps.drop(columns=["diff_bwd", "diff_fwd"], inplace=True)
+    hps["cluster"] = cluster_size > 1
+    hps["cluster_id"] = pd.arrays.IntegerArray(cluster_id, mask=cluster_size == 1)
+    hps["cluster_size"] = cluster_size
 
     return hps
 
 
 def get_installer_unique_id(
-    installations: pd.DataFrame, installers: pd.DataFrame
+    installations: pd.DataFrame,
+    installers: pd.DataFrame,
+    installer_keys: pd.DataFrame = None,
 ) -> pd.DataFrame:
     """
     Updates installations table by adding the unique installer ID.
     Args:
         installations: installations table
         installers: historical installers table
+        installer_keys: installer keys for the historical installers table.
+        Defaults to None, building them from installers with build_installer_keys().
     """
 
-    installations = installations.merge(
-        right=installers[["company_name", "company_unique_id"]].drop_duplicates(
-            "company_name"
-        ),
-        how="left",
-        left_on="installer_name",
-        right_on="company_name",
+    if installer_keys is None:
+        installer_keys = build_installer_keys(installers)
+
+    # Look up the first installer with each company name
+    company_names = installer_keys.drop_duplicates("company_name")
+    positions = pd.Index(company_names["company_name"]).get_indexer(
+        installations["installer_name"]
     )
 
-    installations.drop(columns=["company_name"], inplace=True)
+    installations["company_unique_id"] = (
+        company_names["company_unique_id"]
+        .reset_index(drop=True)
+        .reindex(positions)
+        .values
+    )
 
     return installations
 
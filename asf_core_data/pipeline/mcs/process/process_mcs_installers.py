@@ -23,7 +23,7 @@ from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
     mcs_companies_dict,
     clean_company_name,
     geocode_postcode,
-    match_companies_house,
+    match_companies_house_bulk,
     clean_concat_installers,
 )
 
@@ -69,15 +69,10 @@ def preprocess_installer_companies(installer_companies, installations_data, api_
     )
 
     # fuzzy match installer companies NOT in installer company data to companies house API
-    companies_house_data = [
-        match_companies_house(comp, api_key) for comp in missing_installer_companies
-    ]
-
-    # turn to dataframe
-    companies_house_df = pd.concat(
-        [pd.DataFrame(l) for l in companies_house_data], axis=1
-    ).T.reset_index()
-    companies_house_df = companies_house_df.rename(columns={"index": "installer_name"})
+    companies_house_df = match_companies_house_bulk(
+        missing_installer_companies, api_key
+    )
+    companies_house_df.insert(0, "installer_name", missing_installer_companies)
 
     # df if address snippet not none
     companies_house_df = companies_house_df[
@@ -94,7 +89,7 @@ def preprocess_installer_companies(installer_companies, installations_data, api_
     # keep specific columns
     companies_house_df = companies_house_df[
         [
-            "company_status",
+            "date_of_creation",
             "installer_name",
             "address_1",
             "postcode",
@@ -14,6 +14,22 @@ import time
 import re
 import numpy as np
 import random
+import os
+import json
+import asyncio
+import aiohttp
+from functools import lru_cache
+
+from asf_core_data.config import base_config
+
+# Slashes and dashes, which are converted to underscores
+separator_regex = re.compile(r"[/-]")
+
+# All punctuation other than underscores
+punct_regex = re.compile(r"[\!\"#\$%&\\\'(\)\*\+,-\./:;<=>\?@\[\]\^`\{|\}~”“]")
+
+# Numeric tokens, i.e. words containing at least one digit
+numeric_token_regex = re.compile(r"\w*\d\w*")
 
 
 def rename_columns(cols: list) -> list:
@@ -95,6 +111,66 @@ def from_list_to_dictionary(list_values: list) -> dict:
     return {value: list_values[0] for value in list_values[1:]}
 
 
+def get_trading_as_aliases(company_names) -> list:
+    """
+    Returns pairs of aliases and the company they refer to, for company names
+    containing the "trading as" expression. Each trading name and the full name
+    are aliases of the first company in the name.
+    E.g. "a trading as b" -> [("b", "a"), ("a trading as b", "a")]
+
+    Args:
+        company_names: processed company names, e.g. with deal_with_versions_of_trading_as()
+    Returns:
+        List of (alias, company) pairs.
+    """
+
+    aliases = []
+    for company_name in company_names:
+        if " trading as " not in company_name:
+            continue
+        companies = company_name.split(" trading as ")
+        aliases.extend((alias, companies[0]) for alias in companies[1:])
+        aliases.append((company_name, companies[0]))
+
+    return aliases
+
+
+def find_connected_components(n_items: int, edges) -> np.ndarray:
+    """
+    Finds the connected components of items linked by edges, using a disjoint-set
+    (union-find) with union by size and path compression.
+
+    Args:
+        n_items: number of items, identified by their position
+        edges: pairs of positions of linked items
+    Returns:
+        Root position of the component of each item.
+    """
+
+    parent = list(range(n_items))
+    size = [1] * n_items
+
+    def find(item):
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        # Compress the path, so later searches go straight to the root
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    for item_1, item_2 in edges:
+        root_1, root_2 = find(item_1), find(item_2)
+        if root_1 == root_2:
+            continue
+        if size[root_1] < size[root_2]:
+            root_1, root_2 = root_2, root_1
+        parent[root_2] = root_1
+        size[root_1] += size[root_2]
+
+    return np.array([find(item) for item in range(n_items)], dtype=np.int64)
+
+
 def map_position_of_subset_items(list_of_strings: list) -> dict:
     """
     Returns a mapping between the position of strings in a list which are a subset of each other.
@@ -102,18 +178,46 @@ def map_position_of_subset_items(list_of_strings: list) -> dict:
     set_of_strings = ["company a ltd", "a ltd", "a"]
     Outputs {0: 2, 1: 2}
     Note that, in the example above, 0 is initially mapped to 1 but then that's overwritten by 0 being mapped to 2.
+    Each position is therefore mapped to the last position of a string that is a subset of it or contains it.
+
+    Instead of comparing all pairs of strings, the strings are indexed by value and
+    each string is only checked against its own substrings, so the time grows linearly
+    with the number of strings. The substrings of each string are enumerated,
+    which takes O(L²) lookups for strings of length L. This is fine for short strings
+    such as the addresses this is used for, but not for long texts.
 
     Args:
         list_of_strings: a list of strings
     Returns:
         A dictionary mapping the position of strings that are subset of another.
     """
+
+    # Last position of each distinct string
+    last_position = {}
+    for position, string in enumerate(list_of_strings):
+        last_position[string] = position
+    lengths = sorted({len(string) for string in last_position})
+
+    # Last position of the strings that are a subset of or contain each distinct string
+    last_related_position = dict(last_position)
+    for string, position in last_position.items():
+        for length in lengths:
+            if length > len(string):
+                break
+            for start in range(len(string) - length + 1):
+                substring = string[start : start + length]
+                if substring in last_position:
+                    last_related_position[string] = max(
+                        last_related_position[string], last_position[substring]
+                    )
+                    last_related_position[substring] = max(
+                        last_related_position[substring], position
+                    )
+
     return {
-        i: j
-        for i in range(len(list_of_strings) - 1)
-        for j in range(i + 1, len(list_of_strings), 1)
-        if (list_of_strings[i] in list_of_strings[j])
-        or (list_of_strings[j] in list_of_strings[i])
+        i: last_related_position[string]
+        for i, string in enumerate(list_of_strings[:-1])
+        if last_related_position[string] > i
     }
 
 
@@ -133,10 +237,55 @@ def position_to_value(list_of_strings: list, indices_dict: dict) -> dict:
     }
 
 
+def get_companies_house_query(company_name: str) -> str:
+    """
+    Get the Companies House search query for an MCS company name,
+    i.e. the lower case trading name if there is one.
+
+    Args:
+        company_name: MCS company name, e.g. "Flo Group LTD Trading As Flo Renewables"
+    Returns:
+        Search query, e.g. "flo renewables"
+    """
+
+    company_name = company_name.lower()
+    if "trading as" in company_name:
+        company_name = deal_with_versions_of_trading_as(company_name).split(
+            " trading as "
+        )[1]
+
+    return company_name
+
+
+def parse_companies_house_response(company_data: dict) -> tuple:
+    """
+    Get the full address and date of creation of the closest match
+    from a Companies House search response.
+
+    Args:
+        company_data: JSON response of the Companies House search endpoint
+    Returns:
+        address_snippet and date_of_creation, None if not available
+    """
+
+    if (
+        (company_data is not None)
+        and ("items" in company_data.keys())
+        and len(company_data["items"]) > 0
+    ):
+        closest_match = company_data["items"][0]
+        return closest_match.get("address_snippet"), closest_match.get(
+            "date_of_creation"
+        )
+
+    return None, None
+
+
 def match_companies_house(company_name: str, api_key: str) -> pd.Series:
     """
     Fuzzy match between MCS company name and Companies House API company names and
     returns Companies House information: company full address and company date of creation.
+    See match_companies_house_bulk() for matching many company names.
 
     Args:
         company_name: Company name used to query company house API
@@ -146,14 +295,10 @@ def match_companies_house(company_name: str, api_key: str) -> pd.Series:
     """
 
     # E.g. "Flo Group LTD T/A Flo Renewables" -> "flo renewables"
-    company_name = company_name.lower()
-    if "trading as" in company_name:
-        company_name = deal_with_versions_of_trading_as(company_name).split(
-            " trading as "
-        )[1]
+    company_name = get_companies_house_query(company_name)
 
     # endpoint url
-    base_url = f"https://api.company-information.service.gov.uk/search/companies?q={company_name}"
+    base_url = f"{base_config.COMPANIES_HOUSE_SEARCH_URL}?q={company_name}"
 
     response = requests.get(base_url, auth=(api_key, ""))
 
@@ -164,27 +309,7 @@ def match_companies_house(company_name: str, api_key: str) -> pd.Series:
     response_status_code = response.status_code
 
     if response_status_code == 200:  # status code 200 means all good with request
-        company_data = response.json()
-        if (
-            (company_data is not None)
-            and ("items" in company_data.keys())
-            and len(company_data["items"]) > 0
-        ):
-            address_snippet = (
-                company_data["items"][0]["address_snippet"]
-                if ("address_snippet" in company_data["items"][0].keys())
-                else None
-            )
-            date_of_creation = (
-                company_data["items"][0]["date_of_creation"]
-                if "date_of_creation" in company_data["items"][0].keys()
-                else None
-            )
-
-            return pd.Series([address_snippet, date_of_creation])
-
-        else:
-            return pd.Series([None, None])
+        return pd.Series(list(parse_companies_house_response(response.json())))
     else:
         if response_status_code >= 400 and response_status_code < 500:
             raise Exception(
@@ -202,6 +327,296 @@ def match_companies_house(company_name: str, api_key: str) -> pd.Series:
         return match_companies_house(company_name, api_key)
 
 
+class RateLimiter:
+    """
+    Token bucket limiting the number of requests per period, shared by concurrent requests.
+    The bucket refills at max_requests per period and holds at most burst requests,
+    so requests are spread over the period rather than all made at its start.
+
+    Args:
+        max_requests: Maximum number of requests per period
+        period: Period in seconds
+        burst: Maximum number of requests made at once
+    """
+
+    def __init__(self, max_requests: int, period: float, burst: int = 10):
+        if max_requests <= 0 or period <= 0 or burst < 1:
+            raise ValueError(
+                "The rate limiter requires max_requests > 0, period > 0 and burst >= 1."
+            )
+
+        self.capacity = burst
+        self.rate = max_requests / period
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        Wait until a request can be made.
+        """
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def fetch_companies_house_info(
+    session: aiohttp.ClientSession,
+    query: str,
+    limiter: RateLimiter,
+    search_url: str = base_config.COMPANIES_HOUSE_SEARCH_URL,
+    max_retries: int = 5,
+) -> tuple:
+    """
+    Search Companies House for a query, retrying on rate limiting,
+    server and connection errors with exponential backoff.
+
+    Args:
+        session: Session authenticated with the Companies House API key
+        query: Search query, e.g. from get_companies_house_query()
+        limiter: Rate limiter shared by all requests
+        search_url: Companies House search endpoint
+        max_retries: Maximum number of retries per query
+    Returns:
+        address_snippet and date_of_creation of the closest match, None if not available
+    """
+
+    for attempt in range(max_retries + 1):
+        await limiter.acquire()
+
+        try:
+            async with session.get(search_url, params={"q": query}) as response:
+                if response.status == 200:
+                    return parse_companies_house_response(
+                        await response.json(content_type=None)
+                    )
+
+                message = "HTTP {}: {}".format(response.status, await response.text())
+                if 400 <= response.status < 500 and response.status != 429:
+                    raise Exception(
+                        "Cannot get data, the program will stop!\n" + message
+                    )
+        except aiohttp.ClientError as error:
+            message = repr(error)
+
+        if attempt < max_retries:
+            sleep_seconds = min(60, 2**attempt) * random.uniform(0.5, 1)
+            print(
+                "Cannot get data for '{}', retrying in {:.1f} seconds...\n{}".format(
+                    query, sleep_seconds, message
+                )
+            )
+            await asyncio.sleep(sleep_seconds)
+
+    raise Exception(
+        "Cannot get data for '{}' after {} retries!\n{}".format(
+            query, max_retries, message
+        )
+    )
+
+
+def load_companies_house_cache(cache_path: str) -> dict:
+    """
+    Load cached Companies House search results.
+
+    Args:
+        cache_path: Path to JSON cache file
+    Returns:
+        Dictionary mapping queries to [address_snippet, date_of_creation]
+    """
+
+    if cache_path is None or not os.path.isfile(cache_path):
+        return {}
+
+    with open(cache_path) as f:
+        return json.load(f)
+
+
+def save_companies_house_cache(cache: dict, cache_path: str):
+    """
+    Save Companies House search results, replacing the cache file at once
+    so that an interrupted run never leaves a corrupt cache.
+
+    Args:
+        cache: Dictionary mapping queries to [address_snippet, date_of_creation]
+        cache_path: Path to JSON cache file
+    """
+
+    if os.path.dirname(cache_path):
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+    with open(cache_path + ".tmp", "w") as f:
+        json.dump(cache, f)
+    os.replace(cache_path + ".tmp", cache_path)
+
+
+async def fetch_companies_house_cache(
+    queries: list,
+    api_key: str,
+    cache: dict,
+    search_url: str = base_config.COMPANIES_HOUSE_SEARCH_URL,
+    max_requests: int = 600,
+    period: float = 300,
+    max_connections: int = 10,
+    max_retries: int = 5,
+):
+    """
+    Search Companies House for all queries, adding the results to the cache
+    as they arrive. Requests run concurrently over a pool of reused connections.
+
+    Args:
+        queries: Search queries that are not in the cache
+        api_key: API key to request data from live company house API endpoint
+        cache: Dictionary mapping queries to [address_snippet, date_of_creation]
+        search_url: Companies House search endpoint
+        max_requests: Maximum number of requests per period
+        period: Period in seconds
+        max_connections: Maximum number of concurrent requests
+        max_retries: Maximum number of retries per query
+    """
+
+    limiter = RateLimiter(max_requests, period, burst=min(10, max_requests))
+
+    async with aiohttp.ClientSession(
+        auth=aiohttp.BasicAuth(api_key, ""),
+        connector=aiohttp.TCPConnector(limit=max_connections),
+    ) as session:
+
+        async def fetch(query):
+            cache[query] = list(
+                await fetch_companies_house_info(
+                    session, query, limiter, search_url, max_retries
+                )
+            )
+
+        await asyncio.gather(*[fetch(query) for query in queries])
+
+
+def match_companies_house_bulk(
+    company_names,
+    api_key: str,
+    cache_path: str = base_config.COMPANIES_HOUSE_CACHE_PATH,
+    search_url: str = base_config.COMPANIES_HOUSE_SEARCH_URL,
+    max_requests: int = 600,
+    period: float = 300,
+    max_connections: int = 10,
+    max_retries: int = 5,
+) -> pd.DataFrame:
+    """
+    Bulk version of match_companies_house(). Each distinct query is only searched once,
+    concurrently and within the Companies House rate limit of 600 requests per 5 minutes.
+    Results are kept in a local cache, so reruns only search new company names.
+
+    Args:
+        company_names: Company names used to query company house API
+        api_key: API key to request data from live company house API endpoint
+        cache_path: Path to JSON cache file. Defaults to base_config.COMPANIES_HOUSE_CACHE_PATH.
+            If None, results are not cached.
+        search_url: Companies House search endpoint. Defaults to base_config.COMPANIES_HOUSE_SEARCH_URL.
+        max_requests: Maximum number of requests per period. Defaults to 600.
+        period: Period in seconds. Defaults to 300.
+        max_connections: Maximum number of concurrent requests. Defaults to 10.
+        max_retries: Maximum number of retries per query. Defaults to 5.
+    Returns:
+        Full address and creation date for each company name, in the order of company_names
+    """
+
+    queries = [
+        get_companies_house_query(company_name) for company_name in company_names
+    ]
+
+    cache = load_companies_house_cache(cache_path)
+    new_queries = [query for query in dict.fromkeys(queries) if query not in cache]
+
+    if new_queries:
+        print("Searching Companies House for {} companies...".format(len(new_queries)))
+        try:
+            asyncio.run(
+                fetch_companies_house_cache(
+                    new_queries,
+                    api_key,
+                    cache,
+                    search_url=search_url,
+                    max_requests=max_requests,
+                    period=period,
+                    max_connections=max_connections,
+                    max_retries=max_retries,
+                )
+            )
+        finally:
+            # Keep the results so far, even if a request failed
+            if cache_path is not None:
+                save_companies_house_cache(cache, cache_path)
+
+    return pd.DataFrame(
+        [cache[query] for query in queries],
+        columns=["address_snippet", "date_of_creation"],
+    )
+
+
+def build_installer_keys(installer_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds the installer keys table, with one row for each company name, company unique ID and
+    MCS certificate number in the installers data (in order of appearance).
+    The integer installer_key identifies a pair of company unique ID and MCS certificate number.
+    Keys are assigned in sorted order of the pairs, so sorting by key is the same as sorting by pair.
+
+    Args:
+        installer_data: processed historical installers data
+    Returns:
+        Installer keys table.
+    """
+
+    installer_keys = installer_data[
+        ["company_name", "company_unique_id", "mcs_certificate_number"]
+    ].drop_duplicates()
+    installer_keys["mcs_certificate_number"] = installer_keys[
+        "mcs_certificate_number"
+    ].astype(str)
+
+    installer_keys["installer_key"] = installer_keys.groupby(
+        ["company_unique_id", "mcs_certificate_number"], sort=True
+    ).ngroup()
+
+    return installer_keys.reset_index(drop=True)
+
+
+def get_installer_key(
+    installer_keys: pd.DataFrame,
+    company_unique_ids: pd.Series,
+    certificate_numbers: pd.Series,
+) -> np.ndarray:
+    """
+    Looks up the installer keys of pairs of company unique ID and MCS certificate number.
+
+    Args:
+        installer_keys: installer keys table, e.g. from build_installer_keys()
+        company_unique_ids: company unique IDs
+        certificate_numbers: MCS certificate numbers as strings
+    Returns:
+        Installer keys, -1 for pairs that are not in installer_keys.
+    """
+
+    pair_keys = installer_keys.drop_duplicates(
+        ["company_unique_id", "mcs_certificate_number"]
+    )
+    positions = pd.MultiIndex.from_frame(
+        pair_keys[["company_unique_id", "mcs_certificate_number"]]
+    ).get_indexer(pd.MultiIndex.from_arrays([company_unique_ids, certificate_numbers]))
+
+    return np.where(positions == -1, -1, pair_keys["installer_key"].values[positions])
+
+
 def geocode_postcode(data: pd.DataFrame, geodata: pd.DataFrame) -> pd.DataFrame:
     """
     Updates data with latitude and longitude columns, by merging with geodata
@@ -258,14 +673,60 @@ def remove_punctuation(address):
         return ""
     else:
         # Replace / and - with _
-        address = re.sub(r"[/-]", "_", address)
+        address = separator_regex.sub("_", address)
         # Remove all punctuation other than _
-        punct_regex = r"[\!\"#\$%&\\\'(\)\*\+,-\./:;<=>\?@\[\]\^`\{|\}~”“]"
-        address = re.sub(punct_regex, "", address)
+        address = punct_regex.sub("", address)
 
         return address
 
 
+def remove_punctuation_series(addresses: pd.Series) -> pd.Series:
+    """
+    Vectorised version of remove_punctuation() for a whole series of addresses.
+    Missing addresses are returned as empty strings.
+
+    Args:
+        addresses: Addresses to format.
+
+    Returns:
+        Formatted addresses.
+    """
+
+    return (
+        addresses.fillna("")
+        .astype(str)
+        .str.replace(separator_regex, "_", regex=True)
+        .str.replace(punct_regex, "", regex=True)
+    )
+
+
+@lru_cache(maxsize=2**20)
+def _extract_token_frozenset(address, postcode, max_token_length):
+    """
+    Cached implementation of extract_token_set(). Addresses recur across
+    EPC records and repeated runs, so the tokens are only extracted once
+    for each (address, postcode, max_token_length).
+    """
+
+    tokens = numeric_token_regex.findall(address)
+    if postcode is None:  # invalid postcode
+        return frozenset(token for token in tokens if len(token) < max_token_length)
+
+    postcode = postcode.lower()
+    postcode_parts = postcode.split()
+    full_postcode = postcode.replace(" ", "")
+
+    return frozenset(
+        token
+        for token in tokens
+        if (
+            (len(token) < max_token_length)
+            and (token.lower() not in postcode_parts)
+            and (token.lower() != full_postcode)
+        )
+    )
+
+
 def extract_token_set(address, postcode, max_token_length):
     """
     Extract valid numeric tokens from address string.
@@ -287,22 +748,53 @@ def extract_token_set(address, postcode, max_token_length):
     # wonder if single-letter tokens should be in here too
     # for e.g. "Flat A" or whether this would give too many
     # false positives
-    tokens = re.findall("\w*\d\w*", address)
     if pd.isnull(postcode):  # invalid postcode
-        valid_tokens = [token for token in tokens if ((len(token) < max_token_length))]
-    else:  # valid postcode
-        valid_tokens = [
-            token
-            for token in tokens
-            if (
-                (len(token) < max_token_length)
-                & (token.lower() not in postcode.lower().split())
-                & (token.lower() != postcode.lower().replace(" ", ""))
-            )
-        ]
-    valid_token_set = set(valid_tokens)
+        postcode = None
+
+    return set(_extract_token_frozenset(address, postcode, max_token_length))
+
+
+def hash_token_sets(token_sets) -> np.ndarray:
+    """
+    Encode token sets as 64-bit hashes, so that token sets can be compared
+    exactly with a single integer comparison. Equal sets get equal hashes,
+    regardless of the order of their tokens.
+
+    Args:
+        token_sets: Iterable of token sets, e.g. from extract_token_set().
+
+    Returns:
+        Hashes of the token sets.
+    """
+
+    # Tokens are word characters only, so a space separates them unambiguously
+    encoded = np.array(
+        [" ".join(sorted(tokens)) for tokens in token_sets], dtype=object
+    )
+
+    return pd.util.hash_array(encoded)
+
+
+def extract_token_set_hashes(addresses, postcodes, max_token_length) -> np.ndarray:
+    """
+    Bulk version of extract_token_set(), returning the hashes of the token sets
+    ready for exact comparison, see hash_token_sets().
+
+    Args:
+        addresses: Strings from which to extract tokens.
+        postcodes: Strings used for removal of tokens corresponding to postcode parts.
+        max_token_length: Tokens of this length or longer are removed.
+
+    Returns:
+        Hashes of the valid token sets.
+    """
 
-    return valid_token_set
+    return hash_token_sets(
+        _extract_token_frozenset(
+            address, None if pd.isnull(postcode) else postcode, max_token_length
+        )
+        for address, postcode in zip(addresses, postcodes)
+    )
 
 
 ## ----- Legacy functions and variables below -----
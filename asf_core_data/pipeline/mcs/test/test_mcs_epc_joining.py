@@ -0,0 +1,384 @@
+"""
+Script to test the joining of MCS and EPC data.
+"""
+
+import pandas as pd
+import recordlinkage as rl
+
+from asf_core_data.pipeline.mcs.process.mcs_epc_joining import (
+    prepare_hps,
+    prepare_epcs,
+    form_matching,
+    form_matching_in_shards,
+    select_top_matches,
+    join_prepared_mcs_epc_data,
+    join_prepared_mcs_epc_data_incrementally,
+    load_prepared_epc_addresses,
+    add_epc_features,
+    select_most_relevant_epc,
+)
+from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
+    extract_token_set,
+    extract_token_set_hashes,
+    hash_token_sets,
+)
+from asf_core_data.config import base_config
+
+
+def get_test_data():
+    """
+    Get small MCS and EPC test datasets.
+    """
+
+    test_mcs = pd.DataFrame(
+        {
+            "postcode": ["A1 1AA", "A1 1AB", "A1 1AD", "A1 1AA"],
+            "address_1": ["1 Main Street", "2 High Street", "4 Side Avenue", "Flat 2"],
+            "address_2": ["Townsville", "Cityburgh", "Townsville", "1 Main Street"],
+        }
+    )
+
+    test_epc = pd.DataFrame(
+        {
+            "LMK_KEY": ["a", "b", "c", "d", "e", "f"],
+            "POSTCODE": ["A1 1AB", "A1 1AA", "A1 1AC", "A1 1AB", "A1 1AA", "A1 1AA"],
+            "ADDRESS1": [
+                "2 High Street",
+                "1 Main Street",
+                "2 High Street",
+                "3 High Street",
+                "1 Main Street",
+                "Flat 2, 1 Main Street",
+            ],
+            "ADDRESS2": [
+                "Cityburgh",
+                "Townsville",
+                "Cityburgh",
+                "Cityburgh",
+                "Townsville",
+                "Townsville",
+            ],
+        },
+        index=[10, 11, 12, 13, 14, 15],
+    )
+
+    return test_mcs, test_epc
+
+
+def get_prepared_test_data():
+    """
+    Get small prepared MCS and EPC test datasets.
+    """
+
+    test_mcs, test_epc = get_test_data()
+
+    return prepare_hps(test_mcs), prepare_epcs(test_epc)
+
+
+def test_extract_token_set_hashes():
+    """
+    Test if the token set hashes are equal exactly when the token sets are equal.
+    """
+
+    addresses = ["flat 2 12 main street", "12 main street flat 2", "12 a1 1aa", "12"]
+    postcodes = ["A1 1AA", "A1 1AA", "A1 1AA", None]
+
+    token_sets = [
+        extract_token_set(address, postcode, 10)
+        for address, postcode in zip(addresses, postcodes)
+    ]
+    hashes = extract_token_set_hashes(addresses, postcodes, 10)
+
+    assert token_sets == [{"2", "12"}, {"2", "12"}, {"12"}, {"12"}]
+    assert (hashes[:, None] == hashes[None, :]).tolist() == [
+        [a == b for b in token_sets] for a in token_sets
+    ]
+
+
+def test_prepare_numeric_tokens():
+    """
+    Test if prepare_hps() and prepare_epcs() add the hashes of the numeric token sets.
+    """
+
+    hps, epcs = get_prepared_test_data()
+
+    for prepared, postcodes in [(hps, hps["postcode"]), (epcs, epcs["POSTCODE"])]:
+        token_sets = [
+            extract_token_set(address, postcode, base_config.MCS_EPC_MAX_TOKEN_LENGTH)
+            for address, postcode in zip(prepared["standardised_address"], postcodes)
+        ]
+
+        assert (
+            prepared["numeric_tokens"].tolist() == hash_token_sets(token_sets).tolist()
+        )
+
+
+def test_form_matching():
+    """
+    Test if form_matching() returns the same pairs and scores as
+    a blocked recordlinkage comparison.
+    """
+
+    hps, epcs = get_prepared_test_data()
+
+    indexer = rl.Index()
+    indexer.block(on="standardised_postcode")
+    comp = rl.Compare()
+    comp.exact("numeric_tokens", "numeric_tokens", label="numerics")
+    comp.string(
+        "standardised_address",
+        "standardised_address",
+        method="jarowinkler",
+        label="address_score",
+    )
+    expected = comp.compute(indexer.index(hps, epcs), hps, epcs)
+
+    matching = form_matching(hps, epcs)
+
+    pd.testing.assert_frame_equal(
+        matching.reset_index(), expected.reset_index(), check_dtype=False
+    )
+
+
+def test_form_matching_in_shards():
+    """
+    Test if matching in shards by postcode area gives the same matching.
+    """
+
+    hps, epcs = get_prepared_test_data()
+    hps["postcode"] = ["A1 1AA", "B2 1AB", "A1 1AD", "A1 1AA"]
+    epcs["standardised_postcode"] = [
+        "B21AB",
+        "A11AA",
+        "A11AC",
+        "B21AB",
+        "A11AA",
+        "A11AA",
+    ]
+    hps = prepare_hps(hps)
+
+    pd.testing.assert_frame_equal(
+        form_matching_in_shards(hps, epcs, n_jobs=2), form_matching(hps, epcs)
+    )
+
+
+def test_select_top_matches():
+    """
+    Test if select_top_matches() returns the same pairs as selecting
+    the top matches for each MCS record with groupby and idxmax.
+    """
+
+    matches = pd.DataFrame(
+        {
+            "level_0": [3, 3, 3, 1, 1, 2, 0],
+            "level_1": [10, 11, 12, 13, 14, 15, 16],
+            "address_score": [0.9, 0.95, 0.95, 0.8, 0.7, 1.0, 0.85],
+        }
+    )
+
+    expected_all = (
+        matches.groupby("level_0")
+        .apply(
+            lambda df: df.loc[
+                df["address_score"] == df["address_score"].max(), "level_1"
+            ]
+        )
+        .droplevel(1)
+        .reset_index()
+    )
+    expected_first = matches.loc[
+        matches.groupby("level_0")["address_score"].idxmax(), ["level_0", "level_1"]
+    ].reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(
+        select_top_matches(matches, all_records=True), expected_all
+    )
+    pd.testing.assert_frame_equal(
+        select_top_matches(matches, all_records=False), expected_first
+    )
+
+
+def test_join_prepared_mcs_epc_data_incrementally():
+    """
+    Test if joining incrementally gives the same result as a full join
+    for new MCS records, new EPC records and removed EPC records,
+    including EPC records without LMK_KEY.
+    """
+
+    hps, epcs = get_prepared_test_data()
+    epcs["LMK_KEY"] = [None, "b", None, "d", None, "f"]
+    shifted_epcs = epcs.set_axis(range(epcs.shape[0]))
+    # A good match that becomes the top match when "1 Main Street" is removed
+    extended_epcs = pd.concat(
+        [
+            epcs,
+            prepare_epcs(
+                pd.DataFrame(
+                    {
+                        "LMK_KEY": [None],
+                        "POSTCODE": ["A1 1AA"],
+                        "ADDRESS1": ["1 Main St"],
+                        "ADDRESS2": ["Townsville"],
+                    },
+                    index=[16],
+                )
+            ),
+        ]
+    )
+
+    for n_previous_hps, previous_epcs, current_epcs in [
+        (4, epcs.iloc[:5], epcs),
+        (2, epcs.iloc[:5], epcs),
+        (2, epcs.iloc[:3], epcs),
+        (4, epcs, epcs),
+        (4, epcs, epcs.drop(index=[11, 14])),
+        (4, epcs, epcs.drop(index=[10, 11])),
+        (4, extended_epcs, extended_epcs.drop(index=[11, 14])),
+        (2, shifted_epcs.iloc[1:], epcs.drop(index=[14])),
+    ]:
+        previous_joined = join_prepared_mcs_epc_data(
+            hps.iloc[:n_previous_hps], previous_epcs
+        )
+
+        joined = join_prepared_mcs_epc_data_incrementally(
+            hps,
+            current_epcs,
+            previous_joined,
+            previous_epcs,
+        )
+
+        pd.testing.assert_frame_equal(
+            joined, join_prepared_mcs_epc_data(hps, current_epcs)
+        )
+
+
+def test_add_epc_features():
+    """
+    Test if joining on the EPC addresses and adding the EPC features for
+    the matched records gives the same result as joining the full EPC records.
+    """
+
+    hps, epcs = get_test_data()
+    epcs.insert(0, "UPRN", [100, 101, 102, 103, 104, 105])
+    epcs["INSPECTION_DATE"] = pd.to_datetime(["2020-01-01"] * 3 + ["2021-01-01"] * 3)
+    epcs.index = range(epcs.shape[0])
+    hps = prepare_hps(hps)
+
+    expected = join_prepared_mcs_epc_data(hps, prepare_epcs(epcs.copy()))
+
+    joined = join_prepared_mcs_epc_data(
+        hps, prepare_epcs(epcs[["ADDRESS1", "ADDRESS2", "POSTCODE"]].copy())
+    )
+    matched_epcs = epcs.loc[joined["original_epc_index"].dropna().unique()]
+
+    pd.testing.assert_frame_equal(add_epc_features(joined, matched_epcs), expected)
+
+
+def test_prepare_epcs_with_cache(tmp_path):
+    """
+    Test if preparing EPC records with a cache gives the same result as without,
+    including EPC records without LMK_KEY, and if the cache is invalidated
+    when the batch changes.
+    """
+
+    _, epcs = get_test_data()
+    epcs["LMK_KEY"] = [None, "b", None, "d", None, "f"]
+    cache_path = tmp_path / "EPC_GB_prepared_addresses.parquet"
+    expected = prepare_epcs(epcs.copy())
+
+    # First with a partial cache, then with a complete cache
+    prepare_epcs(epcs.iloc[:3].copy(), cache_path=cache_path, batch="2023_Q1")
+    for _ in range(2):
+        prepared = prepare_epcs(epcs.copy(), cache_path=cache_path, batch="2023_Q1")
+        pd.testing.assert_frame_equal(prepared, expected)
+
+    # One entry for each distinct address
+    assert load_prepared_epc_addresses(cache_path, "2023_Q1").shape[0] == 5
+    assert load_prepared_epc_addresses(cache_path, "2023_Q2") is None
+
+
+def test_select_most_relevant_epc():
+    """
+    Test if select_most_relevant_epc() selects the last EPC before the installation,
+    otherwise the first EPC after the installation, as sorting and grouping the data does.
+    """
+
+    joined_df = pd.DataFrame(
+        {
+            "original_mcs_index": [0, 0, 0, 1, 1, 2, 3, 3, 4],
+            "commission_date": pd.to_datetime(
+                ["2020-06-01"] * 3 + ["2019-01-01"] * 2 + ["2021-01-01"] * 4
+            ),
+            "INSPECTION_DATE": pd.to_datetime(
+                [
+                    "2018-01-01",
+                    "2020-05-01",
+                    "2021-01-01",
+                    "2022-03-01",
+                    "2019-02-01",
+                    None,
+                    None,
+                    "2021-01-01",
+                    "2010-01-01",
+                ]
+            ),
+        }
+    )
+    joined_df["original_epc_index"] = range(joined_df.shape[0])
+
+    expected = joined_df.sort_values("INSPECTION_DATE").reset_index(drop=True)
+    expected["epc_before_mcs"] = (
+        expected["INSPECTION_DATE"] <= expected["commission_date"]
+    )
+    last_epc_before_mcs = (
+        expected.loc[expected["epc_before_mcs"]]
+        .groupby("original_mcs_index")
+        .tail(1)
+        .index
+    )
+    expected = (
+        expected.loc[
+            expected.index.isin(last_epc_before_mcs) | ~expected["epc_before_mcs"]
+        ]
+        .groupby("original_mcs_index")
+        .head(1)
+        .drop(columns="epc_before_mcs")
+        .reset_index(drop=True)
+    )
+
+    pd.testing.assert_frame_equal(select_most_relevant_epc(joined_df), expected)
+
+
+def test_select_most_relevant_epc_same_inspection_date():
+    """
+    Test if select_most_relevant_epc() selects the last of the EPCs with the same
+    INSPECTION_DATE before the installation, and the first of those after it.
+    """
+
+    joined_df = pd.DataFrame(
+        {
+            "original_mcs_index": [0, 0, 0, 0, 1, 1, 1, 2, 2, 2],
+            "commission_date": pd.to_datetime(
+                ["2020-06-01"] * 4 + ["2019-01-01"] * 3 + ["2021-01-01"] * 3
+            ),
+            "INSPECTION_DATE": pd.to_datetime(
+                [
+                    "2020-01-01",
+                    "2020-01-01",
+                    "2021-01-01",
+                    "2021-01-01",
+                    "2022-01-01",
+                    "2020-01-01",
+                    "2020-01-01",
+                    "2021-01-01",
+                    "2021-01-01",
+                    "2020-01-01",
+                ]
+            ),
+        }
+    )
+    joined_df["original_epc_index"] = range(joined_df.shape[0])
+
+    selected = select_most_relevant_epc(joined_df)
+
+    assert selected["original_epc_index"].tolist() == [1, 5, 8]
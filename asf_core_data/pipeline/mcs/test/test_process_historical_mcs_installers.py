@@ -8,13 +8,17 @@ import os
 from asf_core_data.pipeline.mcs.process.process_historical_mcs_installers import (
     rename_columns,
     deal_with_versions_of_trading_as,
-    match_companies_house,
     clean_company_name,
-    from_list_to_dictionary,
-    dictionary_mapping_trading_as_company_names,
     map_position_of_subset_items,
     position_to_value,
     basic_preprocessing_of_installations,
+    get_trading_as_aliases,
+    resolve_installer_aliases,
+    create_installer_unique_id,
+)
+from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
+    match_companies_house,
+    from_list_to_dictionary,
 )
 from asf_core_data.getters.mcs_getters.get_mcs_installers import (
     get_most_recent_processed_historical_installers_data,
@@ -219,20 +223,22 @@ def test_from_list_to_dictionary():
     }
 
 
-def test_dictionary_mapping_trading_as_company_names():
+def test_resolve_installer_aliases():
     """
-    Test if the dictionary_mapping_trading_as_company_names() function works as expected.
+    Test if resolve_installer_aliases() identifies chains of "trading as" names
+    and other linked names by the same company unique ID.
     """
 
-    test_df = pd.DataFrame(columns=["processed_company_name"])
-    test_df["processed_company_name"] = ["a trading as b", "c trading as d"]
+    company_names = pd.Series(
+        ["b", "b trading as c", "a trading as b", "c", "d", "e", "f"],
+        index=[5, 4, 3, 2, 1, 0, -1],
+    )
+    alias_edges = get_trading_as_aliases(company_names)
 
-    assert dictionary_mapping_trading_as_company_names(test_df) == {
-        "b": "a",
-        "a trading as b": "a",
-        "d": "c",
-        "c trading as d": "c",
-    }
+    unique_ids = resolve_installer_aliases(company_names, alias_edges, [("f", "e")])
+
+    assert unique_ids.index.equals(company_names.index)
+    assert unique_ids.tolist() == ["a", "a", "a", "a", "d", "e", "e"]
 
 
 def test_map_position_of_subset_items():
@@ -244,6 +250,17 @@ def test_map_position_of_subset_items():
 
     assert map_position_of_subset_items(l) == {0: 2, 1: 2}
 
+    # Same mapping as comparing all pairs of strings
+    l = ["unit1abcroad", "abc", "unit1", "road", "abc", "xyz", "1abc", "unit1abcroad"]
+    pairwise_mapping = {
+        i: j
+        for i in range(len(l) - 1)
+        for j in range(i + 1, len(l))
+        if (l[i] in l[j]) or (l[j] in l[i])
+    }
+
+    assert map_position_of_subset_items(l) == pairwise_mapping
+
 
 def test_position_to_value():
     """
@@ -286,6 +303,26 @@ def test_create_installer_unique_id():
     )
 
 
+def test_create_installer_unique_id_link_certificate_numbers():
+    """
+    Test if companies with the same MCS certificate number are only
+    identified by the same company unique ID when requested.
+    """
+
+    installer_data = pd.DataFrame(
+        {
+            "company_name": ["A Ltd", "B Ltd", "A t/a C", "C"],
+            "mcs_certificate_number": [1, 1, 2, 3],
+        }
+    )
+
+    create_installer_unique_id(installer_data)
+    assert installer_data["company_unique_id"].tolist() == ["a", "b", "a", "a"]
+
+    create_installer_unique_id(installer_data, link_certificate_numbers=True)
+    assert installer_data["company_unique_id"].tolist() == ["a", "a", "a", "a"]
+
+
 def test_geocode_postcode():
     """
     Test if the geocode_postcode() function works as expected by checking
@@ -2,9 +2,10 @@
 Script to test the data processing pipeline for MCS installations data.
 """
 
-import re
 import pandas as pd
 from asf_core_data.pipeline.mcs.process.process_mcs_installations import (
+    add_hp_features,
+    identify_clusters,
     get_processed_installations_data,
 )
 from asf_core_data.getters.mcs_getters.get_mcs_installations import (
@@ -54,28 +55,75 @@ def test_company_unique_id_is_added():
 
 def test_regex_extraction_works():
     """
-    Check if regex in add_hp_features() is working.
+    Check if regex in add_hp_features() is working, also for
+    repeated, malformed and missing products.
     """
 
-    product_regex_dict = {
-        "product_id": "MCS Product Number: ([^|]+)",
-        "product_name": "Product Name: ([^|]+)",
-        "manufacturer": "License Holder: ([^|]+)",
-        "flow_temp": "Flow Temp: ([^|]+)",
-        "scop": "SCOP: ([^)]+)",
-    }
     product = "(ID: 1234 | MCS Product Number: abc 1-7 xx | Product Name: + 1-7 xx | License Holder: ABC XYZ, S.L. | Flow Temp: 50 | SCOP: 3.91)"
-    results_dict = dict()
-    for product_feat, regex in product_regex_dict.items():
-        results_dict[product_feat] = re.search(regex, product).group(1).strip()
+    hps = pd.DataFrame(
+        {
+            "products": [product, "(ID: 5678 | Flow Temp: 45)", product, None],
+            "commission_date": pd.to_datetime(["2022-01-01"] * 4),
+        }
+    )
+    features = ["product_id", "product_name", "manufacturer", "flow_temp", "scop"]
+
+    hps = add_hp_features(hps)
 
-    assert results_dict == {
+    assert hps.loc[0, features].to_dict() == {
         "product_id": "abc 1-7 xx",
         "product_name": "+ 1-7 xx",
         "manufacturer": "ABC XYZ, S.L.",
         "flow_temp": "50",
         "scop": "3.91",
     }
+    assert hps.loc[1, "flow_temp"] == "45"
+    assert hps.loc[1, features].isna().sum() == 4
+    assert hps.loc[2, features].equals(hps.loc[0, features])
+    assert hps.loc[3, features].isna().all()
+
+
+def test_identify_clusters():
+    """
+    Check if identify_clusters() flags installations within the time interval of
+    another installation in the same postcode, and labels each cluster with its size.
+    """
+
+    hps = pd.DataFrame(
+        {
+            "postcode": ["A", "A", "B", "A", "A", None, None, "B", "A"],
+            "commission_date": pd.to_datetime(
+                [
+                    "2020-02-15",
+                    "2020-01-01",
+                    "2020-01-01",
+                    "2020-01-20",
+                    "2020-06-01",
+                    "2020-01-01",
+                    "2020-01-01",
+                    None,
+                    "2020-06-01",
+                ]
+            ),
+        },
+        index=[10, 11, 12, 13, 14, 15, 16, 17, 18],
+    )
+
+    hps = identify_clusters(hps, time_interval=31)
+
+    assert hps["cluster"].tolist() == [
+        True,
+        True,
+        False,
+        True,
+        True,
+        False,
+        False,
+        False,
+        True,
+    ]
+    assert hps["cluster_size"].tolist() == [3, 3, 1, 3, 2, 1, 1, 1, 2]
+    assert hps["cluster_id"].tolist() == [0, 0, pd.NA, 0, 1, pd.NA, pd.NA, pd.NA, 1]
 
 
 def test_same_lines_before_after():
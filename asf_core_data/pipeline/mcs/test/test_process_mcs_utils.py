@@ -0,0 +1,166 @@
+"""
+Script to test the MCS processing utils, including the Companies House client
+against a local stub server.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
+    match_companies_house_bulk,
+    build_installer_keys,
+    get_installer_key,
+)
+
+
+class CompaniesHouseStub(BaseHTTPRequestHandler):
+    """
+    Stub of the Companies House search endpoint. The first request
+    for each query fails with a server error to test the retries.
+    """
+
+    queries = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)["q"][0]
+        self.queries.append(query)
+
+        if self.queries.count(query) == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        items = (
+            []
+            if query == "unknown"
+            else [
+                {
+                    "address_snippet": query + ", A1 1AA",
+                    "date_of_creation": "2010-01-01",
+                }
+            ]
+        )
+        body = json.dumps({"items": items}).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TimedCompaniesHouseStub(CompaniesHouseStub):
+    """
+    Stub of the Companies House search endpoint that records the time of each request.
+    """
+
+    queries = []
+    times = []
+
+    def do_GET(self):
+        self.times.append(time.monotonic())
+        super().do_GET()
+
+
+def test_match_companies_house_bulk(tmp_path):
+    """
+    Test if match_companies_house_bulk() searches each new query once (with retries),
+    returns the results in order and only uses the cache when rerun.
+    """
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CompaniesHouseStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    search_url = "http://127.0.0.1:{}/search/companies".format(server.server_port)
+    cache_path = str(tmp_path / "companies_house_cache.json")
+
+    company_names = ["Company A", "B Ltd Trading As Company C", "company a", "Unknown"]
+    expected = pd.DataFrame(
+        {
+            "address_snippet": ["company a, A1 1AA", "company c, A1 1AA"] * 2,
+            "date_of_creation": ["2010-01-01"] * 4,
+        }
+    )
+    expected.iloc[3] = None
+
+    try:
+        for _ in range(2):
+            results = match_companies_house_bulk(
+                company_names, "key", cache_path=cache_path, search_url=search_url
+            )
+            pd.testing.assert_frame_equal(results, expected)
+    finally:
+        server.shutdown()
+
+    assert sorted(CompaniesHouseStub.queries) == sorted(
+        ["company a", "company c", "unknown"] * 2
+    )
+
+
+def test_match_companies_house_bulk_rate_limit():
+    """
+    Test if match_companies_house_bulk() keeps making requests after the burst
+    with a small quota, at no more than max_requests per period.
+    """
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TimedCompaniesHouseStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    search_url = "http://127.0.0.1:{}/search/companies".format(server.server_port)
+
+    company_names = ["a", "b", "c", "d", "e"]
+    max_requests, period = 4, 1
+
+    try:
+        results = match_companies_house_bulk(
+            company_names,
+            "key",
+            cache_path=None,
+            search_url=search_url,
+            max_requests=max_requests,
+            period=period,
+        )
+    finally:
+        server.shutdown()
+
+    assert results["address_snippet"].tolist() == [
+        name + ", A1 1AA" for name in company_names
+    ]
+
+    # 10 requests with retries: a burst of 4, then at most 4 per second
+    times = TimedCompaniesHouseStub.times
+    assert len(times) == 2 * len(company_names)
+    for request in range(max_requests, len(times)):
+        assert (
+            times[request] - times[0]
+            >= (request - max_requests + 1) * period / max_requests - 0.05
+        )
+
+
+def test_installer_keys():
+    """
+    Test if build_installer_keys() assigns one key per pair of company unique ID
+    and MCS certificate number in sorted order, and if get_installer_key() looks them up.
+    """
+
+    installers = pd.DataFrame(
+        {
+            "company_name": ["b ltd", "a ltd", "a limited", "b ltd", "c ltd"],
+            "company_unique_id": [2, 1, 1, 2, 3],
+            "mcs_certificate_number": [20, 10, 10, 21, 30],
+        }
+    )
+
+    installer_keys = build_installer_keys(installers)
+
+    assert installer_keys["installer_key"].tolist() == [1, 0, 0, 2, 3]
+    assert get_installer_key(
+        installer_keys,
+        pd.Series([3, 1, 2, 4]),
+        pd.Series(["30", "10", "30", "40"]),
+    ).tolist() == [3, 0, -1, -1]
@@ -39,6 +39,7 @@ Examples for B1) cases are clean_POSTCODE() and clean_FLOOR_LEVEL().
 Examples for B2) cases are clean_PHOTO_SUPPLY() and clean_EFF_SCORES().
 
 Make sure to add B1 cases to the custom_cleaning_dict in custom_clean_features().
+B1 functions are only called once per distinct value, so the output should only depend on the given value.
 Make sure to add B2 cases to custom_clean_features() above the line  # [Additional cleaning functions here].
 Note that the function must contain a check whether the feature is even present in the given dataframe.
 
@@ -451,6 +452,32 @@ def remove_empty_features(df):
     return df
 
 
+def apply_per_unique_value(values, cleaning_function):
+    """Apply a cleaning function to each distinct value only once and
+    map the cleaned values back to all samples.
+    Same output as values.apply(cleaning_function), but much faster for
+    features with few distinct values.
+
+    Args:
+        values (pandas.Series): Values to clean.
+        cleaning_function (function): Function that cleans a single value.
+
+    Returns:
+        pandas.Series: Cleaned values.
+    """
+
+    if values.empty:
+        return values.apply(cleaning_function)
+
+    # Missing values are encoded as distinct value too, so they are cleaned as before
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    cleaned_uniques = pd.Series([cleaning_function(value) for value in uniques])
+
+    return pd.Series(
+        cleaned_uniques.values.take(codes), index=values.index, name=values.name
+    )
+
+
 def custom_clean_features(df, cap_features=False):
     """Custom clean features.
     For instances, standardise values and cap at max value.
@@ -475,7 +502,7 @@ def custom_clean_features(df, cap_features=False):
     # Custom cleaning by value (B1)
     for feat in df.columns:
         if feat in custom_cleaning_dict.keys():
-            df[feat] = df[feat].apply(custom_cleaning_dict[feat])
+            df[feat] = apply_per_unique_value(df[feat], custom_cleaning_dict[feat])
 
     # Custom cleaning by df (B2) - usually categorical to numeric feature cleaning
     df = clean_PHOTO_SUPPLY(df)
@@ -516,30 +543,49 @@ def enhance_construction_age_band(
     return construction_age_band
 
 
-def clean_epc_data(df):
+def enhance_construction_age_bands(df):
+    """Enhance CONSTRUCTION_AGE_BAND for all samples at once.
+    Vectorised version of enhance_construction_age_band() with identical output.
+
+    Args:
+        df (pandas.DataFrame): Dataframe to modify.
+
+    Returns:
+        pandas.DataFrame: Dataframe with enhanced construction age bands.
+    """
+
+    new_dwelling_unknown_age = (df["CONSTRUCTION_AGE_BAND"] == "unknown") & (
+        df["TRANSACTION_TYPE"] == "new dwelling"
+    )
+    df["CONSTRUCTION_AGE_BAND"] = df["CONSTRUCTION_AGE_BAND"].mask(
+        new_dwelling_unknown_age, "2007 onwards"
+    )
+
+    return df
+
+
+def clean_epc_data(df, remove_empty=True):
     """Standardise and clean EPC data.
     For example, reformat dates and standardise categories.
 
     Args:
         df (pandas.DataFrame): Raw/original EPC dataframe.
+        remove_empty (bool, optional): Whether to remove empty features.
+            Set to False when cleaning chunks of the data, as empty features can only be
+            identified on the entire dataset. Defaults to True.
 
     Returns:
         pandas.DataFram: Standarised and cleaned EPC dataframe.
     """
 
-    df = remove_empty_features(df)
+    if remove_empty:
+        df = remove_empty_features(df)
 
     df = standardise_unknowns(df)
     df = standardise_features(df)
     df = standardise_dates(df)
     df = custom_clean_features(df)
-
-    df["CONSTRUCTION_AGE_BAND"] = df.apply(
-        lambda x: enhance_construction_age_band(
-            x["CONSTRUCTION_AGE_BAND"], x["TRANSACTION_TYPE"]
-        ),
-        axis=1,
-    )
+    df = enhance_construction_age_bands(df)
 
     return df
 
@@ -14,14 +14,21 @@ to get_additional_features() in order to take effect in the next run.
 # ----------------------------------------------------------------------------------
 
 # Import
+import logging
+import re
+
 import pandas as pd
 import numpy as np
 
+from functools import lru_cache
 from hashlib import md5
 
 from asf_core_data.getters.supplementary_data.geospatial import coordinates
 from asf_core_data.pipeline.preprocessing.data_cleaning import reformat_postcode
-from asf_core_data.pipeline.mcs.process.process_mcs_utils import remove_punctuation
+from asf_core_data.pipeline.mcs.process.process_mcs_utils import (
+    remove_punctuation,
+    remove_punctuation_series,
+)
 
 # ----------------------------------------------------------------------------------
 
@@ -41,6 +48,58 @@ other_hp_expressions = [
     "bympiau gwres",  # different from above, starts with b
 ]
 
+# Heat pump types in order of precedence
+heat_pump_types = {
+    "ground source heat pump": "ground source heat pump",
+    "ground sourceheat pump": "ground source heat pump",
+    "air source heat pump": "air source heat pump",
+    "air sourceheat pump": "air source heat pump",
+    "water source heat pump": "water source heat pump",
+    "community heat pump": "community heat pump",
+}
+
+# Electric heating systems in order of precedence
+electric_heating_systems = {
+    "warm air": "warm air",
+    "electric storage heaters": "storage heater",
+    "electric underfloor heating": "underfloor heating",
+}
+
+# Heating sources in order of precedence
+heating_source_dict = {
+    "gas": "gas",
+    ", oil": "oil",  # with preceeding comma (!= "boiler")
+    "lpg": "LPG",
+    "electric": "electric",
+}
+
+heating_expressions = set(
+    list(heat_pump_types)
+    + other_hp_expressions
+    + list(electric_heating_systems)
+    + other_heating_system
+    + list(heating_source_dict)
+)
+
+# Find all heating expressions in one pass, including overlapping ones.
+# At the same position, longer expressions are preferred.
+heating_pattern = re.compile(
+    "(?=({}))".format(
+        "|".join(
+            re.escape(expression)
+            for expression in sorted(heating_expressions, key=len, reverse=True)
+        )
+    )
+)
+
+other_hp_pattern = re.compile(
+    "|".join(re.escape(expression) for expression in other_hp_expressions),
+    flags=re.IGNORECASE,
+)
+
+# Fixed key for hashing property identifiers, so that hashes are stable across runs
+property_identifier_hash_key = "asf_uprn_hashkey"
+
 # ----------------------------------------------------------------------------------
 
 
@@ -68,6 +127,30 @@ def prepare_address_data(address_1: str, address_2: str, postcode: str) -> str:
     return "_".join([address_info, postcode])
 
 
+def prepare_address_series(
+    address_1: pd.Series, address_2: pd.Series, postcode: pd.Series
+) -> pd.Series:
+    """
+    Vectorised version of prepare_address_data() for whole series of addresses and postcodes.
+
+    Args:
+        address_1: first lines of address (e.g. "Flat 1")
+        address_2: second lines of address (e.g. "ABC road")
+        postcode: full postcodes (e.g. "AB2 Y8X")
+
+    Returns:
+        Series with processed address_1, address_2 and postcode information,
+        e.g. "flat 1 abc road_AB2Y8X"
+    """
+    address_1 = remove_punctuation_series(address_1).str.lower().str.strip()
+    address_2 = remove_punctuation_series(address_2).str.lower().str.strip()
+    postcode = postcode.str.upper().str.replace(" ", "", regex=False)
+
+    address_info = (address_1 + " " + address_2).str.strip()
+
+    return address_info + "_" + postcode
+
+
 def concatenate_building_with_address_info(
     building_reference: str, address_info: str
 ) -> str:
@@ -84,41 +167,143 @@ def concatenate_building_with_address_info(
     return str(building_reference) + "_" + address_info
 
 
-def enhance_uprn(df: pd.DataFrame) -> pd.DataFrame:
+def add_property_identifier(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Enhances UPRN by filling missing information with known UPRN (if available)
-    or a new property identifier built from the BUILDING_REFERENCE_NUMBER and
-    full adress information.
+    Adds the address information and a new property identifier built from the
+    BUILDING_REFERENCE_NUMBER and full address information, which are used to enhance the UPRN.
 
     Args:
         df: EPC dataframe
 
     Returns:
-        EPC dataframe with enhanced UPRN.
+        EPC dataframe with address_info and new_property_identifier.
     """
 
     # Concatenate ADDRESS1, ADDRESS2 and POSTCODE into one variable
-    df["address_info"] = df.apply(
-        lambda x: prepare_address_data(x["ADDRESS1"], x["ADDRESS2"], x["POSTCODE"]),
-        axis=1,
+    df["address_info"] = prepare_address_series(
+        df["ADDRESS1"], df["ADDRESS2"], df["POSTCODE"]
     )
 
     # Building a new identifier using the building reference number and address info (including postcode)
-    df["new_property_identifier"] = df.apply(
-        lambda x: concatenate_building_with_address_info(
-            x["BUILDING_REFERENCE_NUMBER"], x["address_info"]
-        ),
-        axis=1,
+    df["new_property_identifier"] = (
+        df["BUILDING_REFERENCE_NUMBER"].astype(str) + "_" + df["address_info"]
     )
 
-    # Creating a mapping between new identifier and existing UPRNs
+    return df
+
+
+def get_uprn_mapping(df: pd.DataFrame) -> dict:
+    """
+    Creates a mapping between new property identifiers and existing UPRNs.
+    New identifiers with 2 or more corresponding UPRNs are left out.
+
+    Args:
+        df: EPC dataframe with UPRN and new_property_identifier,
+            e.g. from add_property_identifier()
+
+    Returns:
+        Mapping from new property identifier to UPRN.
+    """
+
     epc_with_uprn = df[~pd.isnull(df["UPRN"])][["UPRN", "new_property_identifier"]]
     mapping = epc_with_uprn.drop_duplicates(["UPRN", "new_property_identifier"])
 
     # If a specific new identifier has 2 or more corresponding UPRNs we filter it out from the mapping
     mapping = mapping[~mapping["new_property_identifier"].duplicated(keep=False)]
     mapping.set_index("new_property_identifier", inplace=True)
-    mapping = mapping.to_dict()["UPRN"]
+
+    return mapping.to_dict()["UPRN"]
+
+
+def hash_property_identifier(identifiers: pd.Series) -> pd.Series:
+    """
+    Creates a stable 64-bit integer identifier for each property identifier,
+    using a hash with a fixed key. The hashes are negative, so they
+    cannot be mistaken for actual UPRNs.
+
+    Args:
+        identifiers: property identifiers, e.g. new_property_identifier
+
+    Returns:
+        Hashed property identifiers (int64).
+    """
+
+    hashes = pd.util.hash_pandas_object(
+        identifiers, index=False, hash_key=property_identifier_hash_key
+    ).values
+
+    return pd.Series(
+        -(hashes >> np.uint64(1)).astype(np.int64) - 1, index=identifiers.index
+    )
+
+
+def check_property_identifier_collisions(identifiers: pd.Series) -> pd.DataFrame:
+    """
+    Finds distinct property identifiers that are hashed to the same value
+    by hash_property_identifier().
+
+    Args:
+        identifiers: property identifiers, e.g. new_property_identifier
+
+    Returns:
+        Colliding identifiers with their hash. Empty if there are no collisions.
+    """
+
+    identifiers = pd.Series(identifiers.dropna().unique())
+    hashes = hash_property_identifier(identifiers)
+    collisions = hashes.duplicated(keep=False)
+
+    return pd.DataFrame(
+        {"identifier": identifiers[collisions], "hash": hashes[collisions]}
+    ).reset_index(drop=True)
+
+
+def get_compact_uprn(uprn: pd.Series) -> tuple:
+    """
+    Converts enhanced UPRNs into int64 values. Numeric UPRNs are kept,
+    all others (e.g. new property identifiers) are hashed with hash_property_identifier().
+
+    Args:
+        uprn: enhanced UPRNs, mixing UPRNs and new property identifiers
+
+    Returns:
+        UPRNs (int64) and a flag whether the UPRN was hashed.
+    """
+
+    numeric_uprn = pd.to_numeric(uprn, errors="coerce")
+    hashed = ~((numeric_uprn >= 0) & (numeric_uprn % 1 == 0))
+
+    fallback_identifiers = uprn[hashed].astype(str)
+
+    collisions = check_property_identifier_collisions(fallback_identifiers)
+    if not collisions.empty:
+        logging.warning(
+            "{} property identifiers share a hashed UPRN.".format(collisions.shape[0])
+        )
+
+    int_uprn = np.zeros(uprn.shape[0], dtype=np.int64)
+    int_uprn[~hashed.values] = numeric_uprn[~hashed].astype(np.int64).values
+    int_uprn[hashed.values] = hash_property_identifier(fallback_identifiers).values
+
+    return pd.Series(int_uprn, index=uprn.index), hashed
+
+
+def apply_uprn_mapping(
+    df: pd.DataFrame, mapping: dict, compact: bool = False
+) -> pd.DataFrame:
+    """
+    Fills missing UPRNs using a mapping from new property identifiers to UPRNs
+    and, where no UPRN is known, with the new property identifier itself.
+
+    Args:
+        df: EPC dataframe with UPRN and new_property_identifier
+        mapping: mapping from new property identifier to UPRN, e.g. from get_uprn_mapping()
+        compact: whether to store the UPRN as int64, hashing the new property identifiers
+            and flagging them in UPRN_HASHED, see get_compact_uprn(). Defaults to False.
+
+    Returns:
+        EPC dataframe with enhanced UPRN.
+    """
 
     # Create an enhanced UPRN variable from the mapping above
     df["UPRN_enhanced"] = df["new_property_identifier"].map(mapping)
@@ -130,6 +315,9 @@ def enhance_uprn(df: pd.DataFrame) -> pd.DataFrame:
     # For properties not accounted above, use the new property identifier
     df["UPRN_enhanced"].fillna(df["new_property_identifier"], inplace=True)
 
+    if compact:
+        df["UPRN_enhanced"], df["UPRN_HASHED"] = get_compact_uprn(df["UPRN_enhanced"])
+
     # Dropping unecessary variables
     df.drop(columns=["UPRN", "new_property_identifier"], inplace=True)
 
@@ -139,6 +327,27 @@ def enhance_uprn(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def enhance_uprn(df: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    """
+    Enhances UPRN by filling missing information with known UPRN (if available)
+    or a new property identifier built from the BUILDING_REFERENCE_NUMBER and
+    full adress information.
+
+    Args:
+        df: EPC dataframe
+        compact: whether to store the UPRN as int64 with hashed new property identifiers,
+            see apply_uprn_mapping(). Defaults to False.
+
+    Returns:
+        EPC dataframe with enhanced UPRN.
+    """
+
+    df = add_property_identifier(df)
+    mapping = get_uprn_mapping(df)
+
+    return apply_uprn_mapping(df, mapping, compact=compact)
+
+
 def short_hash(text):
     """Generate a unique short hash for given string.
     Legacy code. No longer used in newer versions.
@@ -299,59 +508,66 @@ def map_rating_to_cat(rating):
         return "A-B"
 
 
-def get_heating_system(mainheat_description: str) -> str:
+@lru_cache(maxsize=100000)
+def classify_heating_description(mainheat_description: str) -> tuple:
     """
-    Extracts heating system from MAINHEAT_DESCRIPTION.
+    Extracts heating system and heating fuel from MAINHEAT_DESCRIPTION.
+    All heating expressions are found in one pass with a combined regular expression.
+    Results are cached per description, as there are relatively few distinct descriptions.
 
     Args:
         mainheat_description: EPC's MAINHEAT_DESCRIPTION value
     Returns:
-        Property's heating system information.
+        Property's heating system and heating fuel information.
     """
     if pd.isnull(mainheat_description):
-        return "unknown"
-    else:
-        heating = mainheat_description.lower()
-        heating = heating.replace(" & ", " and ")
+        return ("unknown", "unknown")
+
+    heating = mainheat_description.lower()
+    heating = heating.replace(" & ", " and ")
 
-        if ("ground source heat pump" in heating) or (
-            "ground sourceheat pump" in heating
-        ):
-            return "ground source heat pump"
+    expressions = set(heating_pattern.findall(heating))
 
-        elif ("air source heat pump" in heating) or ("air sourceheat pump" in heating):
-            return "air source heat pump"
+    for expression, hp_type in heat_pump_types.items():
+        if expression in expressions:
+            return (hp_type, "electric")
 
-        elif "water source heat pump" in heating:
-            return "water source heat pump"
+    if any(expression in expressions for expression in other_hp_expressions):
+        return ("heat pump", "electric")
 
-        elif "community heat pump" in heating:
-            return "community heat pump"
+    for expression, heating_system in electric_heating_systems.items():
+        if expression in expressions:
+            return (heating_system, "electric")
 
-        elif any(hp_expression in heating for hp_expression in other_hp_expressions):
-            return "heat pump"
+    # Set heating source if heating source word is found
+    heating_fuel = next(
+        (source for word, source in heating_source_dict.items() if word in expressions),
+        "unknown",
+    )
 
-        elif "warm air" in heating:
-            return "warm air"
+    if ("boiler and radiator" in expressions) and (
+        "boiler and underfloor" in expressions
+    ):
+        return ("boiler, radiator and underfloor", heating_fuel)
 
-        elif "electric storage heaters" in heating:
-            return "storage heater"
+    # If heating system word is found, save respective system type
+    for word in other_heating_system:
+        if word in expressions:
+            return (word, heating_fuel)
 
-        elif "electric underfloor heating" in heating:
-            return "underfloor heating"
+    return ("unknown", "unknown")
 
-        elif ("boiler and radiator" in heating) and (
-            "boiler and underfloor" in heating
-        ):
-            return "boiler, radiator and underfloor"
 
-        elif any(exp in heating for exp in other_heating_system):
-            # If heating system word is found, save respective system type
-            for word in other_heating_system:
-                if word in heating:
-                    return word
+def get_heating_system(mainheat_description: str) -> str:
+    """
+    Extracts heating system from MAINHEAT_DESCRIPTION.
 
-        return "unknown"
+    Args:
+        mainheat_description: EPC's MAINHEAT_DESCRIPTION value
+    Returns:
+        Property's heating system information.
+    """
+    return classify_heating_description(mainheat_description)[0]
 
 
 def get_heating_fuel(mainheat_description: str) -> str:
@@ -363,53 +579,7 @@ def get_heating_fuel(mainheat_description: str) -> str:
     Returns:
         Property's heating fuel information.
     """
-    if pd.isnull(mainheat_description):
-        return "unknown"
-    else:
-        heating = mainheat_description.lower()
-        heating = heating.replace(" & ", " and ")
-
-        if ("ground source heat pump" in heating) or (
-            "ground sourceheat pump" in heating
-        ):
-            return "electric"
-
-        elif ("air source heat pump" in heating) or ("air sourceheat pump" in heating):
-            return "electric"
-
-        elif "water source heat pump" in heating:
-            return "electric"
-
-        elif "community heat pump" in heating:
-            return "electric"
-
-        elif any(hp_expression in heating for hp_expression in other_hp_expressions):
-            return "electric"
-
-        elif "warm air" in heating:
-            return "electric"
-
-        elif "electric storage heaters" in heating:
-            return "electric"
-
-        elif "electric underfloor heating" in heating:
-            return "electric"
-
-        elif any(exp in heating for exp in other_heating_system):
-            # Set heating source dict
-            heating_source_dict = {
-                "gas": "gas",
-                ", oil": "oil",  # with preceeding comma (!= "boiler")
-                "lpg": "LPG",
-                "electric": "electric",
-            }
-
-            # If heating source word is found, save respective source type
-            for word, source in heating_source_dict.items():
-                if word in heating:
-                    return source
-
-    return "unknown"
+    return classify_heating_description(mainheat_description)[1]
 
 
 def get_heating_features(df, fine_grained_HP_types=False):
@@ -419,6 +589,8 @@ def get_heating_features(df, fine_grained_HP_types=False):
     HEATING_FUEL: oil, gas, LPC, electric, etc.
     HP_TYPE: heat pump type when applicable ("air source heat pump", etc. and "No HP" if no heat pump as heating system),
 
+    The descriptions are only classified once per distinct value.
+
     Args:
         df (pandas.DataFrame): EPC dataframe that is updated with heating features.
         fine_grained_HP_types (bool, optional):
@@ -431,45 +603,40 @@ def get_heating_features(df, fine_grained_HP_types=False):
     if "MAINHEAT_DESCRIPTION" not in df.columns:
         return df
 
-    df["HEATING_SYSTEM"] = df["MAINHEAT_DESCRIPTION"].apply(get_heating_system)
-    df["HP_INSTALLED"] = np.where(
-        df["HEATING_SYSTEM"].str.contains("heat pump"), True, False
+    codes, descriptions = pd.factorize(
+        df["MAINHEAT_DESCRIPTION"], use_na_sentinel=False
     )
-    df["HEATING_FUEL"] = df["MAINHEAT_DESCRIPTION"].apply(get_heating_fuel)
-    df["HP_TYPE"] = np.where(df["HP_INSTALLED"], df["HEATING_SYSTEM"], "No HP")
+    heating = [classify_heating_description(desc) for desc in descriptions]
+
+    heating_system = np.array([system for system, _ in heating], dtype=object)[codes]
+    heating_fuel = np.array([fuel for _, fuel in heating], dtype=object)[codes]
+    hp_installed = np.array(
+        ["heat pump" in system for system, _ in heating], dtype=bool
+    )[codes]
+    hp_type = np.where(hp_installed, heating_system, "No HP")
 
     if not fine_grained_HP_types:
-        df["HEATING_SYSTEM"] = np.where(
-            df["HEATING_SYSTEM"].str.contains("heat pump", case=False),
-            "heat pump",
-            df["HEATING_SYSTEM"],
-        )
+        heating_system = np.where(hp_installed, "heat pump", heating_system)
 
     # Also consider SECONDHEAT_DESCRIPTION and other languages
-    df["HP_INSTALLED"] = np.where(
-        (df["HP_INSTALLED"])
-        | (df["SECONDHEAT_DESCRIPTION"].str.contains("heat pump", case=False))
-        | (df["SECONDHEAT_DESCRIPTION"].str.contains("pumpa teas", case=False))
-        | (df["SECONDHEAT_DESCRIPTION"].str.contains("pwmp gwres", case=False))
-        | (df["SECONDHEAT_DESCRIPTION"].str.contains("bwmp gwres", case=False))
-        | (df["SECONDHEAT_DESCRIPTION"].str.contains("pympiau gwres", case=False))
-        | (df["SECONDHEAT_DESCRIPTION"].str.contains("bympiau gwres", case=False)),
-        True,
-        False,
-    )
-
-    # Update HP_TYPE, HEATING_SYSTEM and HEATING_FUEL after the changes to HP_INSTALLED
-    df["HEATING_SYSTEM"] = np.where(
-        df["HP_INSTALLED"] & (df["HP_TYPE"] == "No HP"),
-        "heat pump",
-        df["HEATING_SYSTEM"],
-    )
-    df["HEATING_FUEL"] = np.where(
-        df["HP_INSTALLED"] & (df["HP_TYPE"] == "No HP"), "electric", df["HEATING_FUEL"]
-    )
-    df["HP_TYPE"] = np.where(
-        df["HP_INSTALLED"] & (df["HP_TYPE"] == "No HP"), "heat pump", df["HP_TYPE"]
+    codes, descriptions = pd.factorize(
+        df["SECONDHEAT_DESCRIPTION"], use_na_sentinel=False
     )
+    second_hp_installed = np.array(
+        [
+            isinstance(desc, str) and other_hp_pattern.search(desc) is not None
+            for desc in descriptions
+        ],
+        dtype=bool,
+    )[codes]
+
+    # Update HP_TYPE, HEATING_SYSTEM and HEATING_FUEL for heat pumps as secondary heating
+    second_hp_only = second_hp_installed & ~hp_installed
+
+    df["HEATING_SYSTEM"] = np.where(second_hp_only, "heat pump", heating_system)
+    df["HP_INSTALLED"] = hp_installed | second_hp_installed
+    df["HEATING_FUEL"] = np.where(second_hp_only, "electric", heating_fuel)
+    df["HP_TYPE"] = np.where(second_hp_only, "heat pump", hp_type)
 
     return df
 
@@ -505,7 +672,7 @@ def get_postcode_coordinates(df, postcode_field_name="POSTCODE"):
     return df
 
 
-def get_building_entry_feature(df, feature):
+def get_building_entry_feature(df, feature, entry_counts=None):
     """Create feature that shows number of entries for any given building
     based on BUILDING_REFERENCE_NUMBER or BUILDING_ID.
 
@@ -513,6 +680,8 @@ def get_building_entry_feature(df, feature):
         df (pandas.DataFrame): EPC dataframe.
         feature (str): Feature by which to count building entries.
             Needs to be "BUILDING_REFERNCE_NUMBER" or "BUILDING_ID" or "UPRN".
+        entry_counts (dict, optional): Number of entries per building, e.g. when the
+            dataframe is only a chunk of the EPC data. Defaults to None, counting the entries in df.
 
     Returns:
         pandas.DataFrame: EPC dataframe with # entry feature.
@@ -531,24 +700,29 @@ def get_building_entry_feature(df, feature):
     # Get name of new feature
     new_feature_name = feature_name_dict[feature]
 
-    df[new_feature_name] = df[feature].map(dict(df.groupby(feature).size()))
+    if entry_counts is None:
+        entry_counts = dict(df.groupby(feature).size())
+
+    df[new_feature_name] = df[feature].map(entry_counts)
 
     return df
 
 
-def get_additional_features(df):
+def get_additional_features(df, compact_uprn=False):
     """Add new features to the EPC dataset.
     The new features include information about the inspection and entry date,
     building references, fine-grained heating system features and differences in EPC ratings.
 
     Args:
         df (pandas.DataFrame): EPC dataframe.
+        compact_uprn (bool, optional): Whether to store the UPRN as int64 with hashed
+            new property identifiers, see enhance_uprn(). Defaults to False.
 
     Returns:
         pandas.DataFrame: Updated dataframe with new features.
     """
 
-    df = enhance_uprn(df)
+    df = enhance_uprn(df, compact=compact_uprn)
     df = get_unique_building_id(df)
     df = get_building_entry_feature(df, "UPRN")
 
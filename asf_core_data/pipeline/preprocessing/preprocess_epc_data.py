@@ -7,6 +7,13 @@ import re
 import time
 import os
 import logging
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 
 from asf_core_data.pipeline.preprocessing import data_cleaning, feature_engineering
@@ -18,6 +25,478 @@ from argparse import ArgumentParser
 # ----------------------------------------------------------------------------------
 
 
+def prepare_parquet_dtypes(df, max_category_share=0.5):
+    """Prepare EPC data for storing as Parquet file.
+    Text features are stored as strings (missing values are kept)
+    and features with relatively few distinct values are stored as categoricals.
+
+    Args:
+        df (pandas.DataFrame): EPC dataframe to prepare.
+        max_category_share (float, optional): Max ratio of distinct values to samples
+            for storing a feature as categorical. If None, all text features are stored as strings.
+            Defaults to 0.5.
+
+    Returns:
+        pandas.DataFrame: EPC dataframe with Parquet compatible dtypes.
+    """
+
+    df = df.copy(deep=False)
+
+    for feat in df.select_dtypes(include="object").columns:
+        # Mixed types (e.g. UPRN) are stored as text, as when writing to csv
+        values = df[feat].where(df[feat].isna(), df[feat].astype(str))
+
+        if (
+            max_category_share is not None
+            and values.nunique() <= max_category_share * len(values)
+        ):
+            values = values.astype("category")
+
+        df[feat] = values
+
+    return df
+
+
+def save_epc_data(df, file_path, format="csv", partition_by_year=False):
+    """Save EPC data as csv file or Parquet dataset.
+
+    Parquet datasets are partitioned by COUNTRY (and optionally by INSPECTION_YEAR)
+    so that nation subsets can be loaded without reading the other nations' data.
+    The partitions are stored as subdirectories, e.g. EPC_GB_preprocessed.parquet/COUNTRY=Wales/.
+
+    Args:
+        df (pandas.DataFrame): EPC dataframe to save.
+        file_path (str/Path): Where to save the data to.
+        format (str, optional): File format: "csv" or "parquet". Defaults to "csv".
+        partition_by_year (bool, optional): Whether to also partition Parquet datasets
+            by year of INSPECTION_DATE, stored as feature INSPECTION_YEAR. Defaults to False.
+    """
+
+    if format == "csv":
+        df.to_csv(file_path, index=False)
+
+    elif format == "parquet":
+        partition_cols = [col for col in ["COUNTRY"] if col in df.columns]
+
+        if partition_by_year and "INSPECTION_DATE" in df.columns:
+            df = df.assign(
+                INSPECTION_YEAR=pd.to_datetime(
+                    df["INSPECTION_DATE"], errors="coerce"
+                ).dt.year.astype("Int64")
+            )
+            partition_cols.append("INSPECTION_YEAR")
+
+        # Writing a partitioned dataset adds files, so remove previous version first
+        if Path(file_path).is_dir():
+            shutil.rmtree(file_path)
+        elif Path(file_path).is_file():
+            os.remove(file_path)
+
+        prepare_parquet_dtypes(df).to_parquet(
+            file_path, index=False, partition_cols=partition_cols or None
+        )
+
+    else:
+        raise IOError("'{}' is not a valid EPC data format.".format(format))
+
+
+def get_output_path(
+    rel_path,
+    data_path=base_config.ROOT_DATA_PATH,
+    batch=None,
+    subset="GB",
+    format="csv",
+):
+    """Get path for saving EPC data at a given processing step.
+
+    Args:
+        rel_path (str/Path): Relative path to EPC data, e.g. base_config.PREPROC_EPC_DATA_PATH.
+        data_path (str/Path, optional): Path to ASF core data directory or 'S3'. Defaults to base_config.ROOT_DATA_PATH.
+        batch (str, optional): Data batch. Defaults to None.
+        subset (str, optional): Nation subset: "England", "Wales" or "Scotland", will adjust outfile path.
+            Defaults to "GB".
+        format (str, optional): File format: "csv" or "parquet". Defaults to "csv".
+
+    Returns:
+        Path: Path for saving EPC data.
+    """
+
+    file_path = data_batches.get_batch_path(
+        data_path / rel_path,
+        data_path=data_path,
+        batch=batch,
+        check_folder=(
+            "inputs" if rel_path == base_config.RAW_EPC_DATA_PATH else "outputs"
+        ),
+    )
+
+    if subset != "GB":
+        file_path = re.sub(
+            "GB",
+            subset,
+            str(file_path),
+        )
+
+    return Path(file_path).with_suffix("." + format)
+
+
+def save_epc_data_chunk(
+    df, file_path, chunk_index, format="csv", partition_by_year=False, schema=None
+):
+    """Append a chunk of EPC data to a csv file or Parquet dataset.
+    The first chunk (chunk_index=0) replaces any existing data.
+
+    Args:
+        df (pandas.DataFrame): Chunk of EPC data to save.
+        file_path (str/Path): Where to save the data to.
+        chunk_index (int): Position of chunk, used for the Parquet file names.
+        format (str, optional): File format: "csv" or "parquet". Defaults to "csv".
+        partition_by_year (bool, optional): Whether to also partition Parquet datasets
+            by year of INSPECTION_DATE, stored as feature INSPECTION_YEAR. Defaults to False.
+        schema (pyarrow.Schema, optional): Schema for Parquet datasets, as returned for the first chunk.
+            Defaults to None, inferring the schema from the chunk.
+
+    Returns:
+        pyarrow.Schema: Schema of Parquet dataset, None for csv files.
+    """
+
+    if format == "csv":
+        df.to_csv(
+            file_path,
+            index=False,
+            mode="w" if chunk_index == 0 else "a",
+            header=chunk_index == 0,
+        )
+        return None
+
+    if format != "parquet":
+        raise IOError("'{}' is not a valid EPC data format.".format(format))
+
+    partition_cols = [col for col in ["COUNTRY"] if col in df.columns]
+
+    if partition_by_year and "INSPECTION_DATE" in df.columns:
+        df = df.assign(
+            INSPECTION_YEAR=pd.to_datetime(
+                df["INSPECTION_DATE"], errors="coerce"
+            ).dt.year.astype("Int64")
+        )
+        partition_cols.append("INSPECTION_YEAR")
+
+    if chunk_index == 0:
+        if Path(file_path).is_dir():
+            shutil.rmtree(file_path)
+        elif Path(file_path).is_file():
+            os.remove(file_path)
+
+    # Categories are chosen per chunk, so store all text features as strings
+    df = prepare_parquet_dtypes(df, max_category_share=None)
+
+    if schema is None:
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+        # Features without any values in the first chunk are stored as strings
+        for i, field in enumerate(schema):
+            if pa.types.is_null(field.type):
+                schema = schema.set(i, field.with_type(pa.string()))
+
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        file_path,
+        partition_cols=partition_cols or None,
+        basename_template="chunk-{}-{{i}}.parquet".format(chunk_index),
+    )
+
+    return schema
+
+
+def replace_epc_data(tmp_file_path, file_path):
+    """Replace EPC data (csv file or Parquet dataset) with a newly written version.
+
+    Args:
+        tmp_file_path (str/Path): Path to newly written EPC data.
+        file_path (str/Path): Path to EPC data to replace.
+    """
+
+    if Path(file_path).is_dir():
+        shutil.rmtree(file_path)
+
+    os.replace(tmp_file_path, file_path)
+
+
+def get_common_dtypes(chunk_dtypes):
+    """Get dtypes that fit all chunks of a dataset, as chunks are cleaned independently
+    and may end up with different dtypes, e.g. int and float if only some chunks have missing values.
+
+    Args:
+        chunk_dtypes (list): Dtypes of each chunk (pandas.Series as returned by df.dtypes).
+
+    Returns:
+        dict: Common dtype per feature.
+    """
+
+    common_dtypes = {}
+
+    for dtypes in chunk_dtypes:
+        for feat, dtype in dtypes.items():
+            common_dtype = common_dtypes.setdefault(feat, dtype)
+
+            if common_dtype == dtype:
+                continue
+
+            if all(
+                pd.api.types.is_numeric_dtype(dt) and not pd.api.types.is_bool_dtype(dt)
+                for dt in [common_dtype, dtype]
+            ):
+                common_dtypes[feat] = np.promote_types(common_dtype, dtype)
+            else:
+                common_dtypes[feat] = np.dtype("object")
+
+    return common_dtypes
+
+
+def preprocess_data_in_chunks(
+    chunks,
+    remove_duplicates=True,
+    data_path=base_config.ROOT_DATA_PATH,
+    subset="GB",
+    batch=None,
+    save_data=base_config.PREPROC_EPC_DATA_PATH,
+    verbose=True,
+    format="csv",
+    partition_by_year=False,
+    compact_uprn=False,
+):
+    """Preprocess the raw EPC data chunk by chunk, without holding the entire dataset in memory.
+    Creates the same raw, preprocessed and deduplicated versions as preprocess_data().
+
+    The chunks are cleaned independently and stored temporarily on disk. Only the steps that need
+    information from the entire dataset are run in a second pass over the stored chunks:
+    removing empty features, enhancing the UPRN and counting the entries per UPRN.
+    Only a few address and date features per record are kept in memory for these steps.
+
+    Unlike preprocess_data(), the deduplicated data keeps the order of the raw data
+    instead of being sorted by INSPECTION_DATE.
+
+    Args:
+        chunks (iterable): Chunks of raw EPC data (pandas.DataFrame), e.g. from pd.read_csv(..., chunksize=N).
+        remove_duplicates (bool, optional): Whether or not to remove duplicates. Defaults to True.
+        data_path (str/Path, optional): Path to ASF core data directory or 'S3'. Defaults to base_config.ROOT_DATA_PATH.
+        subset (str, optional): Nation subset: "England", "Wales" or "Scotland", will adjust outfile path.
+        batch (str, optional): Data batch to load. Defaults to None.
+        save_data (str/Path):  Where to preprocessed data at different stages (original, cleaned, deduplicated).
+            Defaults to base_config.PREPROC_EPC_DATA_PATH.
+        verbose (bool, optional): Print number of features and samples after each processing step. Defaults to True.
+        format (str, optional): File format for saving the data: "csv" or "parquet". Defaults to "csv".
+        partition_by_year (bool, optional): Whether to also partition Parquet datasets
+            by year of INSPECTION_DATE. Defaults to False.
+        compact_uprn (bool, optional): Whether to store the UPRN as int64 with hashed
+            new property identifiers and a UPRN_HASHED flag. Defaults to False.
+    """
+
+    if save_data is None:
+        raise IOError("Preprocessing the EPC data in chunks requires saving the data.")
+
+    raw_file_path = get_output_path(
+        base_config.RAW_EPC_DATA_PATH, data_path, batch, subset, format
+    )
+    preproc_file_path = get_output_path(
+        base_config.PREPROC_EPC_DATA_PATH, data_path, batch, subset, format
+    )
+    dedupl_file_path = get_output_path(
+        base_config.PREPROC_EPC_DATA_DEDUPL_PATH, data_path, batch, subset, format
+    )
+
+    # The chunks may be read from the raw data file, so only replace it once all chunks are read
+    tmp_raw_file_path = raw_file_path.with_name(raw_file_path.name + ".tmp")
+
+    Path(raw_file_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(preproc_file_path).parent.mkdir(parents=True, exist_ok=True)
+
+    address_features = ["ADDRESS1", "ADDRESS2", "POSTCODE"]
+
+    n_samples = 0
+    n_chunks = 0
+    feature_values = {}
+    chunk_dtypes = []
+    chunk_states = []
+    raw_schema = None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # --------------------------------
+        # First pass: save raw data and clean chunks
+        # --------------------------------
+
+        print("Saving raw data to {}".format(raw_file_path))
+        print()
+
+        for chunk in chunks:
+            chunk = chunk.reset_index(drop=True)
+
+            raw_schema = save_epc_data_chunk(
+                chunk,
+                tmp_raw_file_path,
+                n_chunks,
+                format=format,
+                partition_by_year=partition_by_year,
+                schema=raw_schema,
+            )
+
+            # Keep track of up to two values per feature for identifying empty features
+            for feat in chunk.columns:
+                values = feature_values.setdefault(feat, set())
+                if len(values) < 2:
+                    values.update(chunk[feat].dropna().unique()[:2])
+
+            n_samples += chunk.shape[0]
+
+            chunk = data_cleaning.clean_epc_data(chunk, remove_empty=False)
+            chunk = feature_engineering.add_property_identifier(chunk)
+
+            chunk_states.append(
+                chunk[
+                    ["UPRN", "new_property_identifier", "INSPECTION_DATE"]
+                    + address_features
+                ].copy()
+            )
+            chunk_dtypes.append(chunk.dtypes)
+
+            chunk.to_pickle(Path(tmp_dir) / "chunk_{}.pkl".format(n_chunks))
+            n_chunks += 1
+
+        if n_chunks == 0:
+            raise IOError("No EPC data to preprocess.")
+
+        replace_epc_data(tmp_raw_file_path, raw_file_path)
+
+        # --------------------------------
+        # Global information
+        # --------------------------------
+
+        empty_features = [
+            feat for feat, values in feature_values.items() if len(values) < 2
+        ]
+        # Also remove features derived from empty features during cleaning
+        empty_features += [feat + "_SCORE" for feat in empty_features]
+
+        state = pd.concat(chunk_states, ignore_index=True)
+        del chunk_states
+
+        uprn_mapping = feature_engineering.get_uprn_mapping(state)
+        state = feature_engineering.apply_uprn_mapping(
+            state, uprn_mapping, compact=compact_uprn
+        )
+
+        # Samples without address are removed in get_unique_building_id()
+        if not any(feat in empty_features for feat in ["ADDRESS1", "POSTCODE"]):
+            state = state.dropna(subset=["ADDRESS1"])
+
+        uprn_entry_counts = dict(state.groupby("UPRN").size())
+
+        if remove_duplicates:
+            # Deduplicate on record positions, which are kept as index
+            state["POSITION"] = state.index
+            state = epc_data.filter_by_year(
+                state, None, building_identifier="UPRN", selection="latest entry"
+            )
+            keep_samples = np.zeros(n_samples, dtype=bool)
+            keep_samples[state["POSITION"].values] = True
+
+        del state
+
+        common_dtypes = get_common_dtypes(chunk_dtypes)
+
+        # --------------------------------
+        # Second pass: add features and save processed data
+        # --------------------------------
+
+        print("Saving preprocessed data to {}".format(preproc_file_path))
+        if remove_duplicates:
+            print(
+                "Saving preprocessed and deduplicated data to {}".format(
+                    dedupl_file_path
+                )
+            )
+        print()
+
+        offset = 0
+        n_features = None
+        n_preproc_samples = 0
+        n_dedupl_samples = 0
+        preproc_schema = None
+        dedupl_schema = None
+
+        for chunk_index in range(n_chunks):
+            chunk_file_path = Path(tmp_dir) / "chunk_{}.pkl".format(chunk_index)
+            chunk = pd.read_pickle(chunk_file_path)
+            os.remove(chunk_file_path)
+
+            chunk = chunk.astype(common_dtypes)
+            chunk.index = pd.RangeIndex(offset, offset + chunk.shape[0])
+            offset += chunk.shape[0]
+
+            chunk.drop(
+                columns=[feat for feat in empty_features if feat in chunk.columns],
+                inplace=True,
+            )
+            # Cleaned features without address_info and new_property_identifier
+            n_features = chunk.shape[1] - 2
+
+            chunk = feature_engineering.apply_uprn_mapping(
+                chunk, uprn_mapping, compact=compact_uprn
+            )
+            if not compact_uprn:
+                chunk["UPRN"] = chunk["UPRN"].astype(object)
+            chunk = feature_engineering.get_unique_building_id(chunk)
+            chunk = feature_engineering.get_building_entry_feature(
+                chunk, "UPRN", entry_counts=uprn_entry_counts
+            )
+            chunk = feature_engineering.get_heating_features(chunk)
+            chunk = feature_engineering.get_new_epc_rating_features(chunk)
+
+            preproc_schema = save_epc_data_chunk(
+                chunk,
+                preproc_file_path,
+                chunk_index,
+                format=format,
+                partition_by_year=partition_by_year,
+                schema=preproc_schema,
+            )
+            n_preproc_samples += chunk.shape[0]
+
+            if remove_duplicates:
+                chunk = chunk.loc[keep_samples[chunk.index]]
+                dedupl_schema = save_epc_data_chunk(
+                    chunk,
+                    dedupl_file_path,
+                    chunk_index,
+                    format=format,
+                    partition_by_year=partition_by_year,
+                    schema=dedupl_schema,
+                )
+                n_dedupl_samples += chunk.shape[0]
+
+    # --------------------------------
+    # Print stats
+    # --------------------------------
+
+    if verbose:
+        n_preproc_features = chunk.shape[1]
+        processing_steps = [
+            ("Original data", n_samples, len(feature_values)),
+            ("After cleaning", n_samples, n_features),
+            ("After adding features", n_preproc_samples, n_preproc_features),
+        ]
+
+        if remove_duplicates:
+            processing_steps.append(
+                ("After removing duplicates", n_dedupl_samples, n_preproc_features)
+            )
+
+        for step in processing_steps:
+            print("{}:\t{} samples, {} features".format(step[0], step[1], step[2]))
+
+
 def preprocess_data(
     df,
     remove_duplicates=True,
@@ -26,6 +505,10 @@ def preprocess_data(
     batch=None,
     save_data=base_config.PREPROC_EPC_DATA_PATH,
     verbose=True,
+    format="csv",
+    partition_by_year=False,
+    chunksize=None,
+    compact_uprn=False,
 ):
     """Preprocess the raw EPC data by cleaning it and removing duplications.
     The data at the different processing steps can be saved.
@@ -43,6 +526,7 @@ def preprocess_data(
 
     Args:
         df (pandas.DataFrame): Dataframe holding EPC data to process.
+            If chunksize is given, this can also be an iterable of dataframes, e.g. from pd.read_csv(..., chunksize=N).
         remove_duplicates (bool, optional): Whether or not to remove duplicates.. Defaults to True.
         data_path (str/Path, optional): Path to ASF core data directory or 'S3'. Defaults to base_config.ROOT_DATA_PATH.
         subset (str, optional): Nation subset: "England", "Wales" or "Scotland", will adjust outfile path.
@@ -50,36 +534,58 @@ def preprocess_data(
         save_data (str/Path):  Where to preprocessed data at different stages (original, cleaned, deduplicated).
             None does not save the outputs. Defaults to base_config.PREPROC_EPC_DATA_PATH.
         verbose (bool, optional): Print number of features and samples after each processing step. Defaults to True.
+        format (str, optional): File format for saving the data: "csv" or "parquet". Defaults to "csv".
+            Parquet datasets are partitioned by COUNTRY.
+        partition_by_year (bool, optional): Whether to also partition Parquet datasets
+            by year of INSPECTION_DATE. Defaults to False.
+        chunksize (int, optional): Number of samples to process at once.
+            If given, the data is processed in chunks with preprocess_data_in_chunks() and
+            only saved, not returned. Defaults to None, processing all data at once.
+        compact_uprn (bool, optional): Whether to store the UPRN as int64 instead of mixing UPRNs and
+            new property identifiers. New property identifiers are hashed and flagged in UPRN_HASHED.
+            Defaults to False.
 
     Returns:
-        pandas.DataFrame: Preprocessed EPC dataset.
+        pandas.DataFrame: Preprocessed EPC dataset. None if processed in chunks.
     """
 
+    if chunksize is not None:
+        chunks = df
+        if isinstance(df, pd.DataFrame):
+            chunks = (
+                df.iloc[start : start + chunksize].copy()
+                for start in range(0, df.shape[0], chunksize)
+            )
+
+        preprocess_data_in_chunks(
+            chunks,
+            remove_duplicates=remove_duplicates,
+            data_path=data_path,
+            subset=subset,
+            batch=batch,
+            save_data=save_data,
+            verbose=verbose,
+            format=format,
+            partition_by_year=partition_by_year,
+            compact_uprn=compact_uprn,
+        )
+        return None
+
     # --------------------------------
     # Raw data
     # --------------------------------
 
     if save_data is not None:
-        file_path = data_batches.get_batch_path(
-            data_path / base_config.RAW_EPC_DATA_PATH,
-            data_path=data_path,
-            batch=batch,
-            check_folder="inputs",
+        file_path = get_output_path(
+            base_config.RAW_EPC_DATA_PATH, data_path, batch, subset, format
         )
-
-        if subset != "GB":
-            file_path = re.sub(
-                "GB",
-                subset,
-                str(file_path),
-            )
         print("Saving raw data to {}".format(file_path))
         print()
 
         Path(file_path).parent.mkdir(parents=True, exist_ok=True)
 
         # Save unaltered_version
-        df.to_csv(file_path, index=False)
+        save_epc_data(df, file_path, format=format, partition_by_year=partition_by_year)
 
     processing_steps = []
     processing_steps.append(("Original data", df.shape[0], df.shape[1]))
@@ -91,29 +597,18 @@ def preprocess_data(
     df = data_cleaning.clean_epc_data(df)
     processing_steps.append(("After cleaning", df.shape[0], df.shape[1]))
 
-    df = feature_engineering.get_additional_features(df)
+    df = feature_engineering.get_additional_features(df, compact_uprn=compact_uprn)
     processing_steps.append(("After adding features", df.shape[0], df.shape[1]))
 
     if save_data is not None:
-        file_path = data_batches.get_batch_path(
-            data_path / base_config.PREPROC_EPC_DATA_PATH,
-            data_path=data_path,
-            batch=batch,
-            check_folder="outputs",
+        file_path = get_output_path(
+            base_config.PREPROC_EPC_DATA_PATH, data_path, batch, subset, format
         )
-
-        if subset != "GB":
-            file_path = re.sub(
-                "GB",
-                subset,
-                str(file_path),
-            )
-
         print("Saving preprocessed data to {}".format(file_path))
         print()
 
         # Save unaltered_version
-        df.to_csv(file_path, index=False)
+        save_epc_data(df, file_path, format=format, partition_by_year=partition_by_year)
 
     # --------------------------------
     # Deduplicated data
@@ -127,25 +622,20 @@ def preprocess_data(
         processing_steps.append(("After removing duplicates", df.shape[0], df.shape[1]))
 
         if save_data is not None:
-            file_path = data_batches.get_batch_path(
-                data_path / base_config.PREPROC_EPC_DATA_DEDUPL_PATH,
-                data_path=data_path,
-                batch=batch,
-                check_folder="outputs",
+            file_path = get_output_path(
+                base_config.PREPROC_EPC_DATA_DEDUPL_PATH,
+                data_path,
+                batch,
+                subset,
+                format,
             )
-
-            if subset != "GB":
-                file_path = re.sub(
-                    "GB",
-                    subset,
-                    str(file_path),
-                )
-
             print("Saving preprocessed and deduplicated data to {}".format(file_path))
             print()
 
             # Save unaltered_version
-            df.to_csv(file_path, index=False)
+            save_epc_data(
+                df, file_path, format=format, partition_by_year=partition_by_year
+            )
 
     # --------------------------------
     # Print stats
@@ -168,6 +658,10 @@ def load_and_preprocess_epc_data(
     remove_duplicates=True,
     save_data=base_config.PREPROC_EPC_DATA_PATH,
     reload_raw=False,
+    format="csv",
+    partition_by_year=False,
+    chunksize=None,
+    compact_uprn=False,
 ):
     """Load and preprocess the EPC data.
 
@@ -187,9 +681,20 @@ def load_and_preprocess_epc_data(
         reload_raw (bool, optional): Whether to reload the individual raw EPC records from inputs folder
             or whether to use  the fully concatenated raw EPC data from the outputs folder (still unprocessed).
             Reloading can be useful if there have been changes to the input data or the loading functions. Defaults to False.
+        format (str, optional): File format of the concatenated raw and the processed EPC data: "csv" or "parquet".
+            Defaults to "csv".
+        partition_by_year (bool, optional): Whether to also partition Parquet outputs
+            by year of INSPECTION_DATE. Defaults to False.
+        chunksize (int, optional): Number of samples to process at once, see preprocess_data().
+            Only the concatenated raw csv file from the outputs folder is also loaded in chunks.
+            When reloading the raw EPC records from the inputs folder or loading Parquet data,
+            all raw data is still loaded into memory before processing it in chunks.
+            Defaults to None, processing all data at once.
+        compact_uprn (bool, optional): Whether to store the UPRN as int64, see preprocess_data().
+            Defaults to False.
 
     Returns:
-        pandas.DataFrame:  Preprocessed EPC dataset.
+        pandas.DataFrame:  Preprocessed EPC dataset. None if processed in chunks.
     """
 
     # Default to False
@@ -202,10 +707,10 @@ def load_and_preprocess_epc_data(
     else:
         raw_data_path = data_batches.get_batch_path(
             base_config.RAW_EPC_DATA_PATH, data_path, batch, check_folder="inputs"
-        )
+        ).with_suffix("." + format)
 
         # Raw EPC can be found in data path?
-        raw_epc_exists = (Path(data_path) / raw_data_path).is_file()
+        raw_epc_exists = (Path(data_path) / raw_data_path).exists()
 
     if n_samples is not None:
         save_data = None
@@ -224,6 +729,12 @@ def load_and_preprocess_epc_data(
             "Nation subsets do not work well in combination with low n_samples. Set n_samples=None for best results."
         )
 
+    if chunksize is not None and save_data is None:
+        chunksize = None
+        logging.warning(
+            "Processed data is only returned when processing all data at once, so chunksize is ignored."
+        )
+
     # Load raw EPC data (for all of GB or subset)
     # ++++++++++++++++++++++++++++++++++++++++++++
     # There's two options, but if all data sources are up-to-date, the output is the same.
@@ -243,7 +754,20 @@ def load_and_preprocess_epc_data(
     # This option is not (yet) available when loading data directly from S3.
 
     # Option a): Load raw EPC data (concatenated but not actually processed yet)
-    if (raw_epc_exists and not reload_raw) or str(data_path) == "S3":
+    if ((raw_epc_exists and not reload_raw) or str(data_path) == "S3") and (
+        chunksize is not None and format == "csv"
+    ):
+        # Stream raw EPC from outputs folder in chunks, without loading all data at once
+        epc_df = epc_data.load_preprocessed_epc_data_in_chunks(
+            data_path=data_path,
+            subset=subset,
+            batch=batch,
+            version="raw",
+            usecols=usecols,
+            chunksize=chunksize,
+        )
+
+    elif (raw_epc_exists and not reload_raw) or str(data_path) == "S3":
         # Load raw EPC from outputs folder for given batch (England/Wales/Scotland combined in EPC_GB_raw.csv)
         epc_df = epc_data.load_preprocessed_epc_data(
             data_path=data_path,
@@ -252,12 +776,20 @@ def load_and_preprocess_epc_data(
             version="raw",
             usecols=usecols + ["COUNTRY"],
             n_samples=n_samples,
+            format=format,
         )
 
     # Option b): Load the raw EPC data for given batch from individual EPC record files
     # in inputs folder and concatenate the outputs for all countries.
     # The feature 'COUNTRY' will be added as the data is loaded.
+    # This loads all raw data at once, even when processing it in chunks.
     else:
+        if chunksize is not None:
+            logging.warning(
+                "The raw EPC records are loaded at once and only processed in chunks. "
+                "Use the concatenated raw csv file to also load the data in chunks."
+            )
+
         epc_df = epc_data.load_raw_epc_data(
             data_path=data_path,
             rel_data_path=rel_data_path,
@@ -282,6 +814,10 @@ def load_and_preprocess_epc_data(
         remove_duplicates=remove_duplicates,
         save_data=save_data,
         batch=batch,
+        format=format,
+        partition_by_year=partition_by_year,
+        chunksize=chunksize,
+        compact_uprn=compact_uprn,
     )
     return epc_df
 
@@ -291,6 +827,9 @@ def create_argparser() -> ArgumentParser:
     """
     Creates an argument parser that can receive the following arguments:
     - path_to_data: either local path to where data is stored or "S3"
+    - format: file format for the processed EPC data, "csv" or "parquet"
+    - chunksize: number of samples to process at once
+    - compact_uprn: whether to store the UPRN as int64
     """
     parser = ArgumentParser()
 
@@ -301,6 +840,27 @@ def create_argparser() -> ArgumentParser:
         type=str,
     )
 
+    parser.add_argument(
+        "--format",
+        help="File format for the processed EPC data",
+        default="csv",
+        choices=["csv", "parquet"],
+        type=str,
+    )
+
+    parser.add_argument(
+        "--chunksize",
+        help="Number of samples to process at once, processing all data at once if not given",
+        default=None,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--compact_uprn",
+        help="Store the UPRN as int64, hashing new property identifiers",
+        action="store_true",
+    )
+
     return parser
 
 
@@ -313,7 +873,12 @@ if __name__ == "__main__":
     start_time = time.time()
 
     print("Loading and preprocessing EPC data... This will take a while.\n")
-    load_and_preprocess_epc_data(data_path=LOCAL_DATA_DIR)
+    load_and_preprocess_epc_data(
+        data_path=LOCAL_DATA_DIR,
+        format=args.format,
+        chunksize=args.chunksize,
+        compact_uprn=args.compact_uprn,
+    )
 
     end_time = time.time()
     runtime = round((end_time - start_time) / 60)
@@ -0,0 +1,77 @@
+"""
+Script to benchmark the row-wise and vectorised cleaning functions for the EPC data.
+
+Run with:
+python asf_core_data/pipeline/preprocessing/test/benchmark_data_cleaning.py --n_samples 1000000
+
+enhance_construction_age_band for 1,000,000 samples (pandas 1.5.3, Python 3.11):
+row-wise: 8.538s, vectorised: 0.174s
+"""
+
+import time
+from argparse import ArgumentParser
+
+from asf_core_data.pipeline.preprocessing.data_cleaning import (
+    enhance_construction_age_band,
+    enhance_construction_age_bands,
+)
+from asf_core_data.pipeline.preprocessing.test.test_data_cleaning import (
+    get_sampled_age_band_data,
+)
+
+
+def benchmark_enhance_construction_age_band(n_samples=1000000):
+    """
+    Time enhancing the construction age band row by row and vectorised.
+
+    Args:
+        n_samples (int, optional): Number of samples. Defaults to 1000000.
+
+    Returns:
+        dict: Runtime in seconds for each version.
+    """
+
+    df = get_sampled_age_band_data(n_samples=n_samples)
+
+    start_time = time.perf_counter()
+    df.apply(
+        lambda x: enhance_construction_age_band(
+            x["CONSTRUCTION_AGE_BAND"], x["TRANSACTION_TYPE"]
+        ),
+        axis=1,
+    )
+    row_wise_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    enhance_construction_age_bands(df)
+    vectorised_time = time.perf_counter() - start_time
+
+    return {"row-wise": row_wise_time, "vectorised": vectorised_time}
+
+
+def create_argparser() -> ArgumentParser:
+    """
+    Creates an argument parser that can receive the following arguments:
+    - n_samples: number of samples to benchmark on
+    """
+    parser = ArgumentParser()
+
+    parser.add_argument(
+        "--n_samples",
+        help="Number of samples",
+        default=1000000,
+        type=int,
+    )
+
+    return parser
+
+
+if __name__ == "__main__":
+    parser = create_argparser()
+    args = parser.parse_args()
+
+    runtimes = benchmark_enhance_construction_age_band(n_samples=args.n_samples)
+
+    print("enhance_construction_age_band ({} samples):".format(args.n_samples))
+    for version, runtime in runtimes.items():
+        print("{}:\t{:.3f}s".format(version, runtime))
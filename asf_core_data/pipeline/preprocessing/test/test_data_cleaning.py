@@ -0,0 +1,119 @@
+"""
+Script to test the cleaning functions for the EPC data.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from asf_core_data.pipeline.preprocessing.data_cleaning import (
+    enhance_construction_age_band,
+    enhance_construction_age_bands,
+    apply_per_unique_value,
+    clean_POSTCODE,
+    clean_CONSTRUCTION_AGE_BAND,
+    clean_LOCAL_AUTHORITY,
+    clean_FLOOR_LEVEL,
+    clean_GLAZED_AREA,
+)
+from asf_core_data.pipeline.preprocessing import data_cleaning_utils
+
+
+def get_sampled_age_band_data(n_samples=10000, seed=42):
+    """
+    Sample construction age bands and transaction types, including unknown and missing values.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    age_bands = list(
+        set(data_cleaning_utils.feature_cleaning_dict["CONSTRUCTION_AGE_BAND"].values())
+        | set(
+            data_cleaning_utils.feature_cleaning_dict[
+                "CONSTRUCTION_AGE_BAND_MERGED"
+            ].values()
+        )
+    ) + ["unknown", np.nan]
+    transaction_types = list(
+        set(data_cleaning_utils.feature_cleaning_dict["TRANSACTION_TYPE"].values())
+    ) + ["new dwelling", "unknown", np.nan]
+
+    return pd.DataFrame(
+        {
+            "CONSTRUCTION_AGE_BAND": rng.choice(
+                np.array(age_bands, dtype=object), n_samples
+            ),
+            "TRANSACTION_TYPE": rng.choice(
+                np.array(transaction_types, dtype=object), n_samples
+            ),
+        }
+    )
+
+
+def test_enhance_construction_age_bands():
+    """
+    Test if the enhance_construction_age_bands() function returns the same
+    construction age bands as applying enhance_construction_age_band() to each sample.
+    """
+
+    df = get_sampled_age_band_data()
+
+    expected = df.apply(
+        lambda x: enhance_construction_age_band(
+            x["CONSTRUCTION_AGE_BAND"], x["TRANSACTION_TYPE"]
+        ),
+        axis=1,
+    )
+    enhanced = enhance_construction_age_bands(df.copy())["CONSTRUCTION_AGE_BAND"]
+
+    pd.testing.assert_series_equal(enhanced, expected, check_names=False)
+    assert (enhanced == "2007 onwards").sum() > (
+        df["CONSTRUCTION_AGE_BAND"] == "2007 onwards"
+    ).sum()
+
+
+def test_enhance_construction_age_bands_missing_feature():
+    """
+    Test if the enhance_construction_age_bands() function fails, as the row-wise version did,
+    instead of skipping the enhancement when a required feature is missing.
+    """
+
+    df = get_sampled_age_band_data(n_samples=10)
+
+    for feature in ["CONSTRUCTION_AGE_BAND", "TRANSACTION_TYPE"]:
+        with pytest.raises(KeyError):
+            enhance_construction_age_bands(df.drop(columns=feature))
+
+
+def test_apply_per_unique_value():
+    """
+    Test if the apply_per_unique_value() function returns the same values
+    as applying the cleaning function to each sample for the custom cleaning functions.
+    """
+
+    rng = np.random.default_rng(42)
+    feature_cleaning_dict = data_cleaning_utils.feature_cleaning_dict
+
+    feature_values = {
+        clean_POSTCODE: ["AB1 2CD", " ab12cd", "EH3 9QQ ", "cf101aa"],
+        clean_CONSTRUCTION_AGE_BAND: list(
+            feature_cleaning_dict["CONSTRUCTION_AGE_BAND_MERGED"].keys()
+        )
+        + ["unknown", " 1950-1966 "],
+        clean_LOCAL_AUTHORITY: ["00EM", "16UD", "E06000001", "unknown", np.nan],
+        clean_FLOOR_LEVEL: list(feature_cleaning_dict["FLOOR_LEVEL"].keys())
+        + ["unknown", np.nan],
+        clean_GLAZED_AREA: list(feature_cleaning_dict["GLAZED_AREA_NUM"].keys())
+        + ["unknown", np.nan],
+    }
+
+    for cleaning_function, values in feature_values.items():
+        values = pd.Series(
+            rng.choice(np.array(values, dtype=object), 1000),
+            index=rng.permutation(1000),
+        )
+
+        pd.testing.assert_series_equal(
+            apply_per_unique_value(values, cleaning_function),
+            values.apply(cleaning_function),
+        )
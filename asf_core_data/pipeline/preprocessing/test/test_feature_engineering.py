@@ -0,0 +1,252 @@
+"""
+Script to test the feature engineering functions for the EPC data.
+"""
+
+import numpy as np
+import pandas as pd
+
+from asf_core_data.pipeline.preprocessing.feature_engineering import (
+    add_property_identifier,
+    prepare_address_data,
+    concatenate_building_with_address_info,
+    hash_property_identifier,
+    check_property_identifier_collisions,
+    enhance_uprn,
+    get_heating_features,
+    other_heating_system,
+    other_hp_expressions,
+)
+
+
+def test_add_property_identifier():
+    """
+    Test if the vectorised add_property_identifier() returns the same address info and
+    property identifiers as the row-wise prepare_address_data() and
+    concatenate_building_with_address_info().
+    """
+
+    df = pd.DataFrame(
+        {
+            "ADDRESS1": ["Flat 3/2", " 12, High St. ", "Tŷ Gwyn", "“The Lodge”", "1-3"],
+            "ADDRESS2": ["ABC Road", np.nan, "Heol-y-Bont!", "", "Mill Lane "],
+            "POSTCODE": ["AB2 Y8X", "EH39QQ", "cf10 1aa", "SW1A 1AA", "LS1 4AP"],
+            "BUILDING_REFERENCE_NUMBER": [1234, 5678, 91011, 1213, 1415],
+        }
+    )
+
+    address_info = [
+        prepare_address_data(add1, add2, postcode)
+        for add1, add2, postcode in zip(df["ADDRESS1"], df["ADDRESS2"], df["POSTCODE"])
+    ]
+    new_property_identifier = [
+        concatenate_building_with_address_info(building_reference, info)
+        for building_reference, info in zip(
+            df["BUILDING_REFERENCE_NUMBER"], address_info
+        )
+    ]
+
+    df = add_property_identifier(df)
+
+    assert df["address_info"].tolist() == address_info
+    assert df["new_property_identifier"].tolist() == new_property_identifier
+
+
+def test_enhance_uprn_compact():
+    """
+    Test if the compact UPRN keeps the numeric UPRNs and consistently
+    replaces new property identifiers with negative hashes.
+    """
+
+    df = pd.DataFrame(
+        {
+            "ADDRESS1": ["Flat 1", "Flat 1", "Flat 2", "Flat 3", "Flat 3"],
+            "ADDRESS2": ["ABC Road"] * 5,
+            "POSTCODE": ["AB2Y8X"] * 5,
+            "BUILDING_REFERENCE_NUMBER": [1, 1, 2, 3, 3],
+            "UPRN": ["100023336956", np.nan, "100023336957", np.nan, np.nan],
+        }
+    )
+
+    enhanced = enhance_uprn(df.copy())
+    compact = enhance_uprn(df.copy(), compact=True)
+
+    assert compact["UPRN"].dtype == np.int64
+    assert compact["UPRN_HASHED"].tolist() == [False, False, False, True, True]
+    assert compact["UPRN"].tolist()[:3] == [100023336956, 100023336956, 100023336957]
+    assert (
+        compact["UPRN"].iloc[3:].tolist()
+        == hash_property_identifier(enhanced["UPRN"].iloc[3:]).tolist()
+    )
+    assert (compact["UPRN"].iloc[3:] < 0).all()
+    assert check_property_identifier_collisions(enhanced["UPRN"].astype(str)).empty
+
+
+def get_heating_system_row_wise(mainheat_description):
+    """
+    Previous row-wise extraction of the heating system from MAINHEAT_DESCRIPTION.
+    """
+
+    if pd.isnull(mainheat_description):
+        return "unknown"
+
+    heating = mainheat_description.lower().replace(" & ", " and ")
+
+    if ("ground source heat pump" in heating) or ("ground sourceheat pump" in heating):
+        return "ground source heat pump"
+    elif ("air source heat pump" in heating) or ("air sourceheat pump" in heating):
+        return "air source heat pump"
+    elif "water source heat pump" in heating:
+        return "water source heat pump"
+    elif "community heat pump" in heating:
+        return "community heat pump"
+    elif any(hp_expression in heating for hp_expression in other_hp_expressions):
+        return "heat pump"
+    elif "warm air" in heating:
+        return "warm air"
+    elif "electric storage heaters" in heating:
+        return "storage heater"
+    elif "electric underfloor heating" in heating:
+        return "underfloor heating"
+    elif ("boiler and radiator" in heating) and ("boiler and underfloor" in heating):
+        return "boiler, radiator and underfloor"
+    for word in other_heating_system:
+        if word in heating:
+            return word
+
+    return "unknown"
+
+
+def get_heating_fuel_row_wise(mainheat_description):
+    """
+    Previous row-wise extraction of the heating fuel from MAINHEAT_DESCRIPTION.
+    """
+
+    if pd.isnull(mainheat_description):
+        return "unknown"
+
+    heating = mainheat_description.lower().replace(" & ", " and ")
+
+    if ("ground source heat pump" in heating) or ("ground sourceheat pump" in heating):
+        return "electric"
+    elif ("air source heat pump" in heating) or ("air sourceheat pump" in heating):
+        return "electric"
+    elif "water source heat pump" in heating:
+        return "electric"
+    elif "community heat pump" in heating:
+        return "electric"
+    elif any(hp_expression in heating for hp_expression in other_hp_expressions):
+        return "electric"
+    elif "warm air" in heating:
+        return "electric"
+    elif "electric storage heaters" in heating:
+        return "electric"
+    elif "electric underfloor heating" in heating:
+        return "electric"
+    elif any(exp in heating for exp in other_heating_system):
+        heating_source_dict = {
+            "gas": "gas",
+            ", oil": "oil",
+            "lpg": "LPG",
+            "electric": "electric",
+        }
+        for word, source in heating_source_dict.items():
+            if word in heating:
+                return source
+
+    return "unknown"
+
+
+def test_get_heating_features():
+    """
+    Test if get_heating_features() returns the same heating features as the previous
+    row-wise classification, for overlapping expressions, heat pump variants,
+    missing values and heat pumps in the second heating description.
+    """
+
+    mainheat_descriptions = [
+        "Boiler and radiators, mains gas",
+        "Boiler & radiators, mains gas",
+        "Boiler and radiators, mains gas; Boiler and underfloor heating, mains gas",
+        "Boiler and radiators, oil",
+        "Boiler and radiators, LPG",
+        "Boiler and radiators, electric",
+        "Boiler and radiators, wood logs",
+        "Community scheme",
+        "Community scheme with CHP, heat pump",
+        "Community heat pump",
+        "Air source heat pump, radiators, electric",
+        "AIR SOURCEHEAT PUMP, warm air, electric",
+        "Ground source heat pump, underfloor, electric",
+        "Ground sourceheat pump, Systems with radiators",
+        "Water source heat pump, radiators, electric",
+        "Air source heat pump; Ground source heat pump",
+        "Heat pump, warm air, electric",
+        "Pwmp gwres, awyr, trydan",
+        "Bwmp gwres ffynhonnell aer, rheiddiaduron",
+        "Pympiau gwres, trydan",
+        "Bympiau gwres, trydan",
+        "Pumpa teas aeir",
+        "Warm air, Electricaire",
+        "Warm air, mains gas",
+        "Electric storage heaters",
+        "Electric storage heaters, heat pump",
+        "Electric underfloor heating",
+        "electric underfloor heating, mains gas",
+        "Room heaters, electric",
+        "Room heaters, mains gas",
+        "Portable electric heaters assumed for most rooms",
+        "No system present: electric heaters assumed",
+        "SAP05:Main-Heating",
+        "",
+        np.nan,
+    ]
+    secondheat_descriptions = [
+        np.nan,
+        "Room heaters, electric",
+        "Air source heat pump, electric",
+        "PWMP GWRES, trydan",
+        "Pumpa teas",
+        "",
+    ]
+
+    df = pd.DataFrame(
+        [
+            (mainheat, secondheat)
+            for mainheat in mainheat_descriptions
+            for secondheat in secondheat_descriptions
+        ],
+        columns=["MAINHEAT_DESCRIPTION", "SECONDHEAT_DESCRIPTION"],
+    )
+
+    heating_system = df["MAINHEAT_DESCRIPTION"].map(get_heating_system_row_wise)
+    heating_fuel = df["MAINHEAT_DESCRIPTION"].map(get_heating_fuel_row_wise)
+    second_hp = df["SECONDHEAT_DESCRIPTION"].str.contains(
+        "|".join(other_hp_expressions), case=False, na=False
+    )
+    main_hp = heating_system.str.contains("heat pump")
+    second_hp_only = second_hp & ~main_hp
+
+    for fine_grained_HP_types in [False, True]:
+        features = get_heating_features(
+            df.copy(), fine_grained_HP_types=fine_grained_HP_types
+        )
+
+        expected_system = heating_system
+        if not fine_grained_HP_types:
+            expected_system = heating_system.where(~main_hp, "heat pump")
+
+        assert (
+            features["HEATING_SYSTEM"].tolist()
+            == expected_system.where(~second_hp_only, "heat pump").tolist()
+        )
+        assert (
+            features["HEATING_FUEL"].tolist()
+            == heating_fuel.where(~second_hp_only, "electric").tolist()
+        )
+        assert features["HP_INSTALLED"].tolist() == (main_hp | second_hp).tolist()
+        assert (
+            features["HP_TYPE"].tolist()
+            == heating_system.where(main_hp, "No HP")
+            .where(~second_hp_only, "heat pump")
+            .tolist()
+        )
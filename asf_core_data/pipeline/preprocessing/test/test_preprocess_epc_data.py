@@ -0,0 +1,197 @@
+"""
+Script to test preprocessing the EPC data at once and in chunks.
+"""
+
+import numpy as np
+import pandas as pd
+
+from asf_core_data import Path
+from asf_core_data.config import base_config
+from asf_core_data.getters.epc.epc_data import (
+    load_preprocessed_epc_data,
+    load_preprocessed_epc_data_in_chunks,
+)
+from asf_core_data.pipeline.preprocessing.preprocess_epc_data import (
+    preprocess_data,
+    get_output_path,
+)
+
+
+def get_raw_test_data():
+    """
+    Get a small raw EPC dataset with repeated properties, missing UPRNs and addresses,
+    an empty feature and a feature with only one value.
+    """
+
+    return pd.DataFrame(
+        {
+            "LMK_KEY": ["k{}".format(i) for i in range(8)],
+            "ADDRESS1": [
+                "Flat 1",
+                "Flat 1",
+                "Flat 2",
+                "3 Mill Lane",
+                "3 Mill Lane",
+                np.nan,
+                "5 High St.",
+                "Flat 2",
+            ],
+            "ADDRESS2": ["ABC Road"] * 3 + [np.nan] * 2 + ["", "Town", "ABC Road"],
+            "POSTCODE": ["AB2 1XY"] * 3 + ["cf10 1aa"] * 2 + ["LS1 4AP"] * 3,
+            "BUILDING_REFERENCE_NUMBER": [1, 1, 2, 3, 3, 4, 5, 2],
+            "UPRN": [
+                "100023336956",
+                np.nan,
+                "100023336957",
+                np.nan,
+                np.nan,
+                np.nan,
+                "100023336958",
+                np.nan,
+            ],
+            "INSPECTION_DATE": [
+                "2015-03-01",
+                "2019-06-01",
+                "2012-01-01",
+                "2020-02-01",
+                "2011-05-01",
+                "2018-01-01",
+                "0019-07-01",
+                "2021-09-01",
+            ],
+            "CURRENT_ENERGY_RATING": ["C", "B", "D", "E", "G", "C", "A", "INVALID!"],
+            "POTENTIAL_ENERGY_RATING": ["B", "B", "C", "C", "D", "B", "A", "B"],
+            "CONSTRUCTION_AGE_BAND": [
+                "England and Wales: 1900-1929",
+                "NO DATA!",
+                "England and Wales: 2007 onwards",
+                "NO DATA!",
+                "England and Wales: 1950-1966",
+                "England and Wales: 1983-1990",
+                "NO DATA!",
+                "England and Wales: 1991-1995",
+            ],
+            "TRANSACTION_TYPE": [
+                "marketed sale",
+                "new dwelling",
+                "rental (private)",
+                "marketed sale",
+                "new dwelling",
+                "marketed sale",
+                "new dwelling",
+                "rental (social)",
+            ],
+            "MAINHEAT_DESCRIPTION": [
+                "Boiler and radiators, mains gas",
+                "Air source heat pump, radiators, electric",
+                "Electric storage heaters",
+                np.nan,
+                "Room heaters, electric",
+                "Boiler and radiators, oil",
+                "Ground source heat pump, underfloor, electric",
+                "Boiler and radiators, mains gas",
+            ],
+            "SECONDHEAT_DESCRIPTION": [
+                np.nan,
+                np.nan,
+                "Room heaters, electric",
+                np.nan,
+                "Pwmp gwres, electric",
+                np.nan,
+                np.nan,
+                np.nan,
+            ],
+            "SHEATING_ENV_EFF": [np.nan] * 8,
+            "ENERGY_TARIFF": ["standard tariff"] * 8,
+            "COUNTRY": ["England"] * 3 + ["Wales"] * 2 + ["England"] * 3,
+        }
+    )
+
+
+def load_outputs(data_path, batch):
+    """
+    Load the raw, preprocessed and deduplicated csv outputs.
+    """
+
+    return [
+        pd.read_csv(get_output_path(rel_path, data_path, batch, "GB", "csv"))
+        for rel_path in [
+            base_config.RAW_EPC_DATA_PATH,
+            base_config.PREPROC_EPC_DATA_PATH,
+            base_config.PREPROC_EPC_DATA_DEDUPL_PATH,
+        ]
+    ]
+
+
+def test_preprocess_data_in_chunks(tmp_path):
+    """
+    Test if preprocessing the EPC data in chunks saves the same raw and preprocessed data
+    as preprocessing all data at once, and the same deduplicated data up to the order of samples.
+    """
+
+    batch = "2023_Q1"
+    df = get_raw_test_data()
+
+    preprocess_data(
+        df.copy(), data_path=Path(tmp_path / "full"), batch=batch, verbose=False
+    )
+    expected = load_outputs(Path(tmp_path / "full"), batch)
+
+    for chunksize in [1, 3, 5, df.shape[0]]:
+        data_path = Path(tmp_path / "chunks_{}".format(chunksize))
+        preprocess_data(
+            df.copy(),
+            data_path=data_path,
+            batch=batch,
+            verbose=False,
+            chunksize=chunksize,
+        )
+        raw, preprocessed, deduplicated = load_outputs(data_path, batch)
+
+        pd.testing.assert_frame_equal(raw, expected[0])
+        pd.testing.assert_frame_equal(preprocessed, expected[1])
+        pd.testing.assert_frame_equal(
+            deduplicated.sort_values("LMK_KEY").reset_index(drop=True),
+            expected[2].sort_values("LMK_KEY").reset_index(drop=True),
+        )
+
+
+def test_load_compact_uprn(tmp_path):
+    """
+    Test if UPRNs saved in compact form are loaded back from csv as int64 with the UPRN_HASHED flag.
+    """
+
+    batch = "2023_Q1"
+    data_path = Path(tmp_path)
+
+    expected = preprocess_data(
+        get_raw_test_data(),
+        data_path=data_path,
+        batch=batch,
+        verbose=False,
+        compact_uprn=True,
+    )
+
+    deduplicated = load_preprocessed_epc_data(
+        data_path=data_path, batch=batch, version="preprocessed_dedupl", usecols=None
+    )
+    preprocessed = pd.concat(
+        load_preprocessed_epc_data_in_chunks(
+            data_path=data_path,
+            batch=batch,
+            version="preprocessed",
+            usecols=None,
+            chunksize=3,
+        )
+    )
+
+    for loaded in [deduplicated, preprocessed]:
+        assert loaded["UPRN"].dtype == np.int64
+        assert loaded["UPRN_HASHED"].dtype == bool
+
+    pd.testing.assert_series_equal(
+        deduplicated["UPRN"], expected["UPRN"].reset_index(drop=True)
+    )
+    pd.testing.assert_series_equal(
+        deduplicated["UPRN_HASHED"], expected["UPRN_HASHED"].reset_index(drop=True)
+    )